@@ -1,7 +1,10 @@
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from django.db.models import Sum, Q, Count
 
+from mtg_blog.leaderboard import top_posts
 from mtg_blog.models import Comment, Post, Topic
+from mtg_blog.purge import purge_posts
 
 User = get_user_model()
 
@@ -47,8 +50,7 @@ def question_6_return_the_post_with_the_most_comments():
     the database. Do not concern yourself with approval status;
     return the object which has generated the most activity.
     """
-    return Post.objects.annotate(
-        comment_count = Count('comments')).order_by('-comment_count').first()
+    return top_posts(limit=1).first()
 
 def question_7_create_a_comment(post):
     """
@@ -73,4 +75,7 @@ def question_9_delete_post_and_all_related_comments(post):
     """
     Delete the post object provided, and all related comments.
     """
-    post.delete()
\ No newline at end of file
+    # One transaction, like post.delete(), so a failure leaves the post whole
+    with transaction.atomic():
+        purge_posts(Post.objects.filter(pk=post.pk))
+    post.pk = None
\ No newline at end of file
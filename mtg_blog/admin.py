@@ -1,9 +1,48 @@
+from django import forms
 from django.contrib import admin
-from .models import Post, Topic, Comment, PhotoSubmission
+from django.utils.html import format_html
+from django.utils.text import slugify
+from .models import ArchivedComment, Post, Topic, Comment, PhotoSubmission
+from .slugs import unique_slug
+
+class PrepopulatedSlugForm(forms.ModelForm):
+    """Give a prepopulated slug that is already taken the next free suffix.
+
+    A slug the editor typed by hand still fails the usual unique check.
+    Only the value that prepopulated_fields derived from the source field
+    is renumbered.
+    """
+    slug_source = None
+
+    def clean_slug(self):
+        """Allocate a free slug when the prepopulated one is in use"""
+        slug = self.cleaned_data['slug']
+        source = self.cleaned_data.get(self.slug_source) or ''
+        taken = type(self.instance).objects.filter(slug=slug).exclude(pk=self.instance.pk)
+        if slug and slug == slugify(source) and taken.exists():
+            return unique_slug(type(self.instance), source)
+        return slug
+
+class TopicAdminForm(PrepopulatedSlugForm):
+    """Topic admin form"""
+    slug_source = 'name'
+
+    class Meta:
+        model = Topic
+        fields = ('name', 'slug')
+
+class PostAdminForm(PrepopulatedSlugForm):
+    """Post admin form"""
+    slug_source = 'title'
+
+    class Meta:
+        model = Post
+        fields = ('title', 'slug', 'status', 'author', 'content', 'topics')
 
 @admin.register(Topic)
 class TopicAdmin(admin.ModelAdmin):
     """Topic Class"""
+    form = TopicAdminForm
     list_display = ('name','slug')
     prepopulated_fields = {'slug':('name',)}
 
@@ -17,6 +56,7 @@ class CommentInline(admin.TabularInline):
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
     """Post Class"""
+    form = PostAdminForm
     list_display = ('title', 'created', 'updated', 'status', 'author')
     list_filter = ('status', 'topics')
     search_fields = ('title', 'author__username', 'author__first_name', 'author__lastname')
@@ -34,28 +74,54 @@ class CommentAdmin(admin.ModelAdmin):
     list_filter = ('approved', 'created')
     search_fields = ('name', 'email', 'text')
 
+@admin.register(ArchivedComment)
+class ArchivedCommentAdmin(admin.ModelAdmin):
+    """Read-only view of archived comments"""
+    list_display = ('name', 'post', 'created', 'archived')
+    list_filter = ('archived',)
+    search_fields = ('name', 'email', 'text')
+    list_select_related = ('post',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        # A delete here would skip the post's comment counters
+        return False
+
 @admin.register(PhotoSubmission)
 class PhotoSubmissionAdmin(admin.ModelAdmin):
     """Admin config for PhotoSubmission"""
     list_display = ['name', 'email', 'submission_date', 'photo_thumbnail']
-    list_filter = ['submission_date']
+    list_filter = ['submission_date', 'variants_status']
     search_fields = ['name', 'email',]
-    readonly_fields = ['submission_date', 'photo_thumbnail']
+    readonly_fields = ['submission_date', 'photo_thumbnail', 'photo_preview']
     ordering = ['-submission_date',]
 
     def photo_thumbnail(self, obj):
         """Display thumbnail in list view"""
+        if obj.thumbnail and obj.variants_status == PhotoSubmission.VARIANTS_READY:
+            return format_html(
+                '<img src="{}" width="50" height="50" style="object-fit: cover;"/>',
+                obj.thumbnail.url,
+            )
         if obj.photo:
-            return f'<img source="{obj.photo.url}" width="50" height="50" style="object-fit: cover;"/>'
+            return obj.get_variants_status_display()
         return "No Photo"
     photo_thumbnail.short_description = 'Photo'
-    photo_thumbnail.allow_tags = True
 
     def photo_preview(self, obj):
         """Display preview in detail view"""
+        if obj.preview and obj.variants_status == PhotoSubmission.VARIANTS_READY:
+            return format_html(
+                '<img src="{}" style="max-width: 300px; max-height: 300px;">',
+                obj.preview.url,
+            )
         if obj.photo:
-            return f'<img source="{obj.photo.url}" width="300" height="300" style="max-width: 300px;">'
+            return obj.get_variants_status_display()
         return "No Photo Uploaded"
 
     photo_preview.short_description = 'Photo Preview'
-    photo_preview.allow_tags = True
@@ -0,0 +1,253 @@
+"""Read-only JSON API for topics, published posts and approved comments.
+
+Three things keep every page a fixed number of queries:
+- Lists page with the keyset paginator from pagination.py over the same
+  indexed orderings the HTML views use.
+- ``?fields=`` trims both the serializer and the SELECT list (only()).
+- Relations are joined or prefetched once per page, and only when the
+  fields that need them were asked for.
+
+Responses carry an ETag built from the response_cache versions of the
+data they show, so a matching If-None-Match is answered with 304 Not
+Modified before any query runs.
+"""
+from django.db.models import Prefetch
+from django.utils.cache import get_conditional_response
+from rest_framework import serializers, viewsets
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.routers import DefaultRouter
+from rest_framework.utils.urls import replace_query_param
+
+from .models import Comment, Post, Topic
+from .pagination import InvalidCursor, keyset_paginate
+from .response_cache import COMMENTS, POSTS, TOPICS, conditional_validators, finish_conditional
+
+
+class SparseFieldsSerializer(serializers.ModelSerializer):
+    """Serializer that keeps only the fields named in ``?fields=``.
+
+    Meta.columns maps a serializer field to the model columns it reads
+    when that differs from the field's own name.
+    """
+
+    class Meta:
+        """Overridden by every subclass"""
+        columns = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        wanted = requested_fields(self.context.get('request'), self)
+        if wanted is not None:
+            for name in set(self.fields) - wanted:
+                self.fields.pop(name)
+
+    @classmethod
+    def columns(cls, field_names):
+        """Model columns to load with only() for the given serializer fields"""
+        mapping = getattr(cls.Meta, 'columns', {})
+        columns = ['pk']
+        for name in field_names:
+            columns.extend(mapping.get(name, (name,)))
+        return columns
+
+
+def requested_fields(request, serializer):
+    """The set of fields asked for with ?fields=, or None for all of them"""
+    if request is None or not request.query_params.get('fields'):
+        return None
+    available = serializer.Meta.fields
+    wanted = {name.strip() for name in request.query_params['fields'].split(',') if name.strip()}
+    unknown = wanted - set(available)
+    if unknown:
+        raise ValidationError({'fields': f'Unknown fields: {", ".join(sorted(unknown))}'})
+    return wanted
+
+
+class TopicSummarySerializer(serializers.ModelSerializer):
+    """Topic as embedded in a post"""
+
+    class Meta:
+        model = Topic
+        fields = ('name', 'slug')
+
+
+class TopicSerializer(SparseFieldsSerializer):
+    """Topic with its post counters"""
+
+    class Meta:
+        model = Topic
+        fields = ('id', 'name', 'slug', 'post_count', 'published_post_count')
+
+
+class PostSerializer(SparseFieldsSerializer):
+    """Published post with its author and topics"""
+    author = serializers.CharField(source='author.username', read_only=True)
+    topics = TopicSummarySerializer(many=True, read_only=True)
+    comment_count = serializers.IntegerField(source='approved_comment_count', read_only=True)
+
+    class Meta:
+        model = Post
+        fields = ('id', 'title', 'slug', 'author', 'content', 'published', 'topics', 'comment_count')
+        columns = {
+            'author': ('author__username',),
+            'topics': (),
+            'comment_count': ('approved_comment_count',),
+        }
+
+
+class CommentSerializer(SparseFieldsSerializer):
+    """Approved comment; the commenter's email is never exposed"""
+    post = serializers.SlugRelatedField(slug_field='slug', read_only=True)
+
+    class Meta:
+        model = Comment
+        fields = ('id', 'post', 'name', 'text', 'created')
+        columns = {'post': ('post__slug',)}
+
+
+class KeysetPagination(BasePagination):  # pylint: disable=abstract-method
+    """DRF adapter for keyset_paginate; the view supplies the indexed ordering.
+
+    Shows no page controls in the browsable API, so to_html is not needed.
+    """
+    page_size = 20
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+
+    def __init__(self):
+        self.request = None
+        self.page = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        try:
+            size = int(request.query_params.get('page_size', self.page_size))
+        except ValueError:
+            size = self.page_size
+        size = max(1, min(size, self.max_page_size))
+        try:
+            self.page = keyset_paginate(
+                queryset, view.ordering, size, request.query_params.get(self.cursor_query_param))
+        except InvalidCursor as error:
+            raise NotFound('Invalid cursor.') from error
+        return list(self.page)
+
+    def _link(self, cursor):
+        if cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self._link(self.page.next_cursor),
+            'previous': self._link(self.page.prev_cursor),
+            'results': data,
+        })
+
+
+class ReadOnlyAPIViewSet(viewsets.ReadOnlyModelViewSet):  # pylint: disable=too-many-ancestors
+    """Sparse, keyset-paginated, conditional-GET read-only viewset.
+
+    Subclasses set `queryset` to the rows the endpoint exposes, narrow it
+    per request in filter_queryset, and name in `dependencies` the
+    response_cache dependencies their responses are built from.
+    """
+    pagination_class = KeysetPagination
+    lookup_field = 'slug'
+    ordering = ()
+    dependencies = ()
+    validators = None
+
+    def relations(self, queryset, fields):  # pylint: disable=unused-argument
+        """Add the joins and prefetches the requested fields need"""
+        return queryset
+
+    def get_queryset(self):
+        serializer_class = self.get_serializer_class()
+        wanted = requested_fields(self.request, serializer_class)
+        fields = serializer_class.Meta.fields if wanted is None else wanted
+        columns = serializer_class.columns(fields)
+        columns.extend(field.lstrip('-') for field in self.ordering)
+        queryset = super().get_queryset().only(*dict.fromkeys(columns))
+        return self.relations(queryset, fields)
+
+    def not_modified(self, request):
+        """A 304 response if the client's copy is current, decided without a query"""
+        self.validators = conditional_validators(
+            request, self.dependencies, request.accepted_renderer.format)
+        etag, last_modified = self.validators
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        return finish_conditional(response, etag, last_modified) if response else None
+
+    def list(self, request, *args, **kwargs):
+        return self.not_modified(request) or super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.not_modified(request) or super().retrieve(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.validators and response.status_code == 200:
+            finish_conditional(response, *self.validators)
+        return response
+
+
+class TopicViewSet(ReadOnlyAPIViewSet):  # pylint: disable=too-many-ancestors
+    """Topics in name order"""
+    queryset = Topic.objects.all()
+    serializer_class = TopicSerializer
+    ordering = ('name', 'id')
+    # Publishing a post changes the topics' published_post_count
+    dependencies = (TOPICS, POSTS)
+
+
+class PostViewSet(ReadOnlyAPIViewSet):  # pylint: disable=too-many-ancestors
+    """Published posts, newest first; ?topic=<slug> narrows to one topic"""
+    queryset = Post.objects.filter(status='published')
+    serializer_class = PostSerializer
+    ordering = ('-published', '-id')
+    dependencies = (POSTS, TOPICS, COMMENTS)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        topic = self.request.query_params.get('topic')
+        if topic:
+            queryset = queryset.filter(topics__slug=topic)
+        return queryset
+
+    def relations(self, queryset, fields):
+        if 'author' in fields:
+            queryset = queryset.select_related('author')
+        if 'topics' in fields:
+            queryset = queryset.prefetch_related(
+                Prefetch('topics', queryset=Topic.objects.only('name', 'slug')))
+        return queryset
+
+
+class CommentViewSet(ReadOnlyAPIViewSet):  # pylint: disable=too-many-ancestors
+    """Approved comments, newest first; ?post=<slug> narrows to one post"""
+    queryset = Comment.objects.filter(approved=True, post__status='published')
+    serializer_class = CommentSerializer
+    ordering = ('-created', '-id')
+    lookup_field = 'pk'
+    dependencies = (COMMENTS, POSTS)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        post = self.request.query_params.get('post')
+        if post:
+            queryset = queryset.filter(post__slug=post)
+        return queryset
+
+    def relations(self, queryset, fields):
+        if 'post' in fields:
+            queryset = queryset.select_related('post')
+        return queryset
+
+
+router = DefaultRouter()
+router.register('topics', TopicViewSet, basename='api-topic')
+router.register('posts', PostViewSet, basename='api-post')
+router.register('comments', CommentViewSet, basename='api-comment')
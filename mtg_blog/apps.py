@@ -5,3 +5,6 @@ class MtgBlogConfig(AppConfig):
     """Mtg Blog App Config"""
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'mtg_blog'
+
+    def ready(self):
+        from . import signals  # pylint: disable=import-outside-toplevel,unused-import
@@ -0,0 +1,71 @@
+"""Hot/cold tiering of comments.
+
+Approved comments older than a cutoff move from Comment to
+ArchivedComment in batches. This keeps the Comment table and its indexes
+(used by the admin inline and the per-post comment queries) small. The
+post counters already include these comments, so moving one does not
+change them. Reads stay on the hot table unless a caller asks for the
+archive with include_archived=True. A comment whose id the archive
+already holds (SQLite reuses the ids of deleted rows) stays in the hot
+table rather than overwrite or lose either row.
+"""
+import heapq
+from operator import attrgetter
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import ArchivedComment, Comment
+from .response_cache import COMMENTS, invalidate
+
+ARCHIVED_FIELDS = ('id', 'post_id', 'name', 'email', 'text', 'approved', 'created', 'updated')
+
+
+def archive_comments(cutoff, batch_size=1000, progress=None):
+    """Move approved comments created before cutoff into the archive.
+
+    Each batch is copied and deleted in one short transaction, oldest
+    first. Returns the number of comments moved.
+    """
+    candidates = (
+        Comment.objects.filter(approved=True, created__lt=cutoff)
+        .order_by('created', 'id')
+        .values(*ARCHIVED_FIELDS)
+    )
+    moved = 0
+    after = Q()
+    while True:
+        with transaction.atomic():
+            rows = list(candidates.filter(after)[:batch_size])
+            if not rows:
+                invalidate(COMMENTS)
+                return moved
+            taken = set(ArchivedComment.objects.filter(
+                pk__in=[row['id'] for row in rows]).values_list('pk', flat=True))
+            rows_moved = [row for row in rows if row['id'] not in taken]
+            ArchivedComment.objects.bulk_create([ArchivedComment(**row) for row in rows_moved])
+            # The comments stay counted on their post, so bypass the delete signals
+            Comment.objects.filter(  # pylint: disable=protected-access
+                pk__in=[row['id'] for row in rows_moved])._raw_delete(Comment.objects.db)
+        moved += len(rows_moved)
+        # Comments left behind are not selected again
+        last = rows[-1]
+        after = Q(created__gt=last['created']) | Q(created=last['created'], id__gt=last['id'])
+        if progress:
+            progress(moved)
+
+
+def post_comments(post, include_archived=False, approved_only=False):
+    """Return a post's comments, newest first.
+
+    Without include_archived this is a queryset over the hot table. With
+    it, the hot and archived comments are merged by creation time into
+    a list.
+    """
+    hot = Comment.objects.filter(post=post).order_by('-created')
+    if approved_only:
+        hot = hot.filter(approved=True)
+    if not include_archived:
+        return hot
+    archived = ArchivedComment.objects.filter(post=post).order_by('-created')
+    return list(heapq.merge(hot, archived, key=attrgetter('created'), reverse=True))
@@ -0,0 +1,10 @@
+"""Performance benchmarks for the blog.
+
+Run under pytest with ``pytest -m benchmark`` or standalone with
+``python -m mtg_blog.benchmarks``. WSGI and ASGI throughput under
+concurrent connections is compared with
+``python -m mtg_blog.benchmarks.concurrency``, and read/write contention
+on the configured database profile with
+``python -m mtg_blog.benchmarks.contention``. The cost of building
+topic and post links is timed with ``python -m mtg_blog.benchmarks.links``.
+"""
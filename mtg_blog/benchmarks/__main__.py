@@ -0,0 +1,58 @@
+"""Run the benchmarks against a throwaway database.
+
+    python -m mtg_blog.benchmarks --posts 100000
+    python -m mtg_blog.benchmarks --update-baseline
+"""
+import argparse
+import os
+import sys
+
+
+def main(argv=None):
+    """Create a test database, seed it, benchmark and compare with the baseline"""
+    parser = argparse.ArgumentParser(prog='python -m mtg_blog.benchmarks')
+    parser.add_argument('--posts', type=int, default=1000)
+    parser.add_argument('--topics', type=int, default=50)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--cold', action='store_true', help='Clear caches before every request')
+    parser.add_argument('--baseline', default=None, help='Baseline JSON file')
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=None,
+                        help='Also fail on a median slowdown above this fraction; '
+                             'only meaningful against a baseline from the same machine')
+    options = parser.parse_args(argv)
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mtg_site.settings')
+    import django  # pylint: disable=import-outside-toplevel
+    django.setup()
+    # pylint: disable=import-outside-toplevel
+    from django.test.utils import setup_test_environment, teardown_test_environment
+    from django.test.runner import DiscoverRunner
+    from mtg_blog.benchmarks import data, runner
+
+    setup_test_environment()
+    test_runner = DiscoverRunner(verbosity=0, interactive=False)
+    databases = test_runner.setup_databases()
+    try:
+        data.seed(users=options.users, topics=options.topics, posts=options.posts,
+                  photos=min(options.posts, 1000))
+        results = runner.run(iterations=options.iterations, cold=options.cold)
+        print(runner.format_results(results))
+        baseline_path = options.baseline or runner.BASELINE_FILE
+        if options.update_baseline:
+            runner.save_baseline(results, baseline_path)
+            print(f'Baseline written to {baseline_path}')
+            return 0
+        found = runner.regressions(
+            results, runner.load_baseline(baseline_path), options.tolerance)
+        for regression in found:
+            print(f'REGRESSION {regression}')
+        return 1 if found else 0
+    finally:
+        test_runner.teardown_databases(databases)
+        teardown_test_environment()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
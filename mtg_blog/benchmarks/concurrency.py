@@ -0,0 +1,263 @@
+"""Compare WSGI (gunicorn) and ASGI (uvicorn) under many concurrent connections.
+
+    python -m mtg_blog.benchmarks.concurrency --connections 100 250 500 1000
+    python -m mtg_blog.benchmarks.concurrency --servers asgi --path /topics/ --duration 30
+    python -m mtg_blog.benchmarks.concurrency --path /topic/modern --uncached
+
+Each server is started locally on the configured database and cache
+(set MTG_CACHE to a shared backend, as the workers are separate
+processes) with the same number of worker processes. For every connection count, that many
+keep-alive clients send GETs back to back for `--duration` seconds. The
+report shows throughput, p50 and p99 latency and errors (refused or
+dropped connections, timeouts and non-200 responses). Run with DEBUG off
+for realistic numbers, and ``--seed`` to fill an empty database first.
+
+By default the cached home page and the busiest topic's page are
+loaded. The topic page is requested uncached: every request gets a
+query string of its own, so cache_response misses and the view reads
+through the ORM each time.
+"""
+import argparse
+import asyncio
+import importlib.util
+import itertools
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+HOST = '127.0.0.1'
+PORT = 8765
+REQUEST_TIMEOUT = 30
+STARTUP_TIMEOUT = 30
+SERVER_MODULES = {'wsgi': 'gunicorn', 'asgi': 'uvicorn'}
+# Numbers the requests of uncached loads, so no two share a URL
+_uncached_requests = itertools.count()
+
+
+def server_command(name, workers, threads, port):
+    """Command line that serves the project with the named server"""
+    bind = f'{HOST}:{port}'
+    if name == 'wsgi':
+        # gthread workers keep connections alive, like the ASGI server does
+        return [
+            sys.executable, '-m', 'gunicorn', 'mtg_site.wsgi:application', '--bind', bind,
+            '--workers', str(workers), '--worker-class', 'gthread', '--threads', str(threads),
+            '--backlog', '2048', '--log-level', 'warning',
+        ]
+    return [
+        sys.executable, '-m', 'uvicorn', 'mtg_site.asgi:application', '--host', HOST,
+        '--port', str(port), '--workers', str(workers), '--backlog', '2048',
+        '--no-access-log', '--log-level', 'warning',
+    ]
+
+
+@contextmanager
+def running_server(command, port):
+    """Start a server process and stop it when the block exits"""
+    process = subprocess.Popen(command)  # pylint: disable=consider-using-with
+    try:
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f'{command[2]} exited with status {process.returncode}')
+            try:
+                socket.create_connection((HOST, port), timeout=1).close()
+                break
+            except OSError as exc:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(
+                        f'{command[2]} did not start listening on port {port}') from exc
+                time.sleep(0.2)
+        yield process
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+async def _read_response(reader):
+    """Read one HTTP/1.1 response; return (status, whether the server closes the connection)"""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip().lower()
+
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.read()
+        return status, True
+    if lines[0].startswith('HTTP/1.0'):
+        return status, headers.get('connection') != 'keep-alive'
+    return status, headers.get('connection') == 'close'
+
+
+def _request(port, path):
+    return (
+        f'GET {path} HTTP/1.1\r\nHost: {HOST}:{port}\r\n'
+        'User-Agent: mtg-blog-benchmark\r\nAccept: text/html\r\n\r\n'
+    ).encode()
+
+
+async def _client(port, path, deadline, latencies, errors, *, uncached=False):
+    """One keep-alive connection sending requests until the deadline"""
+    reader = writer = None
+    request = _request(port, path)
+    separator = '&' if '?' in path else '?'
+    while time.perf_counter() < deadline:
+        if uncached:
+            request = _request(port, f'{path}{separator}_={next(_uncached_requests)}')
+        try:
+            if writer is None:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(HOST, port), REQUEST_TIMEOUT)
+            start = time.perf_counter()
+            writer.write(request)
+            status, closed = await asyncio.wait_for(_read_response(reader), REQUEST_TIMEOUT)
+            if status == 200:
+                latencies.append((time.perf_counter() - start) * 1000)
+            else:
+                errors.append(status)
+        except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                asyncio.TimeoutError, ValueError) as error:
+            errors.append(type(error).__name__)
+            closed = True
+            await asyncio.sleep(0.01)
+        if closed and writer is not None:
+            writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def load(port, path, connections, duration, uncached=False):
+    """Keep `connections` clients busy for `duration` seconds and summarize the latencies.
+
+    With `uncached`, every request carries a query string of its own so
+    the response cache never answers it.
+    """
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*(
+        _client(port, path, deadline, latencies, errors, uncached=uncached)
+        for _ in range(connections)
+    ))
+    return summarize(latencies, errors, duration)
+
+
+def summarize(latencies, errors, duration):
+    """Throughput and latency percentiles of one load run"""
+    from mtg_blog.benchmarks.runner import percentile  # pylint: disable=import-outside-toplevel
+    if not latencies:
+        return {'requests': 0, 'rps': 0.0, 'p50_ms': None, 'p99_ms': None, 'errors': len(errors)}
+    return {
+        'requests': len(latencies),
+        'rps': round(len(latencies) / duration, 1),
+        'p50_ms': round(statistics.median(latencies), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'errors': len(errors),
+    }
+
+
+def default_pages():
+    """The cached home page and, uncached, the page of the busiest topic"""
+    from mtg_blog.models import Topic  # pylint: disable=import-outside-toplevel
+    pages = [('/home/', False)]
+    busiest = Topic.objects.order_by('-post_count', 'name').first()
+    if busiest is not None:
+        pages.append((busiest.get_absolute_url(), True))
+    return pages
+
+
+def compare(servers, connection_counts, pages, *, duration=10, workers=4, threads=8, port=PORT):
+    """Benchmark each server on each (path, uncached) page at each connection count.
+
+    Returns {(server, page label, connections): result}.
+    """
+    results = {}
+    for name in servers:
+        with running_server(server_command(name, workers, threads, port), port):
+            for path, uncached in pages:
+                label = f'{path} (uncached)' if uncached else path
+                # Warm the worker processes and the caches before measuring
+                asyncio.run(load(port, path, workers * 2, 1, uncached))
+                for connections in connection_counts:
+                    results[name, label, connections] = asyncio.run(
+                        load(port, path, connections, duration, uncached))
+    return results
+
+
+def format_results(results):
+    """Render results as a plain text table"""
+    width = max([len(label) for _, label, _ in results] + [4]) + 2
+    lines = [f"{'server':<8}{'page':<{width}}{'conns':>7}{'requests':>10}{'req/s':>10}"
+             f"{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}"]
+    for (name, label, connections), result in sorted(results.items()):
+        lines.append(
+            f"{name:<8}{label:<{width}}{connections:>7}{result['requests']:>10}{result['rps']:>10}"
+            f"{str(result['p50_ms']):>10}{str(result['p99_ms']):>10}{result['errors']:>8}"
+        )
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    """Run the concurrency comparison from the command line"""
+    parser = argparse.ArgumentParser(prog='python -m mtg_blog.benchmarks.concurrency')
+    parser.add_argument('--servers', nargs='+', choices=SERVER_MODULES, default=list(SERVER_MODULES))
+    parser.add_argument('--connections', type=int, nargs='+', default=[100, 250, 500, 1000])
+    parser.add_argument('--path', nargs='+', default=None,
+                        help='Pages to load (default: /home/ and the busiest topic, uncached)')
+    parser.add_argument('--uncached', action='store_true',
+                        help='Give every request to --path its own query string')
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=4, help='Worker processes per server')
+    parser.add_argument('--threads', type=int, default=8, help='Threads per gunicorn worker')
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--seed', type=int, default=0, metavar='POSTS',
+                        help='Migrate and seed the configured database with this many posts first')
+    options = parser.parse_args(argv)
+
+    missing = [SERVER_MODULES[name] for name in options.servers
+               if importlib.util.find_spec(SERVER_MODULES[name]) is None]
+    if missing:
+        parser.error(f"install {' and '.join(missing)} to run this benchmark")
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mtg_site.settings')
+    import django  # pylint: disable=import-outside-toplevel
+    django.setup()
+    if options.seed:
+        # pylint: disable=import-outside-toplevel
+        from django.core.management import call_command
+        from mtg_blog.benchmarks import data
+        call_command('migrate', verbosity=0)
+        data.seed(posts=options.seed)
+
+    if options.path:
+        pages = [(path, options.uncached) for path in options.path]
+    else:
+        pages = default_pages()
+    results = compare(
+        options.servers, options.connections, pages, duration=options.duration,
+        workers=options.workers, threads=options.threads, port=options.port)
+    print(format_results(results))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,178 @@
+"""Mixed topic-page reads and contest inserts from many threads at once.
+
+    python -m mtg_blog.benchmarks.contention
+    python -m mtg_blog.benchmarks.contention --untuned
+    MTG_DB_PROFILE=postgresql python -m mtg_blog.benchmarks.contention --readers 32 --writers 8
+
+Runs against a throwaway database of the profile selected by
+MTG_DB_PROFILE (for SQLite a temporary file, so every thread shares it
+the way server workers would). Reader threads load a random topic page
+the way TopicDetailView does; writer threads insert contest submissions
+one transaction at a time. ``--untuned`` drops the SQLite pragmas and
+the IMMEDIATE transaction mode to measure the stock configuration.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+
+def _reader(slugs, deadline, timings, errors):
+    # pylint: disable=import-outside-toplevel
+    from django.db import DatabaseError, connection
+    from mtg_blog.models import Topic
+    from mtg_blog.pagination import keyset_paginate
+    from mtg_blog.views import TopicDetailView
+
+    rng = random.Random()
+    view = TopicDetailView()
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                view.object = Topic.objects.get(slug=rng.choice(slugs))
+                list(keyset_paginate(view.get_posts(), view.post_ordering, view.paginate_by))
+            except DatabaseError as error:
+                errors.append(str(error))
+                continue
+            timings.append((time.perf_counter() - start) * 1000)
+    finally:
+        connection.close()
+
+
+def _writer(photo_name, deadline, timings, errors):
+    # pylint: disable=import-outside-toplevel
+    from django.db import DatabaseError, connection, transaction
+    from mtg_blog.models import PhotoSubmission
+
+    number = 0
+    try:
+        while time.perf_counter() < deadline:
+            number += 1
+            start = time.perf_counter()
+            try:
+                with transaction.atomic():
+                    PhotoSubmission.objects.create(
+                        name=f'Entrant {number}', email=f'entrant{number}@example.com',
+                        photo=photo_name)
+            except DatabaseError as error:
+                errors.append(str(error))
+                continue
+            timings.append((time.perf_counter() - start) * 1000)
+    finally:
+        connection.close()
+
+
+def _summary(timings, errors, duration):
+    from mtg_blog.benchmarks.runner import percentile  # pylint: disable=import-outside-toplevel
+    return {
+        'ops': len(timings),
+        'ops_per_s': round(len(timings) / duration, 1),
+        'p50_ms': round(statistics.median(timings), 3) if timings else None,
+        'p99_ms': round(percentile(timings, 0.99), 3) if timings else None,
+        'errors': len(errors),
+    }
+
+
+def _placeholder_photo():
+    """Store the photo every writer submits and return its name"""
+    # pylint: disable=import-outside-toplevel
+    from django.core.files.base import ContentFile
+    from mtg_blog.benchmarks.data import PLACEHOLDER_GIF
+    from mtg_blog.models import PhotoSubmission
+
+    storage = PhotoSubmission._meta.get_field('photo').storage
+    return storage.save('contest_photos/contention.gif', ContentFile(PLACEHOLDER_GIF))
+
+
+def contend(readers=8, writers=2, duration=10):
+    """Run readers and writers together; return {'reads': summary, 'writes': summary}"""
+    from mtg_blog.models import Topic  # pylint: disable=import-outside-toplevel
+
+    slugs = list(Topic.objects.values_list('slug', flat=True))
+    photo_name = _placeholder_photo()
+
+    reads, writes, read_errors, write_errors = [], [], [], []
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=_reader, args=(slugs, deadline, reads, read_errors))
+        for _ in range(readers)
+    ] + [
+        threading.Thread(target=_writer, args=(photo_name, deadline, writes, write_errors))
+        for _ in range(writers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {
+        'reads': _summary(reads, read_errors, duration),
+        'writes': _summary(writes, write_errors, duration),
+    }
+
+
+def format_results(profile, results):
+    """Render results as a plain text table"""
+    lines = [f"{profile:<12}{'ops':>8}{'ops/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}"]
+    for kind, result in results.items():
+        lines.append(
+            f"{kind:<12}{result['ops']:>8}{result['ops_per_s']:>10}"
+            f"{str(result['p50_ms']):>10}{str(result['p99_ms']):>10}{result['errors']:>8}"
+        )
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    """Seed a throwaway database of the configured profile and run the contention benchmark"""
+    parser = argparse.ArgumentParser(prog='python -m mtg_blog.benchmarks.contention')
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--posts', type=int, default=1000)
+    parser.add_argument('--untuned', action='store_true',
+                        help='Stock SQLite settings: no pragmas, deferred transactions')
+    options = parser.parse_args(argv)
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mtg_site.settings')
+    import django  # pylint: disable=import-outside-toplevel
+    django.setup()
+    # pylint: disable=import-outside-toplevel
+    from django.conf import settings
+    from django.db import connection
+    from django.test.runner import DiscoverRunner
+    from django.test.utils import setup_test_environment, teardown_test_environment
+    from mtg_blog.benchmarks import data
+
+    with tempfile.TemporaryDirectory() as directory:
+        settings.MEDIA_ROOT = directory
+        # Variants would be rendered by background threads competing for the database
+        settings.MTG_PHOTO_VARIANT_WORKERS = 0
+        profile = settings.MTG_DB_PROFILE
+        if connection.vendor == 'sqlite':
+            # A file, not the shared in-memory test database
+            connection.settings_dict['TEST']['NAME'] = os.path.join(directory, 'contention.sqlite3')
+            if options.untuned:
+                settings.MTG_SQLITE_PRAGMAS = {}
+                connection.settings_dict['OPTIONS'].pop('transaction_mode', None)
+                profile = 'sqlite-stock'
+
+        setup_test_environment()
+        test_runner = DiscoverRunner(verbosity=0, interactive=False)
+        databases = test_runner.setup_databases()
+        try:
+            data.seed(posts=options.posts, photos=0)
+            connection.close()
+            results = contend(options.readers, options.writers, options.duration)
+            print(format_results(profile, results))
+        finally:
+            test_runner.teardown_databases(databases)
+            teardown_test_environment()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
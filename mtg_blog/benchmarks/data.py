@@ -0,0 +1,174 @@
+"""Generate realistic benchmark data with bulk inserts"""
+import random
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+
+from mtg_blog.counters import reconcile_comment_counts, reconcile_topic_counts
+from mtg_blog.models import Comment, PhotoSubmission, Post, Topic
+from mtg_blog.rendering import render_content
+from mtg_blog.response_cache import COMMENTS, POSTS, TOPICS, invalidate
+from mtg_blog.sitemaps import invalidate_post_shards
+from mtg_blog.topic_cache import invalidate_top_topics
+
+WORDS = (
+    'mana', 'tap', 'untap', 'sorcery', 'instant', 'creature', 'planeswalker', 'graveyard',
+    'exile', 'sideboard', 'mulligan', 'commander', 'draft', 'sealed', 'tempo', 'control',
+    'aggro', 'combo', 'midrange', 'ramp', 'lifelink', 'trample', 'flash', 'ward', 'bolt',
+    'counterspell', 'dragon', 'elf', 'goblin', 'zombie', 'artifact', 'enchantment', 'land',
+)
+# A GIF small enough to store once and share between every generated submission
+PLACEHOLDER_GIF = (
+    b'GIF89a\x01\x00\x01\x00\x00\x00\x00!\xf9\x04\x01\x00\x00\x00\x00'
+    b',\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02\x04\x01\x00;'
+)
+
+
+def _text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def _topic_weights(count, skew):
+    """Zipf-like weights so a few topics hold most of the posts"""
+    return [1 / (rank ** skew) for rank in range(1, count + 1)]
+
+
+def _batches(total, size):
+    start = 0
+    while start < total:
+        yield start, min(size, total - start)
+        start += size
+
+
+class _Seeder:
+    """Bulk inserts sharing one random generator, name prefix and clock"""
+
+    def __init__(self, seed_value, batch_size):
+        self.rng = random.Random(seed_value)
+        self.prefix = f'bench{seed_value}'
+        self.now = timezone.now()
+        self.batch_size = batch_size
+
+    def users(self, count):
+        """Insert users; return their ids"""
+        user_ids = []
+        for start, size in _batches(count, self.batch_size):
+            created = User.objects.bulk_create(
+                User(username=f'{self.prefix}-user-{start + i}',
+                     email=f'{self.prefix}-{start + i}@example.com')
+                for i in range(size)
+            )
+            user_ids.extend(user.pk for user in created)
+        return user_ids
+
+    def topics(self, count):
+        """Insert topics; return their ids"""
+        return [
+            topic.pk for topic in Topic.objects.bulk_create(
+                Topic(name=f'{self.prefix} topic {i}', slug=f'{self.prefix}-topic-{i}')
+                for i in range(count)
+            )
+        ]
+
+    def post(self, number, author_ids, published_at):
+        """An unsaved post with a random body"""
+        published = self.rng.random() < 0.8
+        content = _text(self.rng, self.rng.randint(50, 400))
+        content_html, excerpt = render_content(content)
+        return Post(
+            title=f'{_text(self.rng, 4).title()} {number}',
+            slug=f'{self.prefix}-post-{number}',
+            content=content,
+            content_html=content_html,
+            excerpt=excerpt,
+            author_id=self.rng.choice(author_ids),
+            status='published' if published else 'draft',
+            published=published_at if published else None,
+        )
+
+    def comments(self, post_id, per_post):
+        """Unsaved comments for one post, about per_post of them on average"""
+        return [
+            Comment(
+                post_id=post_id,
+                name=f'Reader {self.rng.randint(1, 10_000)}',
+                email='reader@example.com',
+                text=_text(self.rng, self.rng.randint(5, 60)),
+                approved=self.rng.random() < 0.7,
+            )
+            for _ in range(int(self.rng.expovariate(1 / per_post)) if per_post else 0)
+        ]
+
+    def posts(self, count, author_ids, topic_ids, *, comments_per_post, topics_per_post, skew,
+              progress):
+        """Insert posts with their topic links and comments; return the number of comments"""
+        weights = _topic_weights(len(topic_ids), skew)
+        through = Post.topics.through
+        inserted_comments = 0
+        for start, size in _batches(count, self.batch_size):
+            with transaction.atomic():
+                batch = Post.objects.bulk_create([
+                    self.post(i, author_ids, self.now - timedelta(minutes=count - i))
+                    for i in range(start, start + size)
+                ])
+                through.objects.bulk_create([
+                    through(post_id=post.pk, topic_id=topic_id) for post in batch
+                    for topic_id in set(self.rng.choices(topic_ids, weights=weights, k=topics_per_post))
+                ])
+                comments = [
+                    comment for post in batch for comment in self.comments(post.pk, comments_per_post)
+                ]
+                Comment.objects.bulk_create(comments, batch_size=self.batch_size)
+                inserted_comments += len(comments)
+            if progress:
+                progress(start + size)
+        return inserted_comments
+
+    def photos(self, count):
+        """Insert submissions that all share one stored placeholder image"""
+        storage = PhotoSubmission._meta.get_field('photo').storage
+        photo_name = storage.save('contest_photos/benchmark.gif', ContentFile(PLACEHOLDER_GIF))
+        for start, size in _batches(count, self.batch_size):
+            PhotoSubmission.objects.bulk_create(
+                PhotoSubmission(
+                    name=f'Entrant {start + i}',
+                    email=f'entrant{start + i}@example.com',
+                    photo=photo_name,
+                    submission_date=self.now - timedelta(minutes=start + i),
+                )
+                for i in range(size)
+            )
+
+
+def seed(*, users=100, topics=50, posts=1000, comments_per_post=3, photos=100,
+         topics_per_post=2, skew=1.1, batch_size=1000, seed_value=0, progress=None):
+    """Insert a data set of the requested size and return a summary dict.
+
+    Rows go in through bulk_create in batches, one transaction per batch,
+    so memory stays flat from a thousand to a million posts.
+    """
+    seeder = _Seeder(seed_value, batch_size)
+    user_ids = seeder.users(users)
+    topic_ids = seeder.topics(topics)
+    inserted_comments = seeder.posts(
+        posts, user_ids, topic_ids, comments_per_post=comments_per_post,
+        topics_per_post=topics_per_post, skew=skew, progress=progress)
+    if photos:
+        seeder.photos(photos)
+
+    # bulk_create bypasses signals, so bring derived data up to date once
+    reconcile_topic_counts(topic_ids)
+    reconcile_comment_counts()
+    invalidate_top_topics()
+    invalidate(TOPICS, POSTS, COMMENTS)
+    invalidate_post_shards()
+    return {
+        'users': len(user_ids),
+        'topics': len(topic_ids),
+        'posts': posts,
+        'comments': inserted_comments,
+        'photos': photos,
+    }
@@ -0,0 +1,73 @@
+"""Cost of building topic and post links with reverse() and with build_url().
+
+    python -m mtg_blog.benchmarks.links
+    python -m mtg_blog.benchmarks.links --links 10000 --repeat 7
+
+Builds the link of every item in a list of unsaved topics and posts,
+the way the topic list, home page and sidebar do, and reports the best
+time per link of each approach. Needs no database.
+"""
+import argparse
+import os
+import sys
+import timeit
+
+
+def measure(links=5000, repeat=5):
+    """Best microseconds per link of reverse() and build_url(), and the speedup"""
+    # pylint: disable=import-outside-toplevel
+    from django.urls import reverse
+    from mtg_blog.models import Post, Topic
+
+    topics = [Topic(name=f'Topic {number}', slug=f'topic-{number}') for number in range(links // 2)]
+    posts = [Post(title=f'Post {number}', slug=f'post-{number}') for number in range(links // 2)]
+
+    def with_reverse():
+        for topic in topics:
+            reverse('mtg_blog_app:topic_detail', kwargs={'slug': topic.slug})
+        for post in posts:
+            reverse('mtg_blog_app:post_detail', kwargs={'slug': post.slug})
+
+    def with_build_url():
+        for topic in topics:
+            topic.get_absolute_url()
+        for post in posts:
+            post.get_absolute_url()
+
+    count = len(topics) + len(posts)
+    reverse_us = min(timeit.repeat(with_reverse, number=1, repeat=repeat)) / count * 1e6
+    build_url_us = min(timeit.repeat(with_build_url, number=1, repeat=repeat)) / count * 1e6
+    return {
+        'links': count,
+        'reverse_us': round(reverse_us, 3),
+        'build_url_us': round(build_url_us, 3),
+        'speedup': round(reverse_us / build_url_us, 1),
+    }
+
+
+def format_results(result):
+    """Render a result as plain text"""
+    return (
+        f"{result['links']} links\n"
+        f"{'reverse()':<14}{result['reverse_us']:>10} us/link\n"
+        f"{'build_url()':<14}{result['build_url_us']:>10} us/link\n"
+        f"{'speedup':<14}{result['speedup']:>10}x"
+    )
+
+
+def main(argv=None):
+    """Time link building with both approaches"""
+    parser = argparse.ArgumentParser(prog='python -m mtg_blog.benchmarks.links')
+    parser.add_argument('--links', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    options = parser.parse_args(argv)
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mtg_site.settings')
+    import django  # pylint: disable=import-outside-toplevel
+    django.setup()
+    print(format_results(measure(options.links, options.repeat)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
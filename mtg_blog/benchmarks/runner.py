@@ -0,0 +1,171 @@
+"""Measure latency and query counts for every public URL and admin changelist"""
+import json
+import os
+import statistics
+import time
+
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from mtg_blog.api import CommentViewSet, KeysetPagination, PostViewSet, TopicViewSet
+from mtg_blog.models import Comment, Post, Topic
+from mtg_blog.pagination import keyset_paginate
+from mtg_blog.topic_cache import clear_top_topics_cache
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+
+def public_urls():
+    """One concrete URL for every route in mtg_blog.urls"""
+    busiest = Topic.objects.order_by('-post_count', 'name').first()
+    urls = {
+        'home': reverse('mtg_blog_app:home'),
+        'topic_list': reverse('mtg_blog_app:topic_list'),
+        'contest': reverse('mtg_blog_app:contest'),
+        'search': reverse('mtg_blog_app:search') + '?q=mana',
+        'feed_rss': reverse('mtg_blog_app:feed_rss'),
+        'feed_atom': reverse('mtg_blog_app:feed_atom'),
+        'sitemap': reverse('mtg_blog_app:sitemap'),
+    }
+    latest = Post.objects.filter(status='published').order_by('-published', '-id').first()
+    if latest is not None:
+        urls['post_detail'] = latest.get_absolute_url()
+    if busiest is not None:
+        urls['topic_detail'] = reverse('mtg_blog_app:topic_detail', kwargs={'slug': busiest.slug})
+        urls['topic_feed_rss'] = reverse('mtg_blog_app:topic_feed_rss', kwargs={'slug': busiest.slug})
+        urls['topic_feed_atom'] = reverse('mtg_blog_app:topic_feed_atom', kwargs={'slug': busiest.slug})
+    urls.update(api_urls())
+    return urls
+
+
+def api_urls(depth=5):
+    """First and a deep page of every API list; their query counts should match"""
+    lists = {
+        'topics': (TopicViewSet.ordering, Topic.objects.all()),
+        'posts': (PostViewSet.ordering, Post.objects.filter(status='published')),
+        'comments': (CommentViewSet.ordering, Comment.objects.filter(approved=True)),
+    }
+    urls = {}
+    for name, (ordering, queryset) in lists.items():
+        url = reverse(f'mtg_blog_app:api-{name[:-1]}-list')
+        urls[f'api_{name}'] = url
+        cursor = None
+        for _ in range(depth):
+            page = keyset_paginate(queryset, ordering, KeysetPagination.page_size, cursor)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        if cursor:
+            urls[f'api_{name}_deep'] = f'{url}?cursor={cursor}'
+    return urls
+
+
+def admin_urls():
+    """The changelist of every model this app registers in the admin"""
+    return {
+        f'admin_{model._meta.model_name}': reverse(
+            f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist')
+        for model in admin.site._registry  # pylint: disable=protected-access
+        if model._meta.app_label == 'mtg_blog'
+    }
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def measure(client, url, iterations=20, cold=False):
+    """Request a URL repeatedly and return its latency percentiles and query count"""
+    warm = client.get(url)
+    if warm.streaming:
+        b''.join(warm.streaming_content)
+    timings, queries = [], []
+    for _ in range(iterations):
+        if cold:
+            cache.clear()
+            clear_top_topics_cache()
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            timings.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            raise AssertionError(f'{url} returned status {response.status_code}')
+        queries.append(len(captured))
+    return {
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'p99_ms': round(percentile(timings, 0.99), 3),
+        'queries': max(queries),
+    }
+
+
+def run(iterations=20, cold=False):
+    """Benchmark every public URL anonymously and every changelist as a superuser"""
+    results = {}
+    anonymous = Client()
+    for name, url in public_urls().items():
+        results[name] = measure(anonymous, url, iterations, cold)
+
+    staff = Client()
+    user = User.objects.filter(is_superuser=True).first() or User.objects.create_superuser(
+        'benchmark-admin', 'benchmark@example.com', None)
+    staff.force_login(user)
+    for name, url in admin_urls().items():
+        results[name] = measure(staff, url, iterations, cold)
+    return results
+
+
+def load_baseline(path=BASELINE_FILE):
+    """Return the stored baseline, or an empty one"""
+    try:
+        with open(path, encoding='utf-8') as baseline:
+            return json.load(baseline)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(results, path=BASELINE_FILE):
+    """Store results as the new baseline"""
+    with open(path, 'w', encoding='utf-8') as baseline:
+        json.dump(results, baseline, indent=2, sort_keys=True)
+        baseline.write('\n')
+
+
+def regressions(results, baseline, tolerance=None):
+    """List every benchmark that needs more queries than its baseline.
+
+    Timings depend on the machine, so the median is only compared when a
+    tolerance (the allowed slowdown as a fraction) is given, e.g. when
+    checking against a baseline recorded on the same host.
+    """
+    found = []
+    for name, result in sorted(results.items()):
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        if result['queries'] > expected['queries']:
+            found.append(f"{name}: {result['queries']} queries (baseline {expected['queries']})")
+        if tolerance is not None and result['p50_ms'] > expected['p50_ms'] * (1 + tolerance):
+            found.append(f"{name}: p50 {result['p50_ms']}ms (baseline {expected['p50_ms']}ms)")
+    return found
+
+
+def format_results(results):
+    """Render results as a plain text table"""
+    lines = [f"{'benchmark':<28}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}"]
+    for name, result in sorted(results.items()):
+        lines.append(
+            f"{name:<28}{result['p50_ms']:>10}{result['p95_ms']:>10}"
+            f"{result['p99_ms']:>10}{result['queries']:>9}"
+        )
+    return '\n'.join(lines)
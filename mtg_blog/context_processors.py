@@ -1,12 +1,15 @@
-from django.db.models import Count
-from .models import Topic
+from .topic_cache import aget_top_topics, get_top_topics
+
+SIDEBAR_TOPICS = 5
 
 def base_context(request):
-    """Calculate Number of posts per Topic"""
-    top_topics = (Topic.objects
-    .annotate(post_count=Count('posts')
-    ).filter(post_count__gt = 0
-    ).order_by('-post_count')[:5]
-)
+    """Top topics for the sidebar, served from the shared cache"""
+    top_topics = getattr(request, 'top_topics', None)
+    if top_topics is None:
+        top_topics = get_top_topics(limit=SIDEBAR_TOPICS, min_posts=1)
 
     return {'top_topics' : top_topics,}
+
+async def aload_base_context(request):
+    """Load the sidebar data ahead of rendering, so an async view never queries while rendering"""
+    request.top_topics = await aget_top_topics(limit=SIDEBAR_TOPICS, min_posts=1)
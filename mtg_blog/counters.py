@@ -0,0 +1,183 @@
+"""Incremental upkeep of the denormalized post and comment counters"""
+from django.db import connection
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import ArchivedComment, Comment, Post, Topic, TopicPostActivity
+
+PUBLISHED = 'published'
+
+
+def adjust_topic_counts(topic_ids, posts, published, sign=1):
+    """Add (or with sign=-1 remove) posts to the counters of the given topics"""
+    if not topic_ids or not posts:
+        return
+    Topic.objects.filter(pk__in=topic_ids).update(
+        post_count=F('post_count') + sign * posts,
+        published_post_count=F('published_post_count') + sign * published,
+    )
+
+
+def post_status_changed(post, previous_status):
+    """Move a post between the published and unpublished counters"""
+    was_published = previous_status == PUBLISHED
+    is_published = post.status == PUBLISHED
+    if was_published == is_published:
+        return
+    Topic.objects.filter(posts=post).update(
+        published_post_count=F('published_post_count') + (1 if is_published else -1)
+    )
+
+
+def post_removed(post):
+    """Take a post that is about to be deleted off its topics' counters"""
+    topic_ids = list(Topic.objects.filter(posts=post).values_list('pk', flat=True))
+    adjust_topic_counts(topic_ids, 1, int(post.status == PUBLISHED), sign=-1)
+
+
+def post_links_removed(post_ids):
+    """Take posts that are about to be unlinked off every topic counter; return the topic ids"""
+    deltas = {}
+    links = (
+        Post.topics.through.objects.filter(post_id__in=post_ids)
+        .values('topic_id')
+        .annotate(posts=Count('post_id'), published=Count('post_id', filter=Q(post__status=PUBLISHED)))
+    )
+    for row in links:
+        deltas.setdefault((row['posts'], row['published']), []).append(row['topic_id'])
+    # One UPDATE per distinct change rather than one per topic
+    for (posts, published), topic_ids in deltas.items():
+        adjust_topic_counts(topic_ids, posts, published, sign=-1)
+    return [topic_id for topic_ids in deltas.values() for topic_id in topic_ids]
+
+
+def post_topics_linked(post, topic_ids, sign=1):
+    """Count a post in (or out of) the given topics"""
+    adjust_topic_counts(topic_ids, 1, int(post.status == PUBLISHED), sign)
+
+
+def topic_posts_linked(topic, post_ids, sign=1):
+    """Count the given posts in (or out of) a topic"""
+    post_ids = list(post_ids)
+    published = Post.objects.filter(pk__in=post_ids, status=PUBLISHED).count()
+    adjust_topic_counts([topic.pk], len(post_ids), published, sign)
+
+
+def reconcile_topic_counts(topic_ids=None):
+    """Recompute the counters from the through table in a single UPDATE.
+
+    Returns the number of topics that were updated.
+    """
+    links = (
+        Post.topics.through.objects
+        .filter(topic_id=OuterRef('pk'))
+        .order_by()
+        .values('topic_id')
+    )
+    total = links.annotate(total=Count('post_id')).values('total')
+    published = (
+        links.filter(post__status=PUBLISHED)
+        .annotate(total=Count('post_id'))
+        .values('total')
+    )
+    topics = Topic.objects.all()
+    if topic_ids is not None:
+        topics = topics.filter(pk__in=topic_ids)
+    return topics.update(
+        post_count=Coalesce(Subquery(total), Value(0)),
+        published_post_count=Coalesce(Subquery(published), Value(0)),
+    )
+
+
+def adjust_comment_counts(post_id, comments, approved, sign=1):
+    """Add (or with sign=-1 remove) comments on a post and its per-topic activity"""
+    if not comments and not approved:
+        return
+    changes = {
+        'comment_count': F('comment_count') + sign * comments,
+        'approved_comment_count': F('approved_comment_count') + sign * approved,
+    }
+    Post.objects.filter(pk=post_id).update(**changes)
+    TopicPostActivity.objects.filter(post_id=post_id).update(**changes)
+
+
+def comment_saved(comment, previous):
+    """Count a saved comment; previous is the (post_id, approved) it was counted as, if any"""
+    current = (comment.post_id, comment.approved)
+    if previous is None:
+        adjust_comment_counts(comment.post_id, 1, int(comment.approved))
+    elif previous[0] != current[0]:
+        adjust_comment_counts(previous[0], 1, int(previous[1]), sign=-1)
+        adjust_comment_counts(comment.post_id, 1, int(comment.approved))
+    elif previous[1] != current[1]:
+        adjust_comment_counts(comment.post_id, 0, 1, sign=1 if comment.approved else -1)
+
+
+def comment_removed(post_id, approved):
+    """Take a deleted comment off its post's counters"""
+    adjust_comment_counts(post_id, 1, int(approved), sign=-1)
+
+
+def activity_linked(post_ids, topic_ids):
+    """Start per-topic activity rows for posts that were just linked to topics"""
+    posts = Post.objects.filter(pk__in=post_ids).values_list(
+        'pk', 'comment_count', 'approved_comment_count')
+    TopicPostActivity.objects.bulk_create(
+        [
+            TopicPostActivity(
+                post_id=post_id, topic_id=topic_id,
+                comment_count=comments, approved_comment_count=approved,
+            )
+            for post_id, comments, approved in posts for topic_id in topic_ids
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def activity_unlinked(post_ids, topic_ids):
+    """Drop the per-topic activity rows of links that are being removed"""
+    TopicPostActivity.objects.filter(post_id__in=post_ids, topic_id__in=topic_ids).delete()
+
+
+def reconcile_comment_counts(post_ids=None):
+    """Recompute comment counters from hot and archived comments and rebuild the activity rows.
+
+    The counters are recomputed with one UPDATE. The activity rows are
+    rebuilt with one INSERT ... SELECT from the Post/Topic links, so bulk
+    loads that bypass signals can catch up without loading any rows into
+    Python. Returns the number of posts that were updated.
+    """
+    totals = {'comment_count': Value(0), 'approved_comment_count': Value(0)}
+    # Archived comments still count towards their post
+    for model in (Comment, ArchivedComment):
+        comments = model.objects.filter(post_id=OuterRef('pk')).order_by().values('post_id')
+        total = comments.annotate(total=Count('pk')).values('total')
+        approved = comments.filter(approved=True).annotate(total=Count('pk')).values('total')
+        totals['comment_count'] += Coalesce(Subquery(total), Value(0))
+        totals['approved_comment_count'] += Coalesce(Subquery(approved), Value(0))
+    posts = Post.objects.all()
+    activity = TopicPostActivity.objects.all()
+    if post_ids is not None:
+        post_ids = list(post_ids)
+        posts = posts.filter(pk__in=post_ids)
+        activity = activity.filter(post_id__in=post_ids)
+    updated = posts.update(**totals)
+
+    activity.delete()
+    quote = connection.ops.quote_name
+    sql = (
+        f'INSERT INTO {quote(TopicPostActivity._meta.db_table)} '
+        '(topic_id, post_id, comment_count, approved_comment_count) '
+        'SELECT link.topic_id, link.post_id, post.comment_count, post.approved_comment_count '
+        f'FROM {quote(Post.topics.through._meta.db_table)} link '
+        f'JOIN {quote(Post._meta.db_table)} post ON post.id = link.post_id'
+    )
+    params = []
+    if post_ids is not None:
+        if not post_ids:
+            return updated
+        sql += f' WHERE link.post_id IN ({", ".join(["%s"] * len(post_ids))})'
+        params = post_ids
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+    return updated
@@ -0,0 +1,120 @@
+"""RSS and Atom feeds of the latest published posts, site-wide and per topic.
+
+Feed views go through cache_response like the HTML pages. A poll whose
+ETag or Last-Modified still matches is answered with 304 from the cache
+alone, and other polls get the cached body until a published post
+changes.
+"""
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+
+from .models import Post, Topic
+from .response_cache import POSTS, TOPICS, cache_response, topic_dependency
+
+FEED_ITEMS = 20
+
+
+def _latest(posts):
+    return (
+        posts.filter(status='published', published__isnull=False)
+        .select_related('author')
+        .only('title', 'slug', 'excerpt', 'published', 'updated', 'author__username')
+        .order_by('-published', '-id')[:FEED_ITEMS]
+    )
+
+
+class _PostsFeed(Feed):
+    """Item fields shared by the site-wide and topic feeds"""
+
+    def item_title(self, item):
+        """Title of a post"""
+        return item.title
+
+    def item_description(self, item):
+        """Excerpt of a post"""
+        return item.excerpt
+
+    def item_author_name(self, item):
+        """Username of the post's author"""
+        return item.author.username
+
+    def item_pubdate(self, item):
+        """When the post was published"""
+        return item.published
+
+    def item_updateddate(self, item):
+        """When the post was last updated"""
+        return item.updated
+
+    def item_link(self, item):
+        """Link to the post"""
+        return item.get_absolute_url()
+
+
+class LatestPostsFeed(_PostsFeed):
+    """The latest published posts across the whole blog"""
+    title = 'MTG Blog'
+    description = 'The latest posts from MTG Blog'
+
+    def link(self):
+        """Link to the home page"""
+        return reverse('mtg_blog_app:home')
+
+    def items(self):
+        """The latest published posts"""
+        return _latest(Post.objects.all())
+
+
+class TopicPostsFeed(_PostsFeed):
+    """The latest published posts of one topic"""
+
+    def get_object(self, request, *args, **kwargs):
+        """The topic named in the URL"""
+        return get_object_or_404(Topic, slug=kwargs['slug'])
+
+    def title(self, obj):
+        """Title naming the topic"""
+        return f'MTG Blog: {obj.name}'
+
+    def description(self, obj):
+        """Description naming the topic"""
+        return f'The latest {obj.name} posts from MTG Blog'
+
+    def link(self, obj):
+        """Link to the topic page"""
+        return obj.get_absolute_url()
+
+    def items(self, obj):
+        """The latest published posts of the topic"""
+        return _latest(obj.posts.all())
+
+
+class LatestPostsAtomFeed(LatestPostsFeed):
+    """Atom version of LatestPostsFeed"""
+    feed_type = Atom1Feed
+    subtitle = LatestPostsFeed.description
+
+
+class TopicPostsAtomFeed(TopicPostsFeed):
+    """Atom version of TopicPostsFeed"""
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        """Same text as the description"""
+        return self.description(obj)
+
+
+def _site_feed(feed):
+    return cache_response(lambda request: [POSTS])(feed())
+
+
+def _topic_feed(feed):
+    return cache_response(lambda request, slug: [TOPICS, topic_dependency(slug)])(feed())
+
+
+latest_posts_rss = _site_feed(LatestPostsFeed)
+latest_posts_atom = _site_feed(LatestPostsAtomFeed)
+topic_posts_rss = _topic_feed(TopicPostsFeed)
+topic_posts_atom = _topic_feed(TopicPostsAtomFeed)
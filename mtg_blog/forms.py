@@ -1,6 +1,7 @@
 """Blog forms"""
 from django import forms
 from .models import PhotoSubmission
+from .uploadhandlers import MAX_PHOTO_SIZE, NOT_AN_IMAGE, TOO_LARGE
 
 class PhotoSubmissionForm(forms.ModelForm):
     """Form for Photo Submission"""
@@ -27,8 +28,8 @@ class PhotoSubmissionForm(forms.ModelForm):
         """Validate photo upload"""
         photo = self.cleaned_data.get('photo')
         if photo:
-            if photo.size > 5 * 1024 * 1024: #makes a 5MB limit
-                raise forms.ValidationError("Image file too large (5MB limit)")
+            if photo.size > MAX_PHOTO_SIZE:
+                raise forms.ValidationError(TOO_LARGE)
             if not photo.content_type.startswith('image/'):
-                raise forms.ValidationError("Image file must be an image file")
-        return photo
\ No newline at end of file
+                raise forms.ValidationError(NOT_AN_IMAGE)
+        return photo
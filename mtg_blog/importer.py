@@ -0,0 +1,246 @@
+"""Bulk import of topics, posts and comments from JSON Lines.
+
+Each line is one record::
+
+    {"type": "topic", "name": "Commander"}
+    {"type": "post", "title": "...", "author": "username", "status": "published",
+     "content": "...", "topics": ["Commander"], "slug": "optional", "published": "optional",
+     "created": "optional"}
+    {"type": "comment", "post": "post-slug", "name": "...", "email": "...", "text": "...",
+     "approved": true, "created": "optional"}
+
+Records are read in batches. Each batch is inserted with bulk_create in
+one transaction that also advances the source's ImportCheckpoint, so an
+interrupted import resumes after the last committed batch. An explicit
+slug is slugified; one that is empty, too long or already taken fails
+the batch with an ImportRecordError naming its line. Posts without a
+slug get the next free one from the slug allocator, so repeated titles
+do not collide.
+"""
+import json
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils.dateparse import parse_datetime
+from django.utils.text import slugify
+
+from .counters import reconcile_comment_counts, reconcile_topic_counts
+from .models import Comment, ImportCheckpoint, Post, Topic
+from .response_cache import COMMENTS, POSTS, TOPICS, invalidate
+from .sitemaps import post_shard_dependencies
+from .slugs import allocate_slugs
+from .topic_cache import invalidate_top_topics
+
+USER_CACHE_SIZE = 10_000
+
+
+class ImportRecordError(ValueError):
+    """A record that cannot be imported; carries its line number"""
+
+    def __init__(self, line, message):
+        super().__init__(f'line {line}: {message}')
+        self.line = line
+
+
+class ContentImporter:
+    """Import a JSON Lines stream in bounded-memory batches"""
+
+    def __init__(self, source, batch_size=1000):
+        self.source = source
+        self.batch_size = batch_size
+        self.topic_ids = dict(Topic.objects.values_list('name', 'pk'))
+        self.user_ids = {}
+        self.counts = {'topics': 0, 'posts': 0, 'comments': 0}
+
+    def checkpoint(self):
+        """Number of lines of this source already committed"""
+        return (
+            ImportCheckpoint.objects.filter(source=self.source)
+            .values_list('line', flat=True).first() or 0
+        )
+
+    def run(self, lines, restart=False, progress=None):
+        """Import every line after the checkpoint; return the record counts"""
+        done = 0 if restart else self.checkpoint()
+        numbered = islice(enumerate(lines, start=1), done, None)
+        while True:
+            batch = list(islice(numbered, self.batch_size))
+            if not batch:
+                break
+            records = [
+                (number, self._parse(number, line)) for number, line in batch if line.strip()
+            ]
+            with transaction.atomic():
+                self._import_batch(records)
+                ImportCheckpoint.objects.update_or_create(
+                    source=self.source, defaults={'line': batch[-1][0]})
+            if progress:
+                progress(batch[-1][0], self.counts)
+
+        reconcile_topic_counts()
+        invalidate_top_topics()
+        invalidate(TOPICS, POSTS, COMMENTS)
+        return self.counts
+
+    @staticmethod
+    def _parse(number, line):
+        try:
+            record = json.loads(line)
+        except ValueError as error:
+            raise ImportRecordError(number, f'invalid JSON ({error})') from error
+        if not isinstance(record, dict) or record.get('type') not in ('topic', 'post', 'comment'):
+            raise ImportRecordError(number, 'record needs a "type" of topic, post or comment')
+        return record
+
+    def _import_batch(self, records):
+        by_type = {'topic': [], 'post': [], 'comment': []}
+        for number, record in records:
+            by_type[record['type']].append((number, record))
+
+        names = {record['name'] for _, record in by_type['topic']}
+        names.update(name for _, record in by_type['post'] for name in record.get('topics', ()))
+        self._ensure_topics(names)
+        post_ids = self._import_posts(by_type['post'])
+        commented = self._import_comments(by_type['comment'], post_ids)
+        # bulk_create skips the comment signals, so recount the touched posts
+        reconcile_comment_counts(set(post_ids.values()) | commented)
+        invalidate(*post_shard_dependencies(post_ids.values()))
+
+    def _ensure_topics(self, names):
+        missing = sorted(name for name in names if name not in self.topic_ids)
+        if not missing:
+            return
+        Topic.objects.bulk_create(
+            [
+                Topic(name=name, slug=slug)
+                for name, slug in zip(missing, allocate_slugs(Topic, missing))
+            ],
+            ignore_conflicts=True,
+        )
+        self.topic_ids.update(Topic.objects.filter(name__in=missing).values_list('name', 'pk'))
+        self.counts['topics'] += len(missing)
+
+    def _author_id(self, number, username):
+        if username not in self.user_ids:
+            if len(self.user_ids) >= USER_CACHE_SIZE:
+                self.user_ids.clear()
+            self.user_ids[username] = (
+                User.objects.filter(username=username).values_list('pk', flat=True).first())
+        if self.user_ids[username] is None:
+            raise ImportRecordError(number, f'unknown author {username!r}')
+        return self.user_ids[username]
+
+    def _import_posts(self, records):
+        """Insert posts and their topic links; return {slug: id} for the batch"""
+        named, unnamed = [], []
+        for number, record in records:
+            try:
+                post = Post(
+                    title=record['title'],
+                    slug=_explicit_slug(number, record.get('slug')),
+                    content=record.get('content', ''),
+                    status=record.get('status', 'draft'),
+                    published=_datetime(number, record.get('published')),
+                    author_id=self._author_id(number, record['author']),
+                )
+            except KeyError as error:
+                raise ImportRecordError(number, f'post is missing {error}') from error
+            post.prepare_for_save()
+            post.import_created = _datetime(number, record.get('created'))
+            post.import_topics = record.get('topics', ())
+            post.import_line = number
+            (named if post.slug else unnamed).append(post)
+
+        _check_slugs_free(named)
+        for post, slug in zip(unnamed, allocate_slugs(Post, [post.title for post in unnamed])):
+            post.slug = slug
+        # Slugs are checked again by the insert, so a concurrent writer that
+        # took one fails the batch (and its checkpoint) rather than silently
+        # dropping the post.
+        posts = Post.objects.bulk_create(named + unnamed)
+        topics = {post.slug: post.import_topics for post in posts}
+        created = {post.slug: post.import_created for post in posts if post.import_created}
+
+        slugs = [post.slug for post in posts]
+        post_ids = dict(Post.objects.filter(slug__in=slugs).values_list('slug', 'pk'))
+        self.counts['posts'] += len(posts)
+        _restore_created(Post, {post_ids[slug]: value for slug, value in created.items()})
+
+        through = Post.topics.through
+        through.objects.bulk_create(
+            [
+                through(post_id=post_ids[slug], topic_id=self.topic_ids[name])
+                for slug, names in topics.items() for name in names
+            ],
+            ignore_conflicts=True,
+        )
+        return post_ids
+
+    def _import_comments(self, records, post_ids):
+        """Insert comments; return the ids of the posts they belong to"""
+        wanted = {record.get('post') for _, record in records} - set(post_ids)
+        if wanted:
+            post_ids = {**post_ids, **dict(
+                Post.objects.filter(slug__in=wanted).values_list('slug', 'pk'))}
+        comments, created = [], []
+        for number, record in records:
+            if record.get('post') not in post_ids:
+                raise ImportRecordError(number, f'unknown post {record.get("post")!r}')
+            try:
+                comments.append(Comment(
+                    post_id=post_ids[record['post']],
+                    name=record['name'],
+                    email=record['email'],
+                    text=record['text'],
+                    approved=bool(record.get('approved', False)),
+                ))
+            except KeyError as error:
+                raise ImportRecordError(number, f'comment is missing {error}') from error
+            created.append(_datetime(number, record.get('created')))
+        comments = Comment.objects.bulk_create(comments)
+        self.counts['comments'] += len(comments)
+        _restore_created(Comment, {
+            comment.pk: value for comment, value in zip(comments, created)
+            if value is not None and comment.pk is not None
+        })
+        return {comment.post_id for comment in comments}
+
+
+def _explicit_slug(number, value):
+    if value in (None, ''):
+        return ''
+    slug = slugify(str(value))
+    max_length = Post._meta.get_field('slug').max_length
+    if not slug or len(slug) > max_length:
+        raise ImportRecordError(number, f'invalid slug {value!r}')
+    return slug
+
+
+def _check_slugs_free(posts):
+    """Fail on an explicit slug used twice in the batch or by an existing post"""
+    taken = set(
+        Post.objects.filter(slug__in=[post.slug for post in posts]).values_list('slug', flat=True))
+    for post in posts:
+        if post.slug in taken:
+            raise ImportRecordError(post.import_line, f'slug {post.slug!r} is already taken')
+        taken.add(post.slug)
+
+
+def _datetime(number, value):
+    if value in (None, ''):
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ImportRecordError(number, f'invalid date {value!r}')
+    return parsed
+
+
+def _restore_created(model, values):
+    """Write imported creation times over the auto_now_add value in one UPDATE"""
+    if values:
+        model.objects.filter(pk__in=values).update(created=Case(
+            *[When(pk=pk, then=Value(value)) for pk, value in values.items()],
+            output_field=DateTimeField(),
+        ))
@@ -0,0 +1,149 @@
+"""Per-request SQL instrumentation and N+1 query detection"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('mtg_blog.sql')
+
+DEFAULT_N_PLUS_ONE_THRESHOLD = 5
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """Reduce a statement to a fingerprint that ignores literal values"""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _PLACEHOLDER_LIST.sub('(?...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+class QueryRecorder:
+    """Execute wrapper that counts, times and fingerprints every statement"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(  # pylint: disable=too-many-positional-arguments
+            self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[normalize_sql(sql)] += 1
+
+    def repeated(self, threshold=DEFAULT_N_PLUS_ONE_THRESHOLD):
+        """Statements run more than `threshold` times: likely N+1 queries"""
+        return {sql: count for sql, count in self.fingerprints.most_common() if count > threshold}
+
+    @contextmanager
+    def record(self):
+        """Record every query on every database connection inside the block"""
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield self
+
+
+class SQLInstrumentationMiddleware:  # pylint: disable=too-few-public-methods
+    """Report query count, database time and likely N+1 patterns per request.
+
+    Enabled with the MTG_SQL_INSTRUMENTATION setting. Results are added as
+    a Server-Timing header and logged to the ``mtg_blog.sql`` logger, at
+    WARNING level when a statement repeats more than
+    MTG_SQL_N_PLUS_ONE_THRESHOLD times.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'MTG_SQL_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = getattr(
+            settings, 'MTG_SQL_N_PLUS_ONE_THRESHOLD', DEFAULT_N_PLUS_ONE_THRESHOLD)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        with recorder.record():
+            response = self.get_response(request)
+        return self.report(request, response, recorder)
+
+    async def __acall__(self, request):
+        """Async version of __call__.
+
+        The ORM runs async queries on a worker thread with that thread's
+        connections, so the recorder is attached there rather than here.
+        """
+        recorder = QueryRecorder()
+        stack = ExitStack()
+        await sync_to_async(stack.enter_context)(recorder.record())
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.report(request, response, recorder)
+
+    def report(self, request, response, recorder):
+        """Add the Server-Timing header and log what the request ran"""
+        repeated = recorder.repeated(self.threshold)
+        db_ms = recorder.duration * 1000
+        timing = f'db;dur={db_ms:.2f};desc="{recorder.count} queries"'
+        if repeated:
+            timing += f', n-plus-one;desc="{max(repeated.values())} repeats"'
+        existing = response.get('Server-Timing')
+        response['Server-Timing'] = f'{existing}, {timing}' if existing else timing
+
+        details = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': recorder.count,
+            'db_ms': round(db_ms, 2),
+            'n_plus_one': [{'sql': sql, 'count': count} for sql, count in repeated.items()],
+        }
+        level = logging.WARNING if repeated else logging.INFO
+        logger.log(level, 'sql %s %s: %s queries in %.2fms', request.method, request.path,
+                   recorder.count, db_ms, extra={'sql_stats': details})
+        return response
+
+
+@contextmanager
+def query_budget(max_queries, max_repeats=DEFAULT_N_PLUS_ONE_THRESHOLD):
+    """Fail if the block runs more than `max_queries` queries or repeats a statement.
+
+    Usage in tests::
+
+        with query_budget(3):
+            client.get(url)
+    """
+    recorder = QueryRecorder()
+    with recorder.record():
+        yield recorder
+    problems = []
+    if recorder.count > max_queries:
+        problems.append(f'{recorder.count} queries run, budget is {max_queries}')
+    for sql, count in recorder.repeated(max_repeats).items():
+        problems.append(f'likely N+1, run {count} times: {sql}')
+    if problems:
+        raise AssertionError('\n'.join(problems))
@@ -0,0 +1,27 @@
+"""Most-commented posts, read from the maintained comment counters.
+
+Post.comment_count and Post.approved_comment_count change with every
+comment save and delete (see counters.py). Per-topic rankings read
+TopicPostActivity, which copies both counters onto each Post/Topic link.
+Each counter has a descending index, so a top-N query is one index
+seek plus N rows and does not aggregate over the comments table.
+"""
+from .models import Post
+
+COUNTERS = {False: 'comment_count', True: 'approved_comment_count'}
+
+
+def top_posts(limit=10, topic=None, approved_only=False):
+    """Return the `limit` most commented posts, overall or within one topic.
+
+    With approved_only the ranking counts approved comments only,
+    which suits public listings.
+    """
+    counter = COUNTERS[bool(approved_only)]
+    if topic is None:
+        return Post.objects.order_by(f'-{counter}', '-id')[:limit]
+    return (
+        Post.objects
+        .filter(topic_activity__topic=topic)
+        .order_by(f'-topic_activity__{counter}', '-topic_activity__post_id')[:limit]
+    )
@@ -0,0 +1,33 @@
+"""Move old approved comments into the archive table"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from mtg_blog.archive import archive_comments
+
+
+class Command(BaseCommand):
+    """Archive approved comments older than a cutoff in batches"""
+    help = 'Move approved comments older than --days days from Comment to ArchivedComment'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='Archive approved comments created more than this many days ago (default 365)',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of comments moved per transaction (default 1000)',
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 0 or options['batch_size'] < 1:
+            raise CommandError('--days must not be negative and --batch-size must be at least 1')
+        cutoff = timezone.now() - timedelta(days=options['days'])
+
+        def progress(moved):
+            self.stdout.write(f'Archived {moved} comments')
+
+        moved = archive_comments(cutoff, batch_size=options['batch_size'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(f'Archived {moved} comments created before {cutoff:%Y-%m-%d}'))
@@ -0,0 +1,32 @@
+"""Move existing contest photos into content-addressed storage"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from mtg_blog.models import PhotoFile, PhotoSubmission
+from mtg_blog.storage import is_hashed_name
+
+
+class Command(BaseCommand):
+    """Re-store photos saved before content addressing under their hash"""
+    help = 'Store existing contest photos by content hash so duplicates share one file'
+
+    def handle(self, *args, **options):
+        storage = PhotoSubmission._meta.get_field('photo').storage
+        moved = missing = 0
+        for submission in PhotoSubmission.objects.exclude(photo='').order_by('pk').iterator():
+            old_name = submission.photo.name
+            if is_hashed_name(old_name):
+                continue
+            if not storage.exists(old_name):
+                missing += 1
+                continue
+            with transaction.atomic(), storage.open(old_name, 'rb') as original:
+                PhotoFile.lock([storage.hashed_name(old_name, original)])
+                new_name = storage.save(old_name, original)
+                PhotoSubmission.objects.filter(pk=submission.pk).update(photo=new_name)
+            if not PhotoSubmission.objects.filter(photo=old_name).exists():
+                storage.delete(old_name)
+            moved += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Moved {moved} photos into content-addressed storage ({missing} missing files)'
+        ))
@@ -0,0 +1,37 @@
+"""Pre-render the public pages to static HTML"""
+from django.core.management.base import BaseCommand
+
+from mtg_blog.static_export import export_site
+
+
+class Command(BaseCommand):
+    """Render home, topic_list and every topic_detail page to disk"""
+    help = (
+        'Render the home page, the topic list and every topic page to HTML files '
+        'a web server can serve directly (home/index.html, topics/index.html, topic/<slug>.html '
+        'and topic/<slug>/page-<n>.html)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Directory to write the HTML files to')
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Number of processes rendering pages in parallel (default 4)',
+        )
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help='Only re-render topics that changed since the last export',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Pages rendered per worker task (default 100)',
+        )
+
+    def handle(self, *args, **options):
+        written = export_site(
+            options['output'],
+            workers=options['workers'],
+            incremental=options['incremental'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Exported {written} pages to {options["output"]}'))
@@ -0,0 +1,52 @@
+"""Backfill resized variants for existing contest photos"""
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from mtg_blog.models import PhotoSubmission
+from mtg_blog.photo_variants import generate_variants
+
+
+def _generate(submission_id):
+    try:
+        return generate_variants(submission_id)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    """Generate thumbnail, preview and web variants in parallel"""
+    help = 'Generate resized variants for photo submissions that do not have them yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Number of images processed in parallel (default 4)',
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Regenerate variants for every submission, not only pending and failed ones',
+        )
+
+    def handle(self, *args, **options):
+        submissions = PhotoSubmission.objects.exclude(photo='')
+        if not options['all']:
+            submissions = submissions.exclude(variants_status=PhotoSubmission.VARIANTS_READY)
+        ids = list(submissions.order_by('pk').values_list('pk', flat=True))
+
+        results = {PhotoSubmission.VARIANTS_READY: 0, PhotoSubmission.VARIANTS_FAILED: 0}
+        if options['workers'] > 1:
+            # Pillow releases the GIL while decoding, resizing and encoding
+            with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+                statuses = list(pool.map(_generate, ids))
+        else:
+            statuses = [generate_variants(pk) for pk in ids]
+        for status in statuses:
+            if status in results:
+                results[status] += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated variants for {results[PhotoSubmission.VARIANTS_READY]} photos "
+            f"({results[PhotoSubmission.VARIANTS_FAILED]} failed)"
+        ))
@@ -0,0 +1,45 @@
+"""Bulk import topics, posts and comments from a JSON Lines file"""
+from django.core.management.base import BaseCommand, CommandError
+
+from mtg_blog.importer import ContentImporter, ImportRecordError
+
+
+class Command(BaseCommand):
+    """Stream a JSONL export into the blog in resumable batches"""
+    help = 'Import topics, posts and comments from a JSON Lines file, resuming from the last checkpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='JSON Lines file to import')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of lines committed per transaction (default 1000)',
+        )
+        parser.add_argument(
+            '--source-name', default=None,
+            help='Checkpoint key for this import (defaults to the file path)',
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Ignore the saved checkpoint and import from the first line',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        importer = ContentImporter(
+            options['source_name'] or options['path'], batch_size=options['batch_size'])
+
+        def progress(line, counts):
+            self.stdout.write(f"Committed through line {line} ({counts['posts']} posts so far)")
+
+        try:
+            with open(options['path'], encoding='utf-8') as lines:
+                counts = importer.run(lines, restart=options['restart'], progress=progress)
+        except OSError as error:
+            raise CommandError(error) from error
+        except ImportRecordError as error:
+            raise CommandError(f'{error} (earlier batches were kept; re-run to resume)') from error
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {counts['topics']} topics, {counts['posts']} posts "
+            f"and {counts['comments']} comments"
+        ))
@@ -0,0 +1,65 @@
+"""Delete posts matching a filter, with their comments, in short batches"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from mtg_blog.models import Post
+from mtg_blog.purge import purge_posts
+
+
+class Command(BaseCommand):
+    """Purge posts by status, age and author without long write locks"""
+    help = 'Delete posts matching the given filters, together with their comments and topic links'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--status', choices=[value for value, _ in Post.STATUS_CHOICES])
+        parser.add_argument(
+            '--older-than', type=int, metavar='DAYS',
+            help='Only posts created more than DAYS days ago',
+        )
+        parser.add_argument('--author', help='Only posts by this username')
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Allow purging without any filter',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Rows deleted per transaction (default 500)',
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0,
+            help='Seconds to sleep between batches to leave room for other writers',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report how many posts match',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.all()
+        if options['status']:
+            posts = posts.filter(status=options['status'])
+        if options['older_than'] is not None:
+            posts = posts.filter(created__lt=timezone.now() - timedelta(days=options['older_than']))
+        if options['author']:
+            posts = posts.filter(author__username=options['author'])
+        filtered = options['status'] or options['older_than'] is not None or options['author']
+        if not filtered and not options['all']:
+            raise CommandError('Give --status, --older-than or --author, or --all to purge every post')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        if options['dry_run']:
+            self.stdout.write(f'{posts.count()} posts would be purged')
+            return
+
+        def progress(totals):
+            self.stdout.write(
+                f"Purged {totals['posts']} posts, {totals['comments']} comments, "
+                f"{totals['links']} topic links"
+            )
+
+        totals = purge_posts(
+            posts, batch_size=options['batch_size'], pause=options['pause'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(f"Purge complete ({totals['posts']} posts)"))
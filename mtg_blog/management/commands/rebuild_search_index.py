@@ -0,0 +1,22 @@
+"""Rebuild the post full-text search index"""
+from django.core.management.base import BaseCommand
+
+from mtg_blog.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    """Reload the search index from mtg_blog_post in batches"""
+    help = 'Rebuild the full-text search index over posts in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of posts indexed per statement (default 1000)',
+        )
+
+    def handle(self, *args, **options):
+        def progress(indexed):
+            self.stdout.write(f'Indexed {indexed} posts')
+
+        indexed = rebuild_search_index(batch_size=options['batch_size'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(f'Search index rebuilt ({indexed} posts)'))
@@ -0,0 +1,13 @@
+"""Recompute the stored comment counters on every Post"""
+from django.core.management.base import BaseCommand
+
+from mtg_blog.counters import reconcile_comment_counts
+
+
+class Command(BaseCommand):
+    """Reconcile Post.comment_count, Post.approved_comment_count and TopicPostActivity"""
+    help = 'Recompute the stored comment counters of every post and the per-topic activity rows'
+
+    def handle(self, *args, **options):
+        updated = reconcile_comment_counts()
+        self.stdout.write(self.style.SUCCESS(f'Reconciled comment counts for {updated} posts'))
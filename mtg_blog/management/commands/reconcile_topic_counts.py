@@ -0,0 +1,15 @@
+"""Recompute the stored post counters on every Topic"""
+from django.core.management.base import BaseCommand
+
+from mtg_blog.counters import reconcile_topic_counts
+from mtg_blog.topic_cache import invalidate_top_topics
+
+
+class Command(BaseCommand):
+    """Reconcile Topic.post_count and Topic.published_post_count"""
+    help = 'Recompute the stored post counters of every topic from the Post/Topic links'
+
+    def handle(self, *args, **options):
+        updated = reconcile_topic_counts()
+        invalidate_top_topics()
+        self.stdout.write(self.style.SUCCESS(f'Reconciled post counts for {updated} topics'))
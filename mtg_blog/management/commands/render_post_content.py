@@ -0,0 +1,28 @@
+"""Render the stored HTML and excerpt of existing posts"""
+from django.core.management.base import BaseCommand
+
+from mtg_blog.models import Post
+from mtg_blog.rendering import render_posts
+
+
+class Command(BaseCommand):
+    """Backfill Post.content_html and Post.excerpt in batches"""
+    help = 'Render the sanitized HTML and excerpt of posts that do not have them yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of posts rendered per transaction (default 500)',
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Render every post again, e.g. after the sanitizer rules changed',
+        )
+
+    def handle(self, *args, **options):
+        def progress(rendered):
+            self.stdout.write(f'Rendered {rendered} posts')
+
+        rendered = render_posts(
+            Post, batch_size=options['batch_size'], everything=options['all'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(f'Post content rendered ({rendered} posts)'))
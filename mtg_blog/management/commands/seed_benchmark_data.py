@@ -0,0 +1,43 @@
+"""Fill the database with generated data for benchmarking"""
+from django.core.management.base import BaseCommand
+
+from mtg_blog.benchmarks.data import seed
+
+
+class Command(BaseCommand):
+    """Bulk-insert users, topics, posts, comments and photo submissions"""
+    help = 'Generate benchmark data with bulk inserts (1k to 1M posts)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--topics', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--comments-per-post', type=float, default=3,
+                            help='Average number of comments per post')
+        parser.add_argument('--photos', type=int, default=100)
+        parser.add_argument('--topics-per-post', type=int, default=2)
+        parser.add_argument('--skew', type=float, default=1.1,
+                            help='Zipf exponent of topic popularity (0 for uniform)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Random seed; also keeps names unique between runs')
+
+    def handle(self, *args, **options):
+        def progress(done):
+            self.stdout.write(f'Inserted {done} of {options["posts"]} posts')
+
+        summary = seed(
+            users=options['users'],
+            topics=options['topics'],
+            posts=options['posts'],
+            comments_per_post=options['comments_per_post'],
+            photos=options['photos'],
+            topics_per_post=options['topics_per_post'],
+            skew=options['skew'],
+            batch_size=options['batch_size'],
+            seed_value=options['seed'],
+            progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            'Created ' + ', '.join(f'{count} {name}' for name, count in summary.items())
+        ))
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.3 on 2026-10-18 08:13
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_post_counts(apps, schema_editor):
+    Topic = apps.get_model('mtg_blog', 'Topic')
+    Post = apps.get_model('mtg_blog', 'Post')
+    links = Post.topics.through.objects.filter(topic_id=OuterRef('pk')).order_by().values('topic_id')
+    total = links.annotate(total=Count('post_id')).values('total')
+    published = links.filter(post__status='published').annotate(total=Count('post_id')).values('total')
+    Topic.objects.update(
+        post_count=Coalesce(Subquery(total), Value(0)),
+        published_post_count=Coalesce(Subquery(published), Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mtg_blog', '0005_rename_image_photosubmission_photo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='topic',
+            name='post_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='topic',
+            name='published_post_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='topic',
+            index=models.Index(fields=['-post_count', 'name'], name='topic_post_count_idx'),
+        ),
+        migrations.RunPython(fill_post_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,70 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+# The search index as it was when this migration was written, so later
+# changes to mtg_blog.search do not change what it does
+
+SQLITE_INDEX = [
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS mtg_blog_post_fts USING fts5(
+        title, content,
+        content='mtg_blog_post', content_rowid='id',
+        tokenize='porter unicode61', prefix='2 3'
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS mtg_blog_post_fts_insert AFTER INSERT ON mtg_blog_post BEGIN
+        INSERT INTO mtg_blog_post_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS mtg_blog_post_fts_delete AFTER DELETE ON mtg_blog_post BEGIN
+        INSERT INTO mtg_blog_post_fts(mtg_blog_post_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS mtg_blog_post_fts_update AFTER UPDATE OF title, content ON mtg_blog_post BEGIN
+        INSERT INTO mtg_blog_post_fts(mtg_blog_post_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO mtg_blog_post_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    ''',
+]
+
+
+def build_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for statement in SQLITE_INDEX:
+            schema_editor.execute(statement)
+        schema_editor.execute("INSERT INTO mtg_blog_post_fts(mtg_blog_post_fts) VALUES ('rebuild')")
+    elif vendor == 'postgresql':
+        document = (
+            SearchVector('title', weight='A', config='english')
+            + SearchVector('content', weight='B', config='english')
+        )
+        schema_editor.add_index(
+            apps.get_model('mtg_blog', 'Post'), GinIndex(document, name='post_search_idx'))
+
+
+def remove_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for name in ('insert', 'delete', 'update'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS mtg_blog_post_fts_{name}')
+        schema_editor.execute('DROP TABLE IF EXISTS mtg_blog_post_fts')
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS post_search_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mtg_blog', '0007_post_comment_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_search_index, remove_search_index),
+    ]
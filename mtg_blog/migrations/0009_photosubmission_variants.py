@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-18 08:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mtg_blog', '0008_post_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photosubmission',
+            name='preview',
+            field=models.ImageField(blank=True, editable=False, upload_to=''),
+        ),
+        migrations.AddField(
+            model_name='photosubmission',
+            name='thumbnail',
+            field=models.ImageField(blank=True, editable=False, upload_to=''),
+        ),
+        migrations.AddField(
+            model_name='photosubmission',
+            name='variants_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='photosubmission',
+            name='web_photo',
+            field=models.ImageField(blank=True, editable=False, upload_to=''),
+        ),
+    ]
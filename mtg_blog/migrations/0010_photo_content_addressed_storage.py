@@ -0,0 +1,34 @@
+# Generated by Django 5.2.3 on 2026-10-18 08:22
+
+import mtg_blog.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mtg_blog', '0009_photosubmission_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='photosubmission',
+            name='photo',
+            field=models.ImageField(db_index=True, help_text='Upload your contest photo', storage=mtg_blog.storage.photo_storage, upload_to='contest_photos/'),
+        ),
+        migrations.AlterField(
+            model_name='photosubmission',
+            name='preview',
+            field=models.ImageField(blank=True, editable=False, storage=mtg_blog.storage.photo_storage, upload_to=''),
+        ),
+        migrations.AlterField(
+            model_name='photosubmission',
+            name='thumbnail',
+            field=models.ImageField(blank=True, editable=False, storage=mtg_blog.storage.photo_storage, upload_to=''),
+        ),
+        migrations.AlterField(
+            model_name='photosubmission',
+            name='web_photo',
+            field=models.ImageField(blank=True, editable=False, storage=mtg_blog.storage.photo_storage, upload_to=''),
+        ),
+    ]
@@ -0,0 +1,119 @@
+# Generated by Django 5.2.3 on 2026-10-18 08:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+# The search triggers as they were when this migration was written, so
+# later changes to mtg_blog.search do not change what it does
+SEARCH_TRIGGERS = [
+    '''
+    CREATE TRIGGER IF NOT EXISTS mtg_blog_post_fts_insert AFTER INSERT ON mtg_blog_post BEGIN
+        INSERT INTO mtg_blog_post_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS mtg_blog_post_fts_delete AFTER DELETE ON mtg_blog_post BEGIN
+        INSERT INTO mtg_blog_post_fts(mtg_blog_post_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS mtg_blog_post_fts_update AFTER UPDATE OF title, content ON mtg_blog_post BEGIN
+        INSERT INTO mtg_blog_post_fts(mtg_blog_post_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO mtg_blog_post_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    ''',
+]
+
+
+def reinstall_search_triggers(apps, schema_editor):
+    # Adding columns remakes mtg_blog_post on SQLite, which drops the search triggers
+    if schema_editor.connection.vendor == 'sqlite':
+        for trigger in SEARCH_TRIGGERS:
+            schema_editor.execute(trigger)
+
+
+def fill_comment_counts(apps, schema_editor):
+    Post = apps.get_model('mtg_blog', 'Post')
+    Comment = apps.get_model('mtg_blog', 'Comment')
+    TopicPostActivity = apps.get_model('mtg_blog', 'TopicPostActivity')
+    comments = Comment.objects.filter(post_id=OuterRef('pk')).order_by().values('post_id')
+    total = comments.annotate(total=Count('pk')).values('total')
+    approved = comments.filter(approved=True).annotate(total=Count('pk')).values('total')
+    Post.objects.update(
+        comment_count=Coalesce(Subquery(total), Value(0)),
+        approved_comment_count=Coalesce(Subquery(approved), Value(0)),
+    )
+    quote = schema_editor.quote_name
+    schema_editor.execute(
+        f'INSERT INTO {quote(TopicPostActivity._meta.db_table)} '
+        '(topic_id, post_id, comment_count, approved_comment_count) '
+        'SELECT link.topic_id, link.post_id, post.comment_count, post.approved_comment_count '
+        f'FROM {quote(Post.topics.through._meta.db_table)} link '
+        f'JOIN {quote(Post._meta.db_table)} post ON post.id = link.post_id'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mtg_blog', '0011_importcheckpoint'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TopicPostActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('comment_count', models.IntegerField(default=0)),
+                ('approved_comment_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='approved_comment_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-comment_count', '-id'], name='post_comment_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-approved_comment_count', '-id'], name='post_approved_count_idx'),
+        ),
+        migrations.AddField(
+            model_name='topicpostactivity',
+            name='post',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='topic_activity', to='mtg_blog.post'),
+        ),
+        migrations.AddField(
+            model_name='topicpostactivity',
+            name='topic',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_activity', to='mtg_blog.topic'),
+        ),
+        migrations.AddIndex(
+            model_name='topicpostactivity',
+            index=models.Index(fields=['topic', '-comment_count', '-post'], name='activity_comment_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='topicpostactivity',
+            index=models.Index(fields=['topic', '-approved_comment_count', '-post'], name='activity_approved_count_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='topicpostactivity',
+            constraint=models.UniqueConstraint(fields=('post', 'topic'), name='activity_post_topic_uniq'),
+        ),
+        migrations.RunPython(fill_comment_counts, migrations.RunPython.noop),
+        migrations.RunPython(reinstall_search_triggers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.3 on 2026-10-18 08:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mtg_blog', '0012_comment_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedComment',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100)),
+                ('email', models.EmailField(max_length=254)),
+                ('text', models.TextField(max_length=500)),
+                ('approved', models.BooleanField(default=True)),
+                ('created', models.DateTimeField()),
+                ('updated', models.DateTimeField()),
+                ('archived', models.DateTimeField(auto_now_add=True)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_comments', to='mtg_blog.post')),
+            ],
+            options={
+                'ordering': ['-created'],
+                'indexes': [models.Index(fields=['post', '-created'], name='archived_post_created_idx')],
+            },
+        ),
+    ]
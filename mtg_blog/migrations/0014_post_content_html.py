@@ -0,0 +1,166 @@
+# Generated by Django 5.2.3 on 2026-10-18 09:12
+
+import re
+from html import escape
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+from django.db import migrations, models, transaction
+from django.utils.html import linebreaks
+from django.utils.text import Truncator
+
+# The search triggers and the renderer as they were when this migration
+# was written, so later changes to mtg_blog.search and mtg_blog.rendering
+# do not change what it does.
+
+SEARCH_TRIGGERS = [
+    '''
+    CREATE TRIGGER IF NOT EXISTS mtg_blog_post_fts_insert AFTER INSERT ON mtg_blog_post BEGIN
+        INSERT INTO mtg_blog_post_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS mtg_blog_post_fts_delete AFTER DELETE ON mtg_blog_post BEGIN
+        INSERT INTO mtg_blog_post_fts(mtg_blog_post_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS mtg_blog_post_fts_update AFTER UPDATE OF title, content ON mtg_blog_post BEGIN
+        INSERT INTO mtg_blog_post_fts(mtg_blog_post_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO mtg_blog_post_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    ''',
+]
+
+EXCERPT_WORDS = 30
+ALLOWED_TAGS = {
+    'a', 'b', 'blockquote', 'br', 'code', 'em', 'h2', 'h3', 'h4', 'hr', 'i', 'li', 'ol',
+    'p', 'pre', 's', 'strong', 'u', 'ul',
+}
+ALLOWED_ATTRIBUTES = {'a': {'href', 'title'}}
+ALLOWED_SCHEMES = {'', 'http', 'https', 'mailto'}
+VOID_TAGS = {'br', 'hr'}
+DROPPED_TAGS = {'script', 'style', 'iframe', 'object', 'embed', 'template', 'noscript'}
+BLOCK_TAGS = {'blockquote', 'br', 'div', 'h2', 'h3', 'h4', 'hr', 'li', 'p', 'pre'}
+
+_HTML = re.compile(r'</?[a-zA-Z][^>]*>')
+_IGNORED_IN_URL = re.compile(r'[\x00-\x20\x7f]+')
+
+
+def _safe_url(value):
+    try:
+        return urlsplit(_IGNORED_IN_URL.sub('', value)).scheme.lower() in ALLOWED_SCHEMES
+    except ValueError:
+        return False
+
+
+class _Sanitizer(HTMLParser):
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.html = []
+        self.text = []
+        self.open = []
+        self.dropping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROPPED_TAGS:
+            self.dropping += 1
+            return
+        if self.dropping:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+        if tag not in ALLOWED_TAGS:
+            return
+        allowed = ALLOWED_ATTRIBUTES.get(tag, set())
+        kept = ''.join(
+            f' {name}="{escape(value)}"' for name, value in attrs
+            if name in allowed and value is not None and (name != 'href' or _safe_url(value))
+        )
+        self.html.append(f'<{tag}{kept}>')
+        if tag not in VOID_TAGS:
+            self.open.append(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROPPED_TAGS:
+            self.dropping = max(self.dropping - 1, 0)
+            return
+        if self.dropping:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+        if tag not in self.open:
+            return
+        while self.open:
+            current = self.open.pop()
+            self.html.append(f'</{current}>')
+            if current == tag:
+                break
+
+    def handle_data(self, data):
+        if not self.dropping:
+            self.html.append(escape(data, quote=False))
+            self.text.append(data)
+
+    def close(self):
+        super().close()
+        while self.open:
+            self.html.append(f'</{self.open.pop()}>')
+
+
+def render_content(content):
+    if _HTML.search(content or ''):
+        parser = _Sanitizer()
+        parser.feed(content)
+        parser.close()
+        html, text = ''.join(parser.html), ''.join(parser.text)
+    else:
+        html, text = linebreaks(content or '', autoescape=True), content or ''
+    return html, Truncator(' '.join(text.split())).words(EXCERPT_WORDS, truncate=' …')
+
+
+def reinstall_search_triggers(apps, schema_editor):
+    # Adding columns remakes mtg_blog_post on SQLite, which drops the search triggers
+    if schema_editor.connection.vendor == 'sqlite':
+        for trigger in SEARCH_TRIGGERS:
+            schema_editor.execute(trigger)
+
+
+def render_existing_posts(apps, schema_editor):
+    Post = apps.get_model('mtg_blog', 'Post')
+    posts = Post.objects.exclude(content='')
+    last_id = 0
+    while True:
+        batch = list(posts.filter(pk__gt=last_id).order_by('pk').only('pk', 'content')[:500])
+        if not batch:
+            break
+        for post in batch:
+            post.content_html, post.excerpt = render_content(post.content)
+        with transaction.atomic():
+            Post.objects.bulk_update(batch, ['content_html', 'excerpt'])
+        last_id = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mtg_blog', '0013_archivedcomment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(reinstall_search_triggers, migrations.RunPython.noop),
+        migrations.RunPython(render_existing_posts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.3 on 2026-10-18 09:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mtg_blog', '0014_post_content_html'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PhotoFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+            ],
+        ),
+    ]
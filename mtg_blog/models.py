@@ -1,32 +1,68 @@
 """Models for MTG Site"""
-from django.db import models
+from functools import partial
+from django.db import models, router, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
-from django.utils.text import slugify
-from django.urls import reverse
+from .rendering import render_content
+from .slugs import save_with_slug
+from .storage import photo_storage
+from .urlbuilder import build_url
 
-class Topic(models.Model):
+class CounterColumnsModel(models.Model):
+    """A model whose COUNTER_FIELDS only ever change through F() updates.
+
+    A save() that does not name its update_fields leaves the counters out
+    of its UPDATE, as writing back the values loaded earlier could undo
+    increments made in the meantime. Everything else is Django's own
+    save: deferred fields are left out, and a row deleted in the meantime
+    is inserted again.
+    """
+    COUNTER_FIELDS = ()
+    # Whether the save in progress named its update_fields
+    _fields_named = False
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        self._fields_named = kwargs.get('update_fields') is not None
+        super().save(*args, **kwargs)
+
+    def _do_update(  # pylint: disable=too-many-positional-arguments
+            self, base_qs, using, pk_val, values, update_fields, forced_update):
+        if not self._fields_named:
+            values = [value for value in values if value[0].name not in self.COUNTER_FIELDS]
+        return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+
+class Topic(CounterColumnsModel):
     """Creating the Topic models"""
+    COUNTER_FIELDS = ('post_count', 'published_post_count')
+
     name = models.CharField(max_length=100, unique=True)
     slug = models.SlugField(max_length=100, unique=True, blank=True)
+    post_count = models.IntegerField(default=0, editable=False)
+    published_post_count = models.IntegerField(default=0, editable=False)
 
     def save(self,*args,**kwargs):
-        if not self.slug:
-            self.slug = slugify(self.name)
-        super().save(*args,**kwargs)
+        save_with_slug(self, partial(super().save, *args, **kwargs), self.name)
 
     def get_absolute_url(self):
         """Get the absolute url for the topic"""
-        return reverse('mtg_blog_app:topic_detail', kwargs= {'slug': self.slug})
+        return build_url('mtg_blog_app:topic_detail', slug=self.slug)
 
     def __str__(self):
         return self.name
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['-post_count', 'name'], name='topic_post_count_idx'),
+        ]
 
-class Post(models.Model):
+class Post(CounterColumnsModel):
     """Creating the models for Post"""
+    COUNTER_FIELDS = ('comment_count', 'approved_comment_count')
+    RENDERED_FIELDS = ('content_html', 'excerpt')
     STATUS_CHOICES = [
         ('draft', 'Draft'),
         ('published', 'Published'),
@@ -34,6 +70,9 @@ class Post(models.Model):
 
     title = models.CharField(max_length=250)
     content = models.TextField(blank=True)
+    # Rendered from content on save (mtg_blog.rendering)
+    content_html = models.TextField(blank=True, editable=False)
+    excerpt = models.TextField(blank=True, editable=False)
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='mtg_posts')
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
@@ -41,20 +80,71 @@ class Post(models.Model):
     published = models.DateTimeField(null=True,blank=True)
     slug = models.SlugField(max_length=250, unique=True)
     topics = models.ManyToManyField(Topic, blank=True, related_name='posts')
+    comment_count = models.IntegerField(default=0, editable=False)
+    approved_comment_count = models.IntegerField(default=0, editable=False)
+    # The status as last loaded or saved, so saves can tell a status transition
+    _loaded_status = None
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(fields=['status', '-published', '-id'], name='post_status_published_idx'),
+            models.Index(fields=['author', '-created'], name='post_author_created_idx'),
+            models.Index(fields=['-comment_count', '-id'], name='post_comment_count_idx'),
+            models.Index(fields=['-approved_comment_count', '-id'], name='post_approved_count_idx'),
+        ]
 
-    def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = slugify(self.title)
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        #Stays None if status was deferred
+        instance._loaded_status = instance.__dict__.get('status')  # pylint: disable=protected-access
+        return instance
+
+    def prepare_for_save(self):
+        """Fill in the publish timestamp and the rendered body; also used by bulk imports"""
+        self._stamp_published()
+        self._render()
+
+    def _stamp_published(self):
         #Set timestamp when published
         if self.status == 'published' and not self.published:
             self.published = timezone.now()
         elif self.status =='draft':
             self.published = None
 
-        super().save(*args,**kwargs)
+    def _render(self):
+        self.content_html, self.excerpt = render_content(self.content)
+
+    def _writes(self, name, update_fields):
+        """Whether a save with these update_fields writes the field `name`"""
+        if update_fields is not None:
+            return name in update_fields
+        return name not in self.get_deferred_fields()
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        writes_status = self._writes('status', update_fields)
+        if writes_status:
+            if not self._state.adding and self._loaded_status is None:
+                #status was deferred when loaded: read the stored one before it is overwritten
+                stored = Post.objects.using(router.db_for_write(Post, instance=self))
+                self._loaded_status = (
+                    stored.filter(pk=self.pk).values_list('status', flat=True).first())
+            self._stamp_published()
+        if self._writes('content', update_fields):
+            self._render()
+        if update_fields is not None:
+            extra = (('published',) if writes_status else ()) + (
+                self.RENDERED_FIELDS if 'content' in update_fields else ())
+            kwargs['update_fields'] = {*update_fields, *extra}
+        save_with_slug(self, partial(super().save, *args, **kwargs), self.title)
+        if writes_status:
+            self._loaded_status = self.status
+
+    def get_absolute_url(self):
+        """Get the absolute url for the post"""
+        return build_url('mtg_blog_app:post_detail', slug=self.slug)
 
     def __str__(self):
         return self.title
@@ -62,33 +152,121 @@ class Post(models.Model):
 
 class Comment(models.Model):
     """Creating the Comment Model"""
-    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
+    # comment_post_created_idx leads with post, so a separate FK index is redundant
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments',
+                             db_index=False)
     name = models.CharField(max_length=100)
     email = models.EmailField()
     text = models.TextField(max_length=500)
     approved = models.BooleanField(default=False)
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
+    # (post_id, approved) as the counters were last told about it, None while unknown
+    _loaded_counted = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # pylint: disable-next=protected-access
+        instance._loaded_counted = (instance.__dict__.get('post_id'), instance.__dict__.get('approved'))
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded_counted = (self.post_id, self.approved)
 
     def __str__(self):
         return f'Comment by {self.name} on {self.post.title}'
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(fields=['post', '-created'], name='comment_post_created_idx'),
+            models.Index(
+                fields=['-created', '-id'],
+                condition=models.Q(approved=True),
+                name='comment_approved_idx',
+            ),
+            models.Index(
+                fields=['-created', '-id'],
+                condition=models.Q(approved=False),
+                name='comment_pending_idx',
+            ),
+        ]
+
+class ArchivedComment(models.Model):
+    """An old approved comment moved out of the hot Comment table; keeps the original id"""
+    id = models.BigIntegerField(primary_key=True)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='archived_comments')
+    name = models.CharField(max_length=100)
+    email = models.EmailField()
+    text = models.TextField(max_length=500)
+    approved = models.BooleanField(default=True)
+    created = models.DateTimeField()
+    updated = models.DateTimeField()
+    archived = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'Archived comment by {self.name} on {self.post.title}'
+
+    class Meta:
+        ordering = ['-created']
+        indexes = [
+            models.Index(fields=['post', '-created'], name='archived_post_created_idx'),
+        ]
+
+class TopicPostActivity(models.Model):
+    """Comment counters of a post copied onto each of its topics for per-topic rankings"""
+    topic = models.ForeignKey(Topic, on_delete=models.CASCADE, related_name='post_activity')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='topic_activity')
+    comment_count = models.IntegerField(default=0)
+    approved_comment_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'topic'], name='activity_post_topic_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['topic', '-comment_count', '-post'], name='activity_comment_count_idx'),
+            models.Index(
+                fields=['topic', '-approved_comment_count', '-post'], name='activity_approved_count_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id} in {self.topic_id}: {self.comment_count} comments'
 
 class PhotoSubmission(models.Model):
     """Model for photo contest submission"""
+    VARIANTS_PENDING = 'pending'
+    VARIANTS_READY = 'ready'
+    VARIANTS_FAILED = 'failed'
+    VARIANTS_STATUS_CHOICES = [
+        (VARIANTS_PENDING, 'Pending'),
+        (VARIANTS_READY, 'Ready'),
+        (VARIANTS_FAILED, 'Failed'),
+    ]
 
     name = models.CharField(max_length=100, help_text='Your full name')
     email = models.EmailField(help_text='Your email address')
     photo = models.ImageField(
         upload_to='contest_photos/',
+        storage=photo_storage,
+        db_index=True,
         help_text='Upload your contest photo'
     )
     submission_date = models.DateTimeField(
         default=timezone.now,
         help_text='Date and time of submission'
     )
+    thumbnail = models.ImageField(blank=True, editable=False, storage=photo_storage)
+    preview = models.ImageField(blank=True, editable=False, storage=photo_storage)
+    web_photo = models.ImageField(blank=True, editable=False, storage=photo_storage)
+    variants_status = models.CharField(
+        max_length=10,
+        choices=VARIANTS_STATUS_CHOICES,
+        default=VARIANTS_PENDING,
+        editable=False,
+    )
 
     class Meta:
         """Meta options for Photo Submissions"""
@@ -96,6 +274,55 @@ class PhotoSubmission(models.Model):
         verbose_name='Photo Submission'
         verbose_name_plural='Photo Submissions'
 
+    def save(self, *args, **kwargs):
+        # A new upload may reuse a stored file that a release is deleting;
+        # holding the file's lock until the row commits orders the two.
+        with transaction.atomic():
+            upload = self.photo
+            committed = upload._committed  # pylint: disable=protected-access
+            if upload and not committed and hasattr(upload.storage, 'hashed_name'):
+                PhotoFile.lock([upload.storage.hashed_name(
+                    upload.field.generate_filename(self, upload.name), upload.file)])
+            super().save(*args, **kwargs)
+
+    def image_url(self, variant='web_photo'):
+        """URL of a resized variant, falling back to the original upload"""
+        image = getattr(self, variant)
+        if self.variants_status == self.VARIANTS_READY and image:
+            return image.url
+        return self.photo.url if self.photo else None
+
     def __str__(self):
         """String representation of Photo Submission"""
         return f"Photo Submission by {self.name} on {self.submission_date.strftime('%Y-%m-%d')}"
+
+
+class PhotoFile(models.Model):
+    """Lock row for one stored photo file, shared by the submissions using it.
+
+    Content-addressed files are shared between submissions, so writing a
+    reference to one and deleting an unreferenced one must not interleave.
+    Both sides lock the file's row first.
+    """
+    name = models.CharField(max_length=255, unique=True)
+
+    @classmethod
+    def lock(cls, names):
+        """Lock the rows of the named files until the transaction ends, creating them as needed"""
+        names = sorted({name for name in names if name})
+        cls.objects.bulk_create([cls(name=name) for name in names], ignore_conflicts=True)
+        # In name order, so two lockers never wait on each other
+        return list(cls.objects.select_for_update().filter(name__in=names).order_by('name'))
+
+    def __str__(self):
+        return self.name
+
+
+class ImportCheckpoint(models.Model):
+    """How far a bulk import of a source file has been committed"""
+    source = models.CharField(max_length=255, unique=True)
+    line = models.PositiveBigIntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.source} at line {self.line}'
@@ -0,0 +1,140 @@
+"""Keyset (cursor) pagination for querysets ordered on indexed columns"""
+import base64
+import datetime
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """JSON encoder that keeps the full microsecond precision of datetimes"""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor cannot be decoded"""
+
+
+class KeysetPage:
+    """One page of results together with the cursors around it"""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        """Whether there is a page after this one"""
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        """Whether there is a page before this one"""
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def _field_name(field):
+    return field.lstrip('-')
+
+
+def _reverse_ordering(ordering):
+    return [_field_name(field) if field.startswith('-') else f'-{field}' for field in ordering]
+
+
+def _after(ordering, values):
+    """Build a filter for the rows that sort strictly after `values`"""
+    condition = Q()
+    for position, field in enumerate(ordering):
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        step = Q(**{f'{_field_name(field)}__{lookup}': values[position]})
+        for previous, value in zip(ordering[:position], values[:position]):
+            step &= Q(**{_field_name(previous): value})
+        condition |= step
+    return condition
+
+
+def encode_cursor(direction, values):
+    """Turn a direction ('next' or 'prev') and the key of a row into a cursor"""
+    payload = json.dumps([direction, list(values)], cls=CursorEncoder)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, model, ordering):
+    """Return the (direction, values) stored in a cursor"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        direction, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if direction not in ('next', 'prev') or len(values) != len(ordering):
+            raise InvalidCursor(cursor)
+        return direction, [
+            model._meta.get_field(_field_name(field)).to_python(value)
+            for field, value in zip(ordering, values)
+        ]
+    except (ValueError, TypeError) as error:
+        raise InvalidCursor(cursor) from error
+
+
+def _key(item, ordering):
+    return [getattr(item, _field_name(field)) for field in ordering]
+
+
+def _seek(queryset, ordering, cursor):
+    direction, values = 'next', None
+    if cursor:
+        direction, values = decode_cursor(cursor, queryset.model, ordering)
+
+    seek_ordering = ordering if direction == 'next' else _reverse_ordering(ordering)
+    rows = queryset.order_by(*seek_ordering)
+    if values is not None:
+        rows = rows.filter(_after(seek_ordering, values))
+    return rows, direction, values
+
+
+def _page(items, ordering, per_page, direction, values):
+    has_more = len(items) > per_page
+    items = items[:per_page]
+
+    if direction == 'prev':
+        items.reverse()
+        has_next, has_previous = True, has_more
+    else:
+        has_next, has_previous = has_more, values is not None
+
+    next_cursor = prev_cursor = None
+    if items and has_next:
+        next_cursor = encode_cursor('next', _key(items[-1], ordering))
+    if items and has_previous:
+        prev_cursor = encode_cursor('prev', _key(items[0], ordering))
+    return KeysetPage(items, next_cursor, prev_cursor)
+
+
+def keyset_paginate(queryset, ordering, per_page, cursor=None):
+    """Return the page of `queryset` that a cursor points at.
+
+    `ordering` must end in a unique column (usually the primary key) so
+    every row has a distinct key. Each page costs a single query that
+    seeks on the ordering index, however deep into the results it is.
+    """
+    ordering = list(ordering)
+    rows, direction, values = _seek(queryset, ordering, cursor)
+    return _page(list(rows[:per_page + 1]), ordering, per_page, direction, values)
+
+
+async def akeyset_paginate(queryset, ordering, per_page, cursor=None):
+    """Async version of keyset_paginate that fetches the page with the async ORM"""
+    ordering = list(ordering)
+    rows, direction, values = _seek(queryset, ordering, cursor)
+    items = [item async for item in rows[:per_page + 1].aiterator()]
+    return _page(items, ordering, per_page, direction, values)
@@ -0,0 +1,142 @@
+"""Resized variants of contest photos, generated off the request path"""
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from threading import Lock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.db.models import Q
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import PhotoFile, PhotoSubmission
+
+logger = logging.getLogger(__name__)
+
+# field name -> (file suffix, bounding box, crop to fill the box)
+VARIANTS = {
+    'thumbnail': ('thumb', (100, 100), True),
+    'preview': ('preview', (300, 300), False),
+    'web_photo': ('web', (1280, 1280), False),
+}
+FILE_FIELDS = ('photo', *VARIANTS)
+JPEG_QUALITY = 85
+
+_executor = None  # pylint: disable=invalid-name
+_executor_lock = Lock()
+
+
+def variant_name(photo_name, suffix):
+    """Name of a variant file, stored next to the original"""
+    root, _ext = os.path.splitext(photo_name)
+    return f'{root}.{suffix}.jpg'
+
+
+def _render(image, size, crop):
+    if crop:
+        resized = ImageOps.fit(image, size, Image.Resampling.LANCZOS)
+    else:
+        resized = image.copy()
+        resized.thumbnail(size, Image.Resampling.LANCZOS)
+    buffer = BytesIO()
+    resized.save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True)
+    return ContentFile(buffer.getvalue())
+
+
+def generate_variants(submission_id):
+    """Create every resized variant of one submission and record them.
+
+    Returns the new variants_status. The row is written with a single
+    UPDATE so a concurrent edit of the submission is not overwritten.
+    """
+    submission = PhotoSubmission.objects.filter(pk=submission_id).first()
+    if submission is None or not submission.photo:
+        return None
+    storage = submission.photo.storage
+    rendered = {}
+    try:
+        with submission.photo.open('rb') as original, Image.open(original) as image:
+            image = ImageOps.exif_transpose(image).convert('RGB')
+            for field, (suffix, size, crop) in VARIANTS.items():
+                name = variant_name(submission.photo.name, suffix)
+                rendered[field] = (name, _render(image, size, crop))
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError):
+        logger.warning('Could not generate variants for photo submission %s', submission_id,
+                       exc_info=True)
+        PhotoSubmission.objects.filter(pk=submission_id).update(
+            variants_status=PhotoSubmission.VARIANTS_FAILED)
+        return PhotoSubmission.VARIANTS_FAILED
+    with transaction.atomic():
+        # Variants of different photos can hash alike and share a file
+        PhotoFile.lock(
+            storage.hashed_name(name, content) for name, content in rendered.values()
+            if hasattr(storage, 'hashed_name'))
+        names = {field: storage.save(name, content) for field, (name, content) in rendered.items()}
+        if not PhotoSubmission.objects.filter(pk=submission_id).update(
+                variants_status=PhotoSubmission.VARIANTS_READY, **names):
+            # Deleted while the variants were rendered
+            _delete_unreferenced(storage, set(names.values()))
+            return None
+    return PhotoSubmission.VARIANTS_READY
+
+
+def _delete_unreferenced(storage, names):
+    """Delete the named files no submission refers to; their locks must be held"""
+    lookup = Q()
+    for field in FILE_FIELDS:
+        lookup |= Q(**{f'{field}__in': names})
+    referenced = set()
+    for row in PhotoSubmission.objects.filter(lookup).values_list(*FILE_FIELDS):
+        referenced.update(row)
+    unreferenced = names - referenced
+    for name in sorted(unreferenced):
+        storage.delete(name)
+    PhotoFile.objects.filter(name__in=unreferenced).delete()
+
+
+def release_photo_files(submission):
+    """Delete a removed submission's files unless another submission shares them.
+
+    Identical uploads share one stored file, and so can the variants of
+    different photos, so each file is kept while any submission refers to
+    it from any image field. The check and the delete run under the
+    files' locks, which a new upload of the same content also takes.
+    """
+    names = {getattr(submission, field).name for field in FILE_FIELDS if getattr(submission, field)}
+    if not names:
+        return
+    with transaction.atomic():
+        PhotoFile.lock(names)
+        _delete_unreferenced(submission.photo.storage, names)
+
+
+def _worker_pool():
+    global _executor  # pylint: disable=global-statement
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'MTG_PHOTO_VARIANT_WORKERS', 2),
+                thread_name_prefix='photo-variants',
+            )
+        return _executor
+
+
+def _run(submission_id):
+    try:
+        return generate_variants(submission_id)
+    finally:
+        # Each worker thread has its own connections; don't leak them
+        connections.close_all()
+
+
+def schedule_variants(submission_id):
+    """Queue variant generation on the worker pool once the row is committed.
+
+    With MTG_PHOTO_VARIANT_WORKERS = 0 nothing is queued and variants are
+    left to the generate_photo_variants command.
+    """
+    if not getattr(settings, 'MTG_PHOTO_VARIANT_WORKERS', 2):
+        return
+    transaction.on_commit(lambda: _worker_pool().submit(_run, submission_id))
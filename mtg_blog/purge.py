@@ -0,0 +1,72 @@
+"""Batched deletion of posts and everything that hangs off them.
+
+Post.delete() has the collector load every comment of the post and
+delete them all in one transaction. For a post with many comments that
+uses a lot of memory and holds SQLite's write lock for the whole
+delete. purge_posts() works through the posts in keyset order instead.
+Comments, topic links and then the posts themselves go in fixed-size
+batches, each batch in its own short transaction, so other writers get
+the lock between batches.
+"""
+import time
+
+from django.db import transaction
+
+from .counters import post_links_removed
+from .models import ArchivedComment, Comment, Post, Topic
+from .response_cache import TOPICS, invalidate, topic_dependency
+from .topic_cache import invalidate_top_topics
+
+
+def _delete_comments(post_ids, batch_size, pause):
+    """Delete the hot and archived comments of the given posts batch by batch; return how many went"""
+    deleted = 0
+    for model in (Comment, ArchivedComment):
+        comments = model.objects.filter(post_id__in=post_ids).order_by().values_list('pk', flat=True)
+        while True:
+            batch = list(comments[:batch_size])
+            if not batch:
+                break
+            with transaction.atomic():
+                # The posts are going too, so skip the per-comment counter signals
+                # pylint: disable-next=protected-access
+                deleted += model.objects.filter(pk__in=batch)._raw_delete(model.objects.db)
+            if pause:
+                time.sleep(pause)
+    return deleted
+
+
+def purge_posts(posts, batch_size=500, pause=0, progress=None):
+    """Delete the posts of a queryset together with their comments and topic links.
+
+    Returns a dict with the number of posts, comments and links deleted.
+    progress, if given, is called with that dict after every batch of posts.
+    Inside transaction.atomic() the batches become savepoints and the whole
+    purge commits or rolls back together.
+    """
+    totals = {'posts': 0, 'comments': 0, 'links': 0}
+    post_ids = posts.order_by('pk').values_list('pk', flat=True)
+    through = Post.topics.through
+    last = 0
+    while True:
+        batch = list(post_ids.filter(pk__gt=last)[:batch_size])
+        if not batch:
+            break
+        last = batch[-1]
+
+        totals['comments'] += _delete_comments(batch, batch_size, pause)
+        with transaction.atomic():
+            topic_ids = post_links_removed(batch)
+            totals['links'] += through.objects.filter(post_id__in=batch).delete()[0]
+            slugs = Topic.objects.filter(pk__in=topic_ids).values_list('slug', flat=True)
+            invalidate(TOPICS, *[topic_dependency(slug) for slug in slugs])
+        with transaction.atomic():
+            _, deleted = Post.objects.filter(pk__in=batch).delete()
+            totals['posts'] += deleted.get(Post._meta.label, 0)
+
+        invalidate_top_topics()
+        if progress:
+            progress(totals)
+        if pause:
+            time.sleep(pause)
+    return totals
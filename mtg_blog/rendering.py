@@ -0,0 +1,139 @@
+"""Save-time rendering of post bodies into sanitized HTML and a short excerpt.
+
+Post.content may be plain text or HTML from a rich text editor. Plain
+text is rendered the way the ``linebreaks`` filter did. HTML is parsed
+and rebuilt from an allow-list of tags and attributes: scripts, styles
+and event handlers are dropped, links only keep http(s), mailto and
+relative URLs, and unclosed tags are closed. The excerpt is the first
+EXCERPT_WORDS words of the text, as ``truncatewords`` printed it.
+"""
+import re
+from html import escape
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+from django.db import transaction
+from django.utils.html import linebreaks
+from django.utils.text import Truncator
+
+EXCERPT_WORDS = 30
+ALLOWED_TAGS = {
+    'a', 'b', 'blockquote', 'br', 'code', 'em', 'h2', 'h3', 'h4', 'hr', 'i', 'li', 'ol',
+    'p', 'pre', 's', 'strong', 'u', 'ul',
+}
+ALLOWED_ATTRIBUTES = {'a': {'href', 'title'}}
+ALLOWED_SCHEMES = {'', 'http', 'https', 'mailto'}
+VOID_TAGS = {'br', 'hr'}
+# Dropped together with everything inside them
+DROPPED_TAGS = {'script', 'style', 'iframe', 'object', 'embed', 'template', 'noscript'}
+BLOCK_TAGS = {'blockquote', 'br', 'div', 'h2', 'h3', 'h4', 'hr', 'li', 'p', 'pre'}
+
+_HTML = re.compile(r'</?[a-zA-Z][^>]*>')
+_IGNORED_IN_URL = re.compile(r'[\x00-\x20\x7f]+')
+
+
+def _safe_url(value):
+    try:
+        return urlsplit(_IGNORED_IN_URL.sub('', value)).scheme.lower() in ALLOWED_SCHEMES
+    except ValueError:
+        return False
+
+
+class _Sanitizer(HTMLParser):
+    """Rebuild HTML from allowed tags only, collecting its text on the way"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.html = []
+        self.text = []
+        self.open = []
+        self.dropping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROPPED_TAGS:
+            self.dropping += 1
+            return
+        if self.dropping:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+        if tag not in ALLOWED_TAGS:
+            return
+        allowed = ALLOWED_ATTRIBUTES.get(tag, set())
+        kept = ''.join(
+            f' {name}="{escape(value)}"' for name, value in attrs
+            if name in allowed and value is not None and (name != 'href' or _safe_url(value))
+        )
+        self.html.append(f'<{tag}{kept}>')
+        if tag not in VOID_TAGS:
+            self.open.append(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROPPED_TAGS:
+            self.dropping = max(self.dropping - 1, 0)
+            return
+        if self.dropping:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+        if tag not in self.open:
+            return
+        while self.open:
+            current = self.open.pop()
+            self.html.append(f'</{current}>')
+            if current == tag:
+                break
+
+    def handle_data(self, data):
+        if not self.dropping:
+            self.html.append(escape(data, quote=False))
+            self.text.append(data)
+
+    def close(self):
+        super().close()
+        while self.open:
+            self.html.append(f'</{self.open.pop()}>')
+
+
+def sanitize_html(content):
+    """Return (safe HTML, plain text) for an HTML fragment"""
+    parser = _Sanitizer()
+    parser.feed(content)
+    parser.close()
+    return ''.join(parser.html), ''.join(parser.text)
+
+
+def render_content(content):
+    """Return the (content_html, excerpt) stored alongside a post body"""
+    if _HTML.search(content or ''):
+        html, text = sanitize_html(content)
+    else:
+        html, text = linebreaks(content or '', autoescape=True), content or ''
+    return html, Truncator(' '.join(text.split())).words(EXCERPT_WORDS, truncate=' …')
+
+
+def render_posts(model, batch_size=500, everything=False, progress=None):
+    """Store content_html and excerpt for posts in id-ordered batches.
+
+    Only posts that have a body but no excerpt yet are rendered unless
+    `everything` is set, e.g. after the sanitizer rules change. Each
+    batch commits on its own. Returns the number of posts rendered.
+    """
+    posts = model.objects.all()
+    if not everything:
+        posts = posts.filter(excerpt='').exclude(content='')
+    rendered, last_id = 0, 0
+    while True:
+        batch = list(
+            posts.filter(pk__gt=last_id).order_by('pk').only('pk', 'content')[:batch_size])
+        if not batch:
+            break
+        for post in batch:
+            post.content_html, post.excerpt = render_content(post.content)
+        with transaction.atomic():
+            model.objects.bulk_update(batch, ['content_html', 'excerpt'])
+        rendered += len(batch)
+        last_id = batch[-1].pk
+        if progress:
+            progress(rendered)
+    return rendered
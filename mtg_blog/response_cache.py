@@ -0,0 +1,238 @@
+"""Whole-response caching for the public pages, invalidated by model changes.
+
+Every cached page names the data it depends on, e.g. ``topics`` for
+anything that lists topics or shows the sidebar, ``posts`` for the
+site-wide list of published posts, ``comments`` for approved comments
+and their counts, ``topic:<slug>`` for one topic's posts and
+``post:<slug>`` for a post's own page. Each dependency has a version in Django's cache:
+the time of its last change. A page's ETag is built from those versions,
+so a conditional GET is answered with 304 without touching the database
+or rendering, and bumping a version makes every page that depends on it
+miss on the next request.
+
+Streamed responses are cached once sent in full, unless their body grows
+past STREAMED_CACHE_LIMIT. Larger ones are passed through uncached so
+the body is never held in memory, and still get the validators.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+VERSION_KEY = 'mtg_blog:version:{}'
+RESPONSE_KEY = 'mtg_blog:response:{}'
+RESPONSE_TIMEOUT = 24 * 60 * 60
+# Memcached's default item size limit
+STREAMED_CACHE_LIMIT = 1024 * 1024
+
+TOPICS = 'topics'
+POSTS = 'posts'
+COMMENTS = 'comments'
+
+
+def topic_dependency(slug):
+    """Dependency name for the posts listed under one topic"""
+    return f'topic:{slug}'
+
+
+def post_dependency(slug):
+    """Dependency name for one post's own page"""
+    return f'post:{slug}'
+
+
+def sitemap_dependency(section, shard):
+    """Dependency name for one shard of the sitemap"""
+    return f'sitemap:{section}:{shard}'
+
+
+def _version_key(name):
+    # Post slugs can be up to 250 characters, past memcached's key limit
+    if len(name) > 100:
+        name = hashlib.sha256(name.encode()).hexdigest()
+    return VERSION_KEY.format(name)
+
+
+def get_versions(dependencies):
+    """Return {dependency: version}, starting unknown ones at the current time"""
+    keys = {_version_key(name): name for name in dependencies}
+    found = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        found.update(missing)
+    return {keys[key]: version for key, version in found.items()}
+
+
+async def aget_versions(dependencies):
+    """Async version of get_versions"""
+    keys = {_version_key(name): name for name in dependencies}
+    found = await cache.aget_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    if missing:
+        await cache.aset_many(missing, timeout=None)
+        found.update(missing)
+    return {keys[key]: version for key, version in found.items()}
+
+
+def _bump(dependencies):
+    now = time.time_ns()
+    cache.set_many({_version_key(name): now for name in dependencies}, timeout=None)
+
+
+def invalidate(*dependencies):
+    """Record a change to the given dependencies.
+
+    Inside a transaction the versions are bumped again on commit, so a
+    page rendered from the old rows in the meantime is not kept.
+    """
+    if not dependencies:
+        return
+    _bump(dependencies)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: _bump(dependencies))
+
+
+def _validators(request, versions, variant=''):
+    digest = hashlib.sha256(f'{request.get_full_path()}|{variant}'.encode())
+    for name in sorted(versions):
+        digest.update(f'|{name}={versions[name]}'.encode())
+    etag = quote_etag(digest.hexdigest()[:32])
+    last_modified = max(versions.values()) // 1_000_000_000
+    return etag, last_modified
+
+
+def conditional_validators(request, dependencies, variant=''):
+    """(ETag, Last-Modified timestamp) of the response to `request` built from dependencies.
+
+    `variant` tells apart representations served at the same URL.
+    """
+    return _validators(request, get_versions(dependencies), variant)
+
+
+def finish_conditional(response, etag, last_modified):
+    """Set the validators and the revalidate-every-time caching headers on a response"""
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, public=True, max_age=0, must_revalidate=True)
+    return response
+
+
+def _kept(sent, chunk):
+    """The body sent so far plus `chunk`, or None once it outgrows STREAMED_CACHE_LIMIT"""
+    if sent is None or len(sent) + len(chunk) > STREAMED_CACHE_LIMIT:
+        return None
+    sent += chunk
+    return sent
+
+
+def _cache_when_streamed(chunks, key, content_type):
+    """Pass a streamed body through, caching it once it has been sent in full"""
+    sent = bytearray()
+    for chunk in chunks:
+        sent = _kept(sent, chunk)
+        yield chunk
+    if sent is not None:
+        cache.set(key, (bytes(sent), content_type), RESPONSE_TIMEOUT)
+
+
+async def _acache_when_streamed(chunks, key, content_type):
+    """Async version of _cache_when_streamed, for async streamed bodies"""
+    sent = bytearray()
+    async for chunk in chunks:
+        sent = _kept(sent, chunk)
+        yield chunk
+    if sent is not None:
+        await cache.aset(key, (bytes(sent), content_type), RESPONSE_TIMEOUT)
+
+
+def _cache_streamed(response, key):
+    """Cache the body of a streamed response as it is sent"""
+    if response.is_async:
+        response.streaming_content = _acache_when_streamed(
+            response.streaming_content, key, response['Content-Type'])
+    else:
+        response.streaming_content = _cache_when_streamed(
+            response.streaming_content, key, response['Content-Type'])
+
+
+def _cached(cached, etag, last_modified):
+    content, content_type = cached
+    return finish_conditional(HttpResponse(content, content_type=content_type), etag, last_modified)
+
+
+def cache_response(dependencies):
+    """Cache a view's response for anonymous GETs until its dependencies change.
+
+    `dependencies` is called with the view's arguments and returns the
+    names of the data the page shows. Async views get an async wrapper
+    that talks to the cache with its async API.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            return _async_cache_response(view, dependencies)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+
+            versions = get_versions(dependencies(request, *args, **kwargs))
+            etag, last_modified = _validators(request, versions)
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is not None:
+                return finish_conditional(response, etag, last_modified)
+
+            key = RESPONSE_KEY.format(etag.strip('"'))
+            cached = cache.get(key)
+            if cached is not None:
+                return _cached(cached, etag, last_modified)
+
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render') and callable(response.render):
+                response.render()
+            if response.status_code == 200 and not response.cookies:
+                if response.streaming:
+                    _cache_streamed(response, key)
+                else:
+                    cache.set(key, (response.content, response['Content-Type']), RESPONSE_TIMEOUT)
+                finish_conditional(response, etag, last_modified)
+            return response
+        return wrapper
+    return decorator
+
+
+def _async_cache_response(view, dependencies):
+    """cache_response for an async view"""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or (await request.auser()).is_authenticated:
+            return await view(request, *args, **kwargs)
+
+        versions = await aget_versions(dependencies(request, *args, **kwargs))
+        etag, last_modified = _validators(request, versions)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            return finish_conditional(response, etag, last_modified)
+
+        key = RESPONSE_KEY.format(etag.strip('"'))
+        cached = await cache.aget(key)
+        if cached is not None:
+            return _cached(cached, etag, last_modified)
+
+        response = await view(request, *args, **kwargs)
+        if hasattr(response, 'render') and callable(response.render):
+            response.render()
+        if response.status_code == 200 and not response.cookies:
+            if response.streaming:
+                _cache_streamed(response, key)
+            else:
+                await cache.aset(key, (response.content, response['Content-Type']), RESPONSE_TIMEOUT)
+            finish_conditional(response, etag, last_modified)
+        return response
+    return wrapper
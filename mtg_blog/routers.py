@@ -0,0 +1,164 @@
+"""Send reads to the replicas and writes to the primary database.
+
+Replicas are the aliases listed in MTG_DB_REPLICAS. Once a request
+writes, its reads go to the primary for MTG_REPLICA_PIN_SECONDS, so it
+never reads back older data from a replica that has not caught up yet.
+ReplicaPinMiddleware carries that window over to the browser's next
+request in a signed cookie, which covers the redirect after a POST.
+Reads inside a transaction on the primary stay on the primary, and
+force_primary() sends every read in a block there. Each request picks
+one replica at random on its first read and keeps it, so a page never
+mixes rows from replicas that lag by different amounts.
+"""
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PRIMARY = DEFAULT_DB_ALIAS
+PIN_COOKIE = 'mtg_primary_until'
+DEFAULT_PIN_SECONDS = 5
+
+
+class PinState:  # pylint: disable=too-few-public-methods
+    """Until when the reads of one request (or thread) go to the primary, and its replica"""
+
+    def __init__(self, pinned_until=0.0):
+        self.pinned_until = pinned_until
+        self.wrote = False
+        self.forced = 0
+        self.replica = None
+
+
+_state = ContextVar('mtg_blog_replica_pin', default=None)
+
+
+def _current():
+    state = _state.get()
+    if state is None:
+        state = PinState()
+        _state.set(state)
+    return state
+
+
+def pin_seconds():
+    """How long reads stay on the primary after a write"""
+    return getattr(settings, 'MTG_REPLICA_PIN_SECONDS', DEFAULT_PIN_SECONDS)
+
+
+def replicas():
+    """Aliases of the configured read replicas"""
+    return getattr(settings, 'MTG_DB_REPLICAS', [])
+
+
+@contextmanager
+def request_scope(pinned_until=0.0):
+    """Track the writes of one request apart from every other request"""
+    state = PinState(pinned_until)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+@contextmanager
+def force_primary():
+    """Read from the primary inside the block"""
+    state = _current()
+    state.forced += 1
+    try:
+        yield
+    finally:
+        state.forced -= 1
+
+
+def reads_from_primary():
+    """Whether reads made now have to see the primary's latest data"""
+    state = _current()
+    return (
+        state.forced > 0
+        or state.pinned_until > time.time()
+        or connections[PRIMARY].in_atomic_block
+    )
+
+
+class PrimaryReplicaRouter:
+    """Database router for one primary and any number of read replicas"""
+    # pylint: disable=unused-argument
+
+    def db_for_read(self, model, **hints):
+        """The primary when reads must be fresh, else the request's replica"""
+        available = replicas()
+        if not available or reads_from_primary():
+            return PRIMARY if available else None
+        state = _current()
+        if state.replica not in available:
+            state.replica = random.choice(available)
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        """Always the primary, which pins the following reads to it"""
+        state = _current()
+        state.wrote = True
+        state.pinned_until = time.time() + pin_seconds()
+        return PRIMARY if replicas() else None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Any relation, as every alias holds the same data"""
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        """Never on a replica, which gets its schema from the primary"""
+        return False if db in replicas() else None
+
+
+class ReplicaPinMiddleware:
+    """Keep a browser on the primary for a short while after it wrote.
+
+    Enabled when MTG_DB_REPLICAS lists at least one replica. Must come
+    before any middleware that touches the database.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not replicas():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with request_scope(self.pinned_until(request)) as state:
+            response = self.get_response(request)
+        return self.carry_pin(response, state)
+
+    async def __acall__(self, request):
+        """Async version of __call__"""
+        with request_scope(self.pinned_until(request)) as state:
+            response = await self.get_response(request)
+        return self.carry_pin(response, state)
+
+    @staticmethod
+    def carry_pin(response, state):
+        """Pass the window opened by a write on to the browser's next request"""
+        if state.wrote:
+            response.set_signed_cookie(
+                PIN_COOKIE, f'{state.pinned_until:.3f}', max_age=pin_seconds(),
+                httponly=True, samesite='Lax')
+        return response
+
+    @staticmethod
+    def pinned_until(request):
+        """End of the window carried over from an earlier write by a signed cookie"""
+        value = request.get_signed_cookie(PIN_COOKIE, default=None, max_age=pin_seconds())
+        return float(value) if value else 0.0
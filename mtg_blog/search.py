@@ -0,0 +1,134 @@
+"""Full-text search over posts.
+
+SQLite uses an FTS5 table that triggers keep in step with mtg_blog_post;
+PostgreSQL uses a weighted SearchVector backed by a GIN expression index.
+Migration 0008 creates both, and later migrations that remake
+mtg_blog_post on SQLite recreate the triggers.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection, transaction
+
+from .models import Post
+
+FTS_TABLE = 'mtg_blog_post_fts'
+GIN_INDEX = 'post_search_idx'
+SEARCH_CONFIG = 'english'
+TITLE_WEIGHT = 10.0
+CONTENT_WEIGHT = 1.0
+# Result lists show the stored excerpt, never the body
+LISTED_DEFER = ('content', 'content_html')
+
+_TERM = re.compile(r'\w+', re.UNICODE)
+
+
+def search_vector():
+    """The weighted document that PostgreSQL searches and indexes"""
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('content', weight='B', config=SEARCH_CONFIG)
+    )
+
+
+def search_terms(text):
+    """Split user input into plain word terms"""
+    return _TERM.findall(text.lower())
+
+
+def search_posts(text, limit=20, offset=0):
+    """Return published posts matching every term, best match first.
+
+    The last term is treated as a prefix so partially typed card names
+    ("lightning bo") still match.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return []
+    if connection.vendor == 'sqlite':
+        return _search_sqlite(terms, limit, offset)
+    if connection.vendor == 'postgresql':
+        return _search_postgresql(terms, limit, offset)
+    return list(_search_fallback(terms)[offset:offset + limit])
+
+
+def _search_sqlite(terms, limit, offset):
+    match = ' '.join(f'"{term}"' for term in terms[:-1])
+    match = f'{match} "{terms[-1]}"*'.strip()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'''
+            SELECT post.id FROM {FTS_TABLE}
+            JOIN mtg_blog_post AS post ON post.id = {FTS_TABLE}.rowid
+            WHERE {FTS_TABLE} MATCH %s AND post.status = %s
+            ORDER BY bm25({FTS_TABLE}, %s, %s), post.id DESC
+            LIMIT %s OFFSET %s
+            ''',
+            [match, 'published', TITLE_WEIGHT, CONTENT_WEIGHT, limit, offset],
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+    posts = Post.objects.select_related('author').defer(*LISTED_DEFER).in_bulk(ids)
+    return [posts[pk] for pk in ids if pk in posts]
+
+
+def _search_postgresql(terms, limit, offset):
+    raw = ' & '.join(terms[:-1] + [f'{terms[-1]}:*'])
+    query = SearchQuery(raw, search_type='raw', config=SEARCH_CONFIG)
+    return list(
+        Post.objects
+        .annotate(document=search_vector())
+        .filter(document=query, status='published')
+        .annotate(rank=SearchRank(search_vector(), query))
+        .select_related('author')
+        .defer(*LISTED_DEFER)
+        .order_by('-rank', '-id')[offset:offset + limit]
+    )
+
+
+def _search_fallback(terms):
+    posts = Post.objects.filter(status='published').select_related('author').defer(*LISTED_DEFER)
+    for term in terms:
+        posts = posts.filter(title__icontains=term) | posts.filter(content__icontains=term)
+    return posts.order_by('-published', '-id')
+
+
+def rebuild_search_index(batch_size=1000, progress=None):
+    """Reload the SQLite FTS table from mtg_blog_post in id-ordered batches.
+
+    The delete and every batch run in one transaction, so searches keep
+    seeing the old index until the new one is complete and a failed
+    rebuild leaves it untouched. Returns the number of posts indexed. On
+    PostgreSQL the index is an expression index that the database keeps
+    current, so it is reindexed in one statement instead.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f'REINDEX INDEX {GIN_INDEX}')
+        return Post.objects.count()
+    if connection.vendor != 'sqlite':
+        return 0
+
+    indexed, last_id = 0, 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')")
+        while True:
+            cursor.execute(
+                'SELECT MAX(id), COUNT(*) FROM '
+                '(SELECT id FROM mtg_blog_post WHERE id > %s ORDER BY id LIMIT %s)',
+                [last_id, batch_size],
+            )
+            batch_last, count = cursor.fetchone()
+            if not count:
+                break
+            cursor.execute(
+                f'''
+                INSERT INTO {FTS_TABLE}(rowid, title, content)
+                SELECT id, title, content FROM mtg_blog_post WHERE id > %s AND id <= %s
+                ''',
+                [last_id, batch_last],
+            )
+            indexed += count
+            last_id = batch_last
+            if progress:
+                progress(indexed)
+    return indexed
@@ -0,0 +1,161 @@
+"""Signal handlers that keep derived data in step with the models"""
+# Receivers take every argument their signal sends, used or not
+# pylint: disable=unused-argument
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import counters
+from .counters import PUBLISHED
+from .models import Comment, PhotoSubmission, Post, Topic
+from .photo_variants import release_photo_files, schedule_variants
+from .response_cache import (
+    COMMENTS, POSTS, TOPICS, invalidate, post_dependency, topic_dependency,
+)
+from .sitemaps import post_shard_dependencies
+from .topic_cache import invalidate_top_topics
+
+
+@receiver(post_save, sender=Topic)
+@receiver(post_delete, sender=Topic)
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def topic_ranking_changed(sender, **kwargs):
+    """Invalidate the top topics cache when topics or posts change"""
+    invalidate_top_topics()
+
+
+@receiver(post_save, sender=Topic)
+@receiver(post_delete, sender=Topic)
+def topic_changed(sender, instance, **kwargs):
+    """Expire every cached page that lists topics"""
+    invalidate(TOPICS, topic_dependency(instance.slug))
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    """Update the published counters and expire the post's topic pages"""
+    # Post.save records the new status once the post_save receivers have run
+    previous_status = getattr(instance, '_loaded_status', None)
+    # A status that is still deferred was not written, and is not loaded just for this
+    status = instance.__dict__.get('status')
+    if not created and None not in (previous_status, status) and previous_status != status:
+        counters.post_status_changed(instance, previous_status)
+    invalidate(post_dependency(instance.slug))
+    if status is None or PUBLISHED in (status, previous_status):
+        invalidate(POSTS, *post_shard_dependencies([instance.pk]))
+    if not created:
+        invalidate(*_topic_pages(Topic.objects.filter(posts=instance)))
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    """Drop a post from its topics' counters and pages before its links are deleted"""
+    invalidate(TOPICS, *_topic_pages(Topic.objects.filter(posts=instance)))
+    invalidate(post_dependency(instance.slug))
+    if PUBLISHED in (instance.status, getattr(instance, '_loaded_status', None)):
+        invalidate(POSTS, *post_shard_dependencies([instance.pk]))
+    counters.post_removed(instance)
+
+
+def _topic_pages(topics):
+    return [topic_dependency(slug) for slug in topics.values_list('slug', flat=True)]
+
+
+@receiver(m2m_changed, sender=Post.topics.through)
+def post_topics_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep counters and the top topics cache in step with Post.topics"""
+    if action == 'post_add':
+        _count_links(instance, reverse, pk_set, sign=1)
+    elif action in ('pre_remove', 'pre_clear'):
+        _count_links(instance, reverse, _linked_ids(instance, reverse, pk_set), sign=-1)
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_top_topics()
+    if action in ('post_add', 'pre_remove', 'pre_clear'):
+        _expire_topic_pages(instance, reverse, pk_set)
+
+
+def _linked_ids(instance, reverse, pk_set):
+    """Return the ids on the other side that are really linked right now"""
+    through = Post.topics.through.objects
+    if reverse:
+        links = through.filter(topic_id=instance.pk)
+        column = 'post_id'
+    else:
+        links = through.filter(post_id=instance.pk)
+        column = 'topic_id'
+    if pk_set is not None:
+        links = links.filter(**{f'{column}__in': pk_set})
+    return list(links.values_list(column, flat=True))
+
+
+def _expire_topic_pages(instance, reverse, pk_set):
+    if reverse:
+        slugs = [instance.slug]
+    elif pk_set is None:
+        slugs = Topic.objects.filter(posts=instance).values_list('slug', flat=True)
+    else:
+        slugs = Topic.objects.filter(pk__in=pk_set).values_list('slug', flat=True)
+    invalidate(TOPICS, *[topic_dependency(slug) for slug in slugs])
+
+
+def _count_links(instance, reverse, pk_set, sign):
+    if not pk_set:
+        return
+    if reverse:
+        counters.topic_posts_linked(instance, pk_set, sign)
+        post_ids, topic_ids = pk_set, [instance.pk]
+    else:
+        counters.post_topics_linked(instance, pk_set, sign)
+        post_ids, topic_ids = [instance.pk], pk_set
+    if sign > 0:
+        counters.activity_linked(post_ids, topic_ids)
+    else:
+        counters.activity_unlinked(post_ids, topic_ids)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    """Keep the post's comment counters in step with new, moved and (un)approved comments"""
+    invalidate(COMMENTS)
+    # Comment.save records what was counted once the post_save receivers have run
+    previous = None if created else getattr(instance, '_loaded_counted', None)
+    if not created and previous is None:
+        return
+    counters.comment_saved(instance, previous)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, origin=None, **kwargs):
+    """Take a deleted comment off its post's counters"""
+    invalidate(COMMENTS)
+    if isinstance(origin, Post) or getattr(origin, 'model', None) is Post:
+        return  # the post goes with it
+    counted = getattr(instance, '_loaded_counted', None)
+    post_id, approved = counted or (instance.post_id, instance.approved)
+    counters.comment_removed(post_id, approved)
+
+
+@receiver(post_save, sender=PhotoSubmission)
+def photo_submitted(sender, instance, created, **kwargs):
+    """Generate the resized variants of a new submission in the background"""
+    if created and instance.photo:
+        schedule_variants(instance.pk)
+
+
+@receiver(post_delete, sender=PhotoSubmission)
+def photo_deleted(sender, instance, **kwargs):
+    """Remove the stored files once no submission refers to them"""
+    transaction.on_commit(lambda: release_photo_files(instance))
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    """Apply MTG_SQLITE_PRAGMAS to every new SQLite connection"""
+    if connection.vendor != 'sqlite':
+        return
+    # On the raw connection, so the pragmas never show up in query counts
+    for name, value in getattr(settings, 'MTG_SQLITE_PRAGMAS', {}).items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,185 @@
+"""Sitemaps for topic pages and published posts, streamed in shards.
+
+Rows are split into shards by primary key range: shard n of a section
+holds the rows with ``n * SHARD_SIZE < pk <= (n + 1) * SHARD_SIZE``. No
+shard can exceed the 50,000 URL limit of the sitemap protocol, and
+finding a row's shard needs no query. While all sections together fit
+in one sitemap, /sitemap.xml is a plain urlset. Past that size it
+becomes a sitemap index of the non-empty shards.
+
+Shards are read in keyset order a chunk at a time and written straight
+into a StreamingHttpResponse, so memory does not grow with the table.
+Under ASGI the body is an async iterator that pulls each chunk in the
+sync thread, as Django reads a sync iterator into a list before sending
+it there. cache_response keeps a finished shard until one of its rows
+changes, as long as it is under STREAMED_CACHE_LIMIT.
+"""
+from itertools import chain
+from xml.sax.saxutils import escape
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Count, F, IntegerField, Max
+from django.db.models.expressions import ExpressionWrapper
+from django.http import Http404, StreamingHttpResponse
+
+from .models import Post, Topic
+from .response_cache import POSTS, TOPICS, cache_response, invalidate, sitemap_dependency
+from .urlbuilder import build_url
+
+SHARD_SIZE = 50_000
+CHUNK_SIZE = 2_000
+CONTENT_TYPE = 'application/xml; charset=utf-8'
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+NAMESPACE = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+
+class Section:
+    """The rows of one sitemap section and how to turn them into URLs"""
+
+    def __init__(self, queryset, url_name, lastmod=None):
+        self.queryset = queryset
+        self.url_name = url_name
+        self.lastmod = lastmod
+
+    def rows(self):
+        """Rows of this section as (pk, slug, lastmod) tuples"""
+        fields = ['pk', 'slug'] + ([self.lastmod] if self.lastmod else [])
+        return self.queryset().values_list(*fields)
+
+    def shards(self):
+        """{shard: (url count, last modification)} for the non-empty shards"""
+        shard = ExpressionWrapper((F('pk') - 1) / SHARD_SIZE, output_field=IntegerField())
+        totals = {'urls': Count('pk')}
+        if self.lastmod:
+            totals['lastmod'] = Max(self.lastmod)
+        grouped = (
+            self.queryset().order_by()
+            .annotate(shard=shard).values('shard').annotate(**totals).order_by('shard')
+        )
+        return {row['shard']: (row['urls'], row.get('lastmod')) for row in grouped}
+
+    def shard_rows(self, shard):
+        """Rows of one shard, fetched a keyset chunk at a time"""
+        last, high = shard * SHARD_SIZE, (shard + 1) * SHARD_SIZE
+        while True:
+            chunk = list(
+                self.rows().filter(pk__gt=last, pk__lte=high).order_by('pk')[:CHUNK_SIZE]
+                .iterator(chunk_size=CHUNK_SIZE)
+            )
+            if not chunk:
+                return
+            yield chunk
+            last = chunk[-1][0]
+
+
+SECTIONS = {
+    'topics': Section(Topic.objects.all, 'mtg_blog_app:topic_detail'),
+    'posts': Section(
+        lambda: Post.objects.filter(status='published'), 'mtg_blog_app:post_detail', 'updated'),
+}
+
+
+def shard_of(pk):
+    """The shard a primary key falls into"""
+    return (pk - 1) // SHARD_SIZE
+
+
+def post_shard_dependencies(post_ids):
+    """Cache dependencies of the post shards holding the given posts"""
+    return {sitemap_dependency('posts', shard_of(pk)) for pk in post_ids if pk}
+
+
+def invalidate_post_shards():
+    """Expire every post shard, for bulk writes that skip the signals"""
+    highest = Post.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    invalidate(*[sitemap_dependency('posts', shard) for shard in range(shard_of(highest) + 1)])
+
+
+def _lastmod(value):
+    return f'<lastmod>{value.isoformat()}</lastmod>' if value else ''
+
+
+def _urls(request, section, chunks):
+    base = request.build_absolute_uri('/').rstrip('/')
+    for chunk in chunks:
+        yield ''.join(
+            f'<url><loc>{escape(base + build_url(section.url_name, slug=row[1]))}</loc>'
+            f'{_lastmod(row[2] if len(row) > 2 else None)}</url>\n'
+            for row in chunk
+        )
+
+
+def _all_rows(section, shards):
+    for shard in shards:
+        yield from section.shard_rows(shard)
+
+
+def _urlset(request, parts):
+    yield f'{XML_HEADER}<urlset xmlns="{NAMESPACE}">\n'
+    for section, chunks in parts:
+        yield from _urls(request, section, chunks)
+    yield '</urlset>\n'
+
+
+def _index(request, shards):
+    yield f'{XML_HEADER}<sitemapindex xmlns="{NAMESPACE}">\n'
+    for name, shard, lastmod in shards:
+        loc = request.build_absolute_uri(
+            build_url('mtg_blog_app:sitemap_shard', section=name, shard=shard))
+        yield f'<sitemap><loc>{escape(loc)}</loc>{_lastmod(lastmod)}</sitemap>\n'
+    yield '</sitemapindex>\n'
+
+
+async def _aiterate(chunks):
+    """Async iterator over a sync one, running each step in the sync thread"""
+    done = object()
+    step = sync_to_async(next)
+    try:
+        while (chunk := await step(chunks, done)) is not done:
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close)()
+
+
+def _streamed(request, content):
+    """A streamed response of `content`, async under ASGI so it is not buffered first"""
+    if isinstance(request, ASGIRequest):
+        content = _aiterate(content)
+    return StreamingHttpResponse(content, content_type=CONTENT_TYPE)
+
+
+@cache_response(lambda request: [TOPICS, POSTS])
+def sitemap(request):
+    """A single urlset while everything fits, otherwise an index of the shards"""
+    shards = {name: section.shards() for name, section in SECTIONS.items()}
+    total = sum(urls for found in shards.values() for urls, _ in found.values())
+    if total <= SHARD_SIZE:
+        parts = [
+            (section, _all_rows(section, shards[name])) for name, section in SECTIONS.items()
+        ]
+        content = _urlset(request, parts)
+    else:
+        content = _index(request, [
+            (name, shard, lastmod)
+            for name, found in shards.items() for shard, (_, lastmod) in found.items()
+        ])
+    return _streamed(request, content)
+
+
+def _shard_dependencies(request, section, shard):
+    if section == 'posts':
+        return [sitemap_dependency(section, shard)]
+    return [TOPICS]
+
+
+@cache_response(_shard_dependencies)
+def sitemap_shard(request, section, shard):
+    """One shard of the sitemap"""
+    if section not in SECTIONS:
+        raise Http404('No such sitemap section')
+    chunks = SECTIONS[section].shard_rows(shard)
+    first = next(chunks, None)
+    if first is None:
+        raise Http404('Empty sitemap shard')
+    return _streamed(request, _urlset(request, [(SECTIONS[section], chain([first], chunks))]))
@@ -0,0 +1,82 @@
+"""Collision-free slug allocation.
+
+A taken slug gets the next numeric suffix: ``deck-tech``, ``deck-tech-2``,
+``deck-tech-3`` and so on. The highest suffix in use for a base comes from
+one aggregate over a range of the unique slug index, ``base-`` <= slug <
+``base.`` (``.`` sorts right after ``-``), so only slugs sharing the prefix
+are read. A regex then keeps just ``base-<n>``, dropping ones such as
+``deck-tech-guide``, and the database returns only the maximum.
+Allocation is optimistic, so a concurrent insert that takes the same slug
+is handled by save_with_slug retrying inside a savepoint.
+"""
+import re
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, IntegerField, Max, Q, Value, When
+from django.db.models.functions import Cast, Substr
+from django.utils.text import slugify
+
+SAVE_ATTEMPTS = 5
+
+
+def _highest_suffix(model, field, base):
+    """Highest number in use for base: 0 if free, 1 for the bare base, n for base-n"""
+    numbered = Q(**{f'{field}__gte': f'{base}-', f'{field}__lt': f'{base}.'}) & Q(
+        **{f'{field}__regex': rf'^{re.escape(base)}-[1-9][0-9]*$'})
+    suffix = Cast(Substr(field, len(base) + 2), IntegerField())
+    return model.objects.filter(Q(**{field: base}) | numbered).aggregate(
+        highest=Max(Case(When(**{field: base}, then=Value(1)), default=suffix)),
+    )['highest'] or 0
+
+
+def allocate_slugs(model, sources, field='slug'):
+    """Return one unused slug per source string, unique within the list too.
+
+    Each distinct base costs one query, however many rows already
+    share it, so bulk callers pay per distinct title rather than per row.
+    """
+    max_length = model._meta.get_field(field).max_length
+    highest = {}
+    slugs = []
+    for source in sources:
+        base = slugify(source)[:max_length].strip('-') or model._meta.model_name
+        while True:
+            if base not in highest:
+                highest[base] = _highest_suffix(model, field, base)
+            number = highest[base] + 1
+            slug = base if number == 1 else f'{base}-{number}'
+            if len(slug) <= max_length:
+                break
+            base = base[:max_length - len(slug)].strip('-')
+        highest[base] = number
+        slugs.append(slug)
+    return slugs
+
+
+def unique_slug(model, source, field='slug'):
+    """Return an unused slug for a single source string"""
+    return allocate_slugs(model, [source], field)[0]
+
+
+def save_with_slug(instance, save, source, field='slug'):
+    """Run save(), first allocating instance's slug from source if it is empty.
+
+    An allocated slug that a concurrent insert took first makes the insert
+    fail with IntegrityError. In that case a fresh slug is allocated and
+    the save is retried in a savepoint.
+    """
+    # A deferred slug was loaded from a saved row, so it is already set
+    if field in instance.get_deferred_fields() or getattr(instance, field):
+        return save()
+    model = type(instance)
+    for _ in range(SAVE_ATTEMPTS):
+        setattr(instance, field, unique_slug(model, source, field))
+        try:
+            with transaction.atomic():
+                return save()
+        except IntegrityError:
+            if not model.objects.filter(**{field: getattr(instance, field)}).exists():
+                setattr(instance, field, '')
+                raise
+    setattr(instance, field, '')
+    raise IntegrityError(f'no free {field} for {source!r} after {SAVE_ATTEMPTS} attempts')
@@ -0,0 +1,232 @@
+"""Render the read-only pages to HTML files that a web server can serve as is.
+
+Pages are written as ``home/index.html``, ``topics/index.html`` and
+``topic/<slug>.html`` so a server can map a URL to ``$uri/index.html`` or
+``$uri.html``. Later pages of a topic go to ``topic/<slug>/page-<n>.html``
+and the topic pages' cursor links are rewritten to point at them.
+"""
+import json
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit
+
+import django
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.apps import apps
+from django.contrib.auth.models import AnonymousUser
+from django.db import connections
+from django.db.models import Max
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+from django.utils import timezone
+from django.utils.html import escape
+
+from .models import Topic
+from .pagination import keyset_paginate
+from .topic_cache import get_top_topics
+from .views import TopicDetailView
+
+STATE_FILE = '.export_state.json'
+
+
+def page_file(path):
+    """File, relative to the output directory, that holds the page at `path`"""
+    path = path.strip('/')
+    if path.startswith('topic/'):
+        return f'{path}.html'
+    return os.path.join(path, 'index.html')
+
+
+def write_atomic(filename, content):
+    """Write a file so readers only ever see the old or the new version"""
+    directory = os.path.dirname(filename)
+    os.makedirs(directory, exist_ok=True)
+    handle, temporary = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as output:
+            output.write(content)
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, filename)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.unlink(temporary)
+        raise
+
+
+async def _anonymous_user():
+    return AnonymousUser()
+
+
+def _anonymous_request(path):
+    request = RequestFactory().get(path)
+    request.user = AnonymousUser()
+    request.auser = _anonymous_user
+    return request
+
+
+def render_page(path):
+    """Render one URL (with an optional query string) as an anonymous visitor would see it"""
+    request = _anonymous_request(path)
+    match = resolve(urlsplit(path).path)
+    view = match.func
+    if iscoroutinefunction(view):
+        view = async_to_sync(view)
+    response = view(request, *match.args, **match.kwargs)
+    if hasattr(response, 'render') and callable(response.render):
+        response.render()
+    if response.status_code != 200:
+        raise ValueError(f'{path} returned status {response.status_code}')
+    return response.content
+
+
+def export_pages(paths, output_dir):
+    """Render and write a batch of pages, returning how many were written"""
+    for path in paths:
+        write_atomic(os.path.join(output_dir, page_file(path)), render_page(path))
+    return len(paths)
+
+
+def topic_page_paths(view):
+    """Static URL, cursor and page of every page of the view's topic, in order"""
+    first = reverse('mtg_blog_app:topic_detail', kwargs={'slug': view.object.slug})
+    pages, cursor = [], None
+    while True:
+        page = keyset_paginate(view.get_posts(), view.post_ordering, view.paginate_by, cursor)
+        static = first if not pages else f'{first}/page-{len(pages) + 1}'
+        pages.append((static, cursor, page))
+        if not page.has_next:
+            return pages
+        cursor = page.next_cursor
+
+
+def render_topic_page(view, path, page):
+    """Render a page of the view's topic from posts that are already paginated"""
+    view.setup(_anonymous_request(path), slug=view.object.slug)
+    response = view.render_to_response(
+        view.get_context_data(topic=view.object, posts=page, page=page))
+    return response.render().content
+
+
+def export_topic(slug, output_dir):
+    """Write every page of a topic, with links between them; return the pages written"""
+    view = TopicDetailView()
+    view.object = Topic.objects.get(slug=slug)
+    pages = topic_page_paths(view)
+    for number, (static, cursor, page) in enumerate(pages):
+        path = f'{pages[0][0]}?cursor={cursor}' if cursor else pages[0][0]
+        html = render_topic_page(view, path, page).decode()
+        if page.has_previous:
+            html = html.replace(
+                f'href="?cursor={escape(page.prev_cursor)}"', f'href="{pages[number - 1][0]}"')
+        if page.has_next:
+            html = html.replace(
+                f'href="?cursor={escape(page.next_cursor)}"', f'href="{pages[number + 1][0]}"')
+        write_atomic(os.path.join(output_dir, page_file(static)), html.encode())
+    # Pages past the end from an earlier export, when the topic had more posts
+    directory = os.path.join(output_dir, page_file(pages[0][0])[:-len('.html')])
+    for filename in os.listdir(directory) if os.path.isdir(directory) else ():
+        stem = os.path.splitext(filename)[0]
+        if not stem.startswith('page-') or not stem[5:].isdigit() or int(stem[5:]) > len(pages):
+            os.unlink(os.path.join(directory, filename))
+    return len(pages)
+
+
+def export_topics(slugs, output_dir):
+    """Export a batch of topics, returning how many pages were written"""
+    return sum(export_topic(slug, output_dir) for slug in slugs)
+
+
+def _init_worker():
+    if not apps.ready:
+        django.setup()
+
+
+def _export_in_worker(slugs, output_dir):
+    try:
+        return export_topics(slugs, output_dir)
+    finally:
+        connections.close_all()
+
+
+def _batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def read_state(output_dir):
+    """Return the state saved by the last export, or None"""
+    try:
+        with open(os.path.join(output_dir, STATE_FILE), encoding='utf-8') as state:
+            return json.load(state)
+    except (OSError, ValueError):
+        return None
+
+
+def topic_fingerprints():
+    """{slug: a string that changes whenever the topic's pages would}.
+
+    Renames, posts edited, published, linked, unlinked or deleted all
+    change either the topic's name, its counters or its newest post
+    update, so topics without posts are covered too.
+    """
+    rows = Topic.objects.annotate(latest=Max('posts__updated')).values_list(
+        'slug', 'name', 'post_count', 'published_post_count', 'latest')
+    return {
+        slug: f'{name}|{posts}|{published}|{latest.isoformat() if latest else ""}'
+        for slug, name, posts, published, latest in rows
+    }
+
+
+def export_site(output_dir, workers=1, incremental=False, batch_size=100):
+    """Export home, the topic list and topic pages; return the number of pages written.
+
+    With `incremental`, only topics whose fingerprint changed since the
+    last export are rendered again. Every page carries the top topics
+    sidebar, so a change in that ranking makes the export a full one.
+    """
+    started = timezone.now()
+    ranking = [topic.slug for topic in get_top_topics(limit=5, min_posts=1)]
+    fingerprints = topic_fingerprints()
+    state = (read_state(output_dir) if incremental else None) or {}
+
+    slugs = sorted(fingerprints)
+    if state.get('ranking') == ranking and 'topics' in state:
+        previous = state['topics']
+        slugs = [slug for slug in slugs if previous.get(slug) != fingerprints[slug]]
+    batches = list(_batches(slugs, batch_size))
+
+    written = export_pages(
+        [reverse('mtg_blog_app:home'), reverse('mtg_blog_app:topic_list')], output_dir)
+    if workers > 1 and len(batches) > 1:
+        # Child processes must open their own database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            written += sum(pool.map(_export_in_worker, batches, [output_dir] * len(batches)))
+    else:
+        written += sum(export_topics(batch, output_dir) for batch in batches)
+
+    _remove_deleted_topics(output_dir, fingerprints)
+    write_atomic(
+        os.path.join(output_dir, STATE_FILE),
+        json.dumps({
+            'exported_at': started.isoformat(), 'ranking': ranking, 'topics': fingerprints,
+        }).encode(),
+    )
+    return written
+
+
+def _remove_deleted_topics(output_dir, existing):
+    directory = os.path.join(output_dir, 'topic')
+    if not os.path.isdir(directory):
+        return
+    for filename in os.listdir(directory):
+        slug, extension = os.path.splitext(filename)
+        if slug in existing:
+            continue
+        path = os.path.join(directory, filename)
+        if extension == '.html':
+            os.unlink(path)
+        elif not extension and os.path.isdir(path):
+            shutil.rmtree(path)
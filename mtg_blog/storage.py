@@ -0,0 +1,65 @@
+"""Content-addressed file storage for uploaded photos"""
+import hashlib
+import os
+import re
+import uuid
+
+from django.core.files.storage import FileSystemStorage, storages
+from django.utils.deconstruct import deconstructible
+
+HASHED_NAME = re.compile(r'(^|/)[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.[\w]+$')
+SHARD_DIRS = re.compile(r'(^|/)[0-9a-f]{2}/[0-9a-f]{2}$')
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage that names every file by the SHA-256 of its content.
+
+    A file uploaded to ``contest_photos/board.jpg`` is stored as
+    ``contest_photos/ab/cd/abcd….jpg``. Saving content that is already
+    stored writes nothing and returns the existing name, so identical
+    uploads share one file. A name derived from a stored file (such as
+    a resized variant) is placed under the same top directory rather than
+    inside its shards. Files are written to a temporary name and renamed
+    into place, so readers never see a partial file. Shared files are
+    reference counted by their users, under PhotoFile locks.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Names are decided by content in _save; equal names mean equal files
+        return name
+
+    def hashed_name(self, name, content):
+        """Return the content-addressed name for `content` uploaded as `name`"""
+        digest = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk if isinstance(chunk, bytes) else chunk.encode())
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        hexdigest = digest.hexdigest()
+        directory = SHARD_DIRS.sub('', os.path.dirname(name))
+        extension = os.path.splitext(name)[1].lower()
+        return '/'.join(
+            part for part in (directory, hexdigest[:2], hexdigest[2:4], hexdigest + extension)
+            if part
+        )
+
+    def _save(self, name, content):
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            return name
+        temporary = super()._save(f'{name}.{uuid.uuid4().hex}.tmp', content)
+        os.replace(self.path(temporary), self.path(name))
+        return name
+
+
+def is_hashed_name(name):
+    """Whether a stored name was produced by ContentAddressedStorage"""
+    return bool(HASHED_NAME.search(name))
+
+
+def photo_storage():
+    """Storage used for contest photos and their variants"""
+    return storages['photos']
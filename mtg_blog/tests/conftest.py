@@ -0,0 +1,39 @@
+"""Shared fixtures for the mtg_blog tests"""
+from io import BytesIO
+import pytest
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+from mtg_blog.models import PhotoSubmission
+from mtg_blog.topic_cache import clear_top_topics_cache
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Start every test with empty caches"""
+    cache.clear()
+    clear_top_topics_cache()
+    yield
+    cache.clear()
+    clear_top_topics_cache()
+
+
+def jpeg_bytes(size=(640, 480), color='navy'):
+    """Return the bytes of a real JPEG image"""
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    """Store uploads in a temporary directory"""
+    settings.MEDIA_ROOT = str(tmp_path)
+    return tmp_path
+
+@pytest.fixture
+def jpeg_submission(db, media_root):
+    """PhotoSubmission with a decodable JPEG"""
+    return PhotoSubmission.objects.create(
+        name='Photo User',
+        email='photo@example.com',
+        photo=SimpleUploadedFile('board.jpg', jpeg_bytes(), content_type='image/jpeg'),
+    )
@@ -7,6 +7,7 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import RequestFactory
 from mtg_blog.admin import PhotoSubmissionAdmin
 from mtg_blog.models import PhotoSubmission
+from mtg_blog.photo_variants import generate_variants
 
 @pytest.fixture
 def admin_user():
@@ -63,13 +64,23 @@ class TestPhotoSubmissionAdmin:
         admin_instance = PhotoSubmissionAdmin(PhotoSubmission, AdminSite())
         assert admin_instance.ordering == ['-submission_date']
 
-    def test_admin_photo_thumbnail_method(self, admin_user, sample_photo_submission):
+    def test_admin_photo_thumbnail_method(self, admin_user, jpeg_submission):
         """Test photo thumbnail method exists"""
         admin_instance = PhotoSubmissionAdmin(PhotoSubmission, AdminSite())
 
         assert hasattr(admin_instance, 'photo_thumbnail')
         assert callable(admin_instance.photo_thumbnail)
 
-        thumbnail_html = admin_instance.photo_thumbnail(sample_photo_submission)
-        assert 'img source=' in thumbnail_html
+        generate_variants(jpeg_submission.pk)
+        jpeg_submission.refresh_from_db()
+        thumbnail_html = admin_instance.photo_thumbnail(jpeg_submission)
+        assert 'img src=' in thumbnail_html
         assert 'width="50"' in thumbnail_html
+        assert jpeg_submission.thumbnail.url in thumbnail_html
+
+    def test_admin_thumbnail_while_pending(self, admin_user, sample_photo_submission):
+        """Test the full size upload is never used as a thumbnail"""
+        admin_instance = PhotoSubmissionAdmin(PhotoSubmission, AdminSite())
+
+        assert admin_instance.photo_thumbnail(sample_photo_submission) == 'Pending'
+        assert admin_instance.photo_preview(sample_photo_submission) == 'Pending'
@@ -0,0 +1,104 @@
+"""Tests for the read-only JSON API"""
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from mtg_blog.models import Comment, Post, Topic
+
+@pytest.fixture
+def blog(db):
+    """Published and draft posts across two topics with comments"""
+    user = User.objects.create_user(username='apiuser', password='password123')
+    topics = [Topic.objects.create(name='Modern'), Topic.objects.create(name='Legacy')]
+    posts = []
+    for n in range(5):
+        post = Post.objects.create(title=f'Post {n}', author=user, status='published', content='Body')
+        post.topics.set(topics)
+        Comment.objects.create(post=post, name='Reader', email='secret@example.com',
+                               text='Approved', approved=True)
+        Comment.objects.create(post=post, name='Spammer', email='s@example.com', text='Pending')
+        posts.append(post)
+    Post.objects.create(title='Draft', author=user)
+    return posts
+
+# Page query, plus the topics prefetch for posts
+PAGE_QUERIES = {'topic-list': 1, 'post-list': 2, 'comment-list': 1}
+
+def url(name, **kwargs):
+    """Reverse an API route"""
+    return reverse(f'mtg_blog_app:api-{name}', kwargs=kwargs or None)
+
+def test_posts_are_published_and_cursor_paginated(client, blog):
+    """Test the post list walks every published post newest first with cursors"""
+    seen = []
+    page = client.get(url('post-list'), {'page_size': 2}).json()
+    while True:
+        seen.extend(post['slug'] for post in page['results'])
+        if not page['next']:
+            break
+        page = client.get(page['next']).json()
+    assert seen == [post.slug for post in reversed(blog)]
+    assert client.get(page['previous']).json()['results'][0]['slug'] == blog[2].slug
+    assert client.get(url('post-list'), {'cursor': 'garbage'}).status_code == 404
+
+def test_post_fields(client, blog):
+    """Test full and sparse post representations"""
+    post = client.get(url('post-detail', slug=blog[0].slug)).json()
+    assert post['author'] == 'apiuser'
+    assert post['comment_count'] == 1
+    assert [topic['slug'] for topic in post['topics']] == ['legacy', 'modern']
+
+    post = client.get(url('post-detail', slug=blog[0].slug), {'fields': 'title,author'}).json()
+    assert post == {'title': 'Post 0', 'author': 'apiuser'}
+    assert client.get(url('post-list'), {'fields': 'title,nope'}).status_code == 400
+    assert client.get(url('post-detail', slug='draft')).status_code == 404
+
+def test_sparse_fields_trim_the_select(client, blog):
+    """Test ?fields= turns into only() so unrequested columns are not read"""
+    with CaptureQueriesContext(connection) as queries:
+        client.get(url('post-list'), {'fields': 'title'})
+    assert len(queries) == 1
+    assert '"content"' not in queries[0]['sql']
+    assert 'auth_user' not in queries[0]['sql']
+
+def test_comments_hide_pending_and_email(client, blog):
+    """Test only approved comments are listed, without email addresses"""
+    comments = client.get(url('comment-list'), {'post': blog[0].slug}).json()['results']
+    assert [comment['text'] for comment in comments] == ['Approved']
+    assert 'email' not in comments[0]
+    assert comments[0]['post'] == blog[0].slug
+
+def test_topics(client, blog):
+    """Test topics list in name order with their counters"""
+    topics = client.get(url('topic-list')).json()['results']
+    assert [(topic['name'], topic['post_count']) for topic in topics] == [('Legacy', 5), ('Modern', 5)]
+    posts = client.get(url('post-list'), {'topic': 'legacy', 'fields': 'slug'}).json()['results']
+    assert len(posts) == 5
+
+def test_etag_and_not_modified(client, blog, django_assert_num_queries):
+    """Test a matching If-None-Match is answered with 304 before any query"""
+    response = client.get(url('post-list'))
+    etag = response['ETag']
+    with django_assert_num_queries(0):
+        assert client.get(url('post-list'), HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    blog[-1].title = 'Renamed'
+    blog[-1].save()
+    assert client.get(url('post-list'), HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+def test_new_comment_changes_the_etag(client, blog):
+    """Test comment changes reach the comment list and the posts' comment counts"""
+    etags = [client.get(url(name))['ETag'] for name in ('comment-list', 'post-list')]
+    Comment.objects.create(post=blog[0], name='Late', email='l@example.com', text='Hi', approved=True)
+    assert [client.get(url(name))['ETag'] for name in ('comment-list', 'post-list')] != etags
+    assert client.get(url('comment-list'), HTTP_IF_NONE_MATCH=etags[0]).status_code == 200
+
+@pytest.mark.parametrize('name', ['topic-list', 'post-list', 'comment-list'])
+def test_query_count_does_not_grow_with_page_size(client, blog, name, django_assert_num_queries):
+    """Test every list page costs the same number of queries whatever its size"""
+    with django_assert_num_queries(PAGE_QUERIES[name]):
+        client.get(url(name), {'page_size': 1})
+    with django_assert_num_queries(PAGE_QUERIES[name]):
+        client.get(url(name), {'page_size': 100})
+
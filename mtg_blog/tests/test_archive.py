@@ -0,0 +1,86 @@
+"""Tests for archiving old comments"""
+from datetime import timedelta
+from io import StringIO
+import pytest
+from django.contrib.admin.sites import AdminSite
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import RequestFactory
+from django.utils import timezone
+from mtg_blog.admin import ArchivedCommentAdmin
+from mtg_blog.archive import archive_comments, post_comments
+from mtg_blog.counters import reconcile_comment_counts
+from mtg_blog.models import ArchivedComment, Comment, Post
+from mtg_blog.purge import purge_posts
+
+@pytest.fixture
+def post(db):
+    """Post with comments of different ages"""
+    user = User.objects.create_user(username='archivist', password='password123')
+    post = Post.objects.create(title='Old Thread', author=user)
+    now = timezone.now()
+    for days, approved in [(400, True), (300, True), (200, False), (10, True)]:
+        comment = Comment.objects.create(post=post, name=f'{days} days', email='r@example.com',
+                                         text='Hi', approved=approved)
+        Comment.objects.filter(pk=comment.pk).update(created=now - timedelta(days=days))
+    return post
+
+def names(comments):
+    """Return the names of a list of comments"""
+    return [comment.name for comment in comments]
+
+def test_archive_moves_old_approved_comments(post):
+    """Test only old approved comments move, in batches, keeping their ids"""
+    ids = set(Comment.objects.filter(approved=True, name__in=['400 days', '300 days'])
+              .values_list('pk', flat=True))
+    batches = []
+    moved = archive_comments(timezone.now() - timedelta(days=100), batch_size=1,
+                             progress=batches.append)
+    assert moved == 2 and batches == [1, 2]
+    assert set(ArchivedComment.objects.values_list('pk', flat=True)) == ids
+    assert names(Comment.objects.order_by('-created')) == ['10 days', '200 days']
+
+    post.refresh_from_db()
+    assert (post.comment_count, post.approved_comment_count) == (4, 3)
+    reconcile_comment_counts()
+    post.refresh_from_db()
+    assert (post.comment_count, post.approved_comment_count) == (4, 3)
+
+def test_archived_id_reused_by_a_hot_comment(post):
+    """Test a hot comment whose id is already archived is kept, not deleted"""
+    clash = Comment.objects.get(name='400 days')
+    ArchivedComment.objects.create(
+        id=clash.pk, post=post, name='archived earlier', email='r@example.com', text='Old',
+        created=clash.created, updated=clash.updated)
+    moved = archive_comments(timezone.now() - timedelta(days=100), batch_size=1)
+    assert moved == 1
+    assert Comment.objects.filter(pk=clash.pk, name='400 days').exists()
+    assert ArchivedComment.objects.get(pk=clash.pk).name == 'archived earlier'
+    assert ArchivedComment.objects.filter(name='300 days').exists()
+
+def test_archive_admin_cannot_delete():
+    """Test the archive admin offers no delete, which would skip the counters"""
+    model_admin = ArchivedCommentAdmin(ArchivedComment, AdminSite())
+    assert not model_admin.has_delete_permission(RequestFactory().get('/'))
+
+def test_reads_merge_only_when_asked(post):
+    """Test post_comments stays on the hot table unless asked for the archive"""
+    archive_comments(timezone.now() - timedelta(days=100))
+    assert names(post_comments(post)) == ['10 days', '200 days']
+    assert names(post_comments(post, approved_only=True)) == ['10 days']
+    assert names(post_comments(post, include_archived=True)) == [
+        '10 days', '200 days', '300 days', '400 days']
+
+def test_purge_removes_archived_comments(post):
+    """Test purging a post also clears its archived comments"""
+    archive_comments(timezone.now() - timedelta(days=100))
+    totals = purge_posts(Post.objects.filter(pk=post.pk))
+    assert totals['comments'] == 4
+    assert not ArchivedComment.objects.exists()
+
+def test_command(post):
+    """Test the command archives by age"""
+    out = StringIO()
+    call_command('archive_comments', '--days', '350', stdout=out)
+    assert 'Archived 1 comments' in out.getvalue()
+    assert names(ArchivedComment.objects.all()) == ['400 days']
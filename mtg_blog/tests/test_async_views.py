@@ -0,0 +1,105 @@
+"""Tests for the async views and the async data loading behind them"""
+import asyncio
+import pytest
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import AsyncClient
+from django.urls import reverse
+from mtg_blog import views
+from mtg_blog.forms import PhotoSubmissionForm
+from mtg_blog.models import Topic, Post
+from mtg_blog.pagination import akeyset_paginate, keyset_paginate
+from mtg_blog.topic_cache import aget_top_topics, get_cache_stats, get_top_topics
+
+pytestmark = pytest.mark.django_db
+
+@pytest.fixture
+def topic(db):
+    """A topic with three published posts and a draft"""
+    user = User.objects.create_user(username='asyncuser', password='password123')
+    topic = Topic.objects.create(name='Pauper', slug='pauper')
+    for i in range(3):
+        post = Post.objects.create(
+            title=f'Pauper {i}', slug=f'pauper-{i}', author=user, status='published')
+        post.topics.add(topic)
+    draft = Post.objects.create(title='Pauper draft', slug='pauper-draft', author=user)
+    draft.topics.add(topic)
+    return topic
+
+def asgi_get(url, **extra):
+    """GET a URL through the ASGI handler"""
+    return async_to_sync(AsyncClient().get)(url, **extra)
+
+def test_public_views_are_async():
+    """Test the public pages are served by async views"""
+    assert iscoroutinefunction(views.home)
+    assert iscoroutinefunction(views.contest_view)
+    assert views.TopicListView.view_is_async
+    assert views.TopicDetailView.view_is_async
+
+def test_pages_render_under_asgi(topic):
+    """Test every async page renders through the ASGI handler with the sidebar"""
+    home = asgi_get(reverse('mtg_blog_app:home'))
+    topic_list = asgi_get(reverse('mtg_blog_app:topic_list'))
+    detail = asgi_get(topic.get_absolute_url())
+    contest = asgi_get(reverse('mtg_blog_app:contest'))
+
+    for response in (home, topic_list, detail, contest):
+        assert response.status_code == 200
+        assert 'href="/topic/pauper"' in response.content.decode()
+    assert 'Pauper 2' in detail.content.decode()
+    assert 'Pauper draft' not in detail.content.decode()
+    assert asgi_get(reverse('mtg_blog_app:topic_detail', kwargs={'slug': 'missing'})).status_code == 404
+
+def test_contest_upload_is_validated_off_the_event_loop(monkeypatch, settings):
+    """Test the image checks of a contest entry do not block the event loop"""
+    settings.MTG_PHOTO_VARIANT_WORKERS = 0
+    loops = []
+    full_clean = PhotoSubmissionForm.full_clean
+
+    def recording_full_clean(form):
+        try:
+            loops.append(asyncio.get_running_loop())
+        except RuntimeError:
+            loops.append(None)
+        full_clean(form)
+    monkeypatch.setattr(PhotoSubmissionForm, 'full_clean', recording_full_clean)
+
+    response = async_to_sync(AsyncClient().post)(reverse('mtg_blog_app:contest'), {
+        'name': 'Test User',
+        'email': 'test@example.com',
+        'photo': SimpleUploadedFile('board.jpg', b'not an image', content_type='image/jpeg'),
+    })
+    assert response.status_code == 200
+    assert loops == [None]
+
+def test_async_pages_are_cached(topic, django_assert_num_queries):
+    """Test a repeated GET of an async page is answered from the response cache"""
+    url = topic.get_absolute_url()
+    first = asgi_get(url)
+
+    with django_assert_num_queries(0):
+        again = asgi_get(url)
+        not_modified = asgi_get(url, headers={'If-None-Match': first['ETag']})
+    assert again.content == first.content
+    assert not_modified.status_code == 304
+
+def test_aget_top_topics_shares_the_cache(topic, django_assert_num_queries):
+    """Test the async ranking fills the same cache the sync one reads"""
+    assert async_to_sync(aget_top_topics)(min_posts=1) == [topic]
+
+    with django_assert_num_queries(0):
+        assert get_top_topics(min_posts=1) == [topic]
+    assert get_cache_stats() == {'local_hits': 1, 'shared_hits': 0, 'misses': 1}
+
+def test_akeyset_paginate_matches_keyset_paginate(topic):
+    """Test the async paginator returns the same pages and cursors"""
+    posts = Post.objects.filter(status='published')
+    ordering = ('-published', '-id')
+    first = keyset_paginate(posts, ordering, 2)
+    second = async_to_sync(akeyset_paginate)(posts, ordering, 2, first.next_cursor)
+
+    assert list(async_to_sync(akeyset_paginate)(posts, ordering, 2)) == list(first)
+    assert list(second) == list(keyset_paginate(posts, ordering, 2, first.next_cursor))
+    assert second.prev_cursor and not second.has_next
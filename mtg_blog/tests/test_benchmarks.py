@@ -0,0 +1,37 @@
+"""Performance benchmarks, run with `pytest -m benchmark`"""
+import os
+import pytest
+from mtg_blog.benchmarks import data, runner
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+@pytest.fixture
+def seeded(settings, tmp_path):
+    """Seed the test database with the configured number of posts"""
+    settings.MEDIA_ROOT = str(tmp_path)
+    return data.seed(posts=int(os.environ.get('MTG_BENCH_POSTS', 1000)))
+
+def test_no_regressions_against_baseline(seeded):
+    """Test no URL needs more queries than the stored baseline.
+
+    Set MTG_BENCH_TOLERANCE to also compare medians, against a baseline
+    recorded on the same machine.
+    """
+    results = runner.run(iterations=int(os.environ.get('MTG_BENCH_ITERATIONS', 20)))
+    tolerance = os.environ.get('MTG_BENCH_TOLERANCE')
+    found = runner.regressions(
+        results, runner.load_baseline(), float(tolerance) if tolerance else None)
+    assert not found, '\n'.join(found)
+
+def test_cold_cache_query_counts_stay_bounded(seeded):
+    """Test every URL stays within a fixed query budget with empty caches"""
+    results = runner.run(iterations=3, cold=True)
+    over_budget = {name: result['queries'] for name, result in results.items() if result['queries'] > 10}
+    assert not over_budget
+
+def test_api_pages_cost_the_same_at_any_depth(seeded):
+    """Test a deep API page needs no more queries than the first one"""
+    results = runner.run(iterations=3)
+    for name in ('api_topics', 'api_posts', 'api_comments'):
+        if f'{name}_deep' in results:
+            assert results[f'{name}_deep']['queries'] == results[name]['queries']
@@ -0,0 +1,114 @@
+"""Tests for the denormalized Topic post counters"""
+from io import StringIO
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from mtg_blog.models import Topic, Post
+
+@pytest.fixture
+def user(db):
+    """Setup of User"""
+    return User.objects.create_user(username='counter', password='password123')
+
+@pytest.fixture
+def topic(db):
+    """Topic fixture"""
+    return Topic.objects.create(name='Limited', slug='limited')
+
+def counts(topic):
+    """Return the stored counters of a topic"""
+    topic.refresh_from_db()
+    return topic.post_count, topic.published_post_count
+
+def test_adding_and_removing_topics(user, topic):
+    """Test counters follow Post.topics from both sides"""
+    post = Post.objects.create(title='Draft', slug='draft', author=user)
+    published = Post.objects.create(title='Live', slug='live', author=user, status='published')
+
+    post.topics.add(topic)
+    topic.posts.add(published)
+    assert counts(topic) == (2, 1)
+
+    post.topics.add(topic)
+    assert counts(topic) == (2, 1)
+
+    topic.posts.remove(published)
+    post.topics.remove(topic)
+    assert counts(topic) == (0, 0)
+
+    post.topics.set([topic])
+    published.topics.set([topic])
+    topic.posts.clear()
+    assert counts(topic) == (0, 0)
+
+def test_status_transitions(user, topic):
+    """Test counters follow publishing and unpublishing a post"""
+    post = Post.objects.create(title='Draft', slug='draft', author=user)
+    post.topics.add(topic)
+
+    post.status = 'published'
+    post.save()
+    assert counts(topic) == (1, 1)
+
+    post = Post.objects.get(pk=post.pk)
+    post.status = 'draft'
+    post.save()
+    assert counts(topic) == (1, 0)
+
+def test_deferred_status_is_not_a_transition(user, topic):
+    """Test saving a post loaded without its status keeps the counters right"""
+    post = Post.objects.create(title='Live', slug='live', author=user, status='published')
+    post.topics.add(topic)
+
+    post = Post.objects.defer('status').get(pk=post.pk)
+    post.title = 'Still live'
+    post.save()
+    assert counts(topic) == (1, 1)
+
+    post = Post.objects.only('title').get(pk=post.pk)
+    post.status = 'draft'
+    post.save()
+    assert counts(topic) == (1, 0)
+
+def test_delete_post(user, topic):
+    """Test deleting a post takes it off the counters"""
+    post = Post.objects.create(title='Live', slug='live', author=user, status='published')
+    post.topics.add(topic)
+    post.delete()
+    assert counts(topic) == (0, 0)
+
+def test_stale_topic_save_keeps_counters(user, topic):
+    """Test saving a stale Topic instance does not overwrite its counters"""
+    post = Post.objects.create(title='Live', slug='live', author=user)
+    post.topics.add(topic)
+
+    topic.name = 'Sealed'
+    topic.save()
+    assert counts(topic) == (1, 0)
+
+def test_partial_and_vanished_rows_save_like_django(topic, django_assert_num_queries):
+    """Test a deferred instance saves with one query and a deleted row is inserted again"""
+    loaded = Topic.objects.only('name', 'slug').get(pk=topic.pk)
+    loaded.name = 'Sealed'
+    with django_assert_num_queries(1):
+        loaded.save()
+    assert Topic.objects.get(pk=topic.pk).name == 'Sealed'
+
+    Topic.objects.filter(pk=topic.pk).delete()
+    topic.save()
+    assert Topic.objects.filter(pk=topic.pk).exists()
+
+def test_named_update_fields_write_counters(topic):
+    """Test counters named in update_fields are written as asked"""
+    topic.post_count = 7
+    topic.save(update_fields=['post_count'])
+    assert counts(topic) == (7, 0)
+
+def test_reconcile_topic_counts_command(user, topic):
+    """Test the command repairs drifted counters"""
+    post = Post.objects.create(title='Live', slug='live', author=user, status='published')
+    post.topics.add(topic)
+    Topic.objects.update(post_count=42, published_post_count=7)
+
+    call_command('reconcile_topic_counts', stdout=StringIO())
+    assert counts(topic) == (1, 1)
@@ -0,0 +1,62 @@
+"""Tests for the environment-selected database profiles"""
+import runpy
+import pytest
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+
+SETTINGS_FILE = settings.BASE_DIR / 'mtg_site' / 'settings.py'
+
+def load_settings(monkeypatch, **environ):
+    """Evaluate the settings module with the given environment"""
+    for name, value in environ.items():
+        monkeypatch.setenv(name, value)
+    return runpy.run_path(str(SETTINGS_FILE))
+
+def test_sqlite_is_the_default_profile(monkeypatch):
+    """Test SQLite is used when no profile is set and writers lock at BEGIN"""
+    monkeypatch.delenv('MTG_DB_PROFILE', raising=False)
+    database = load_settings(monkeypatch)['DATABASES']['default']
+    assert database['ENGINE'] == 'django.db.backends.sqlite3'
+    assert database['OPTIONS']['transaction_mode'] == 'IMMEDIATE'
+
+def test_postgresql_profile_pools_connections(monkeypatch):
+    """Test the PostgreSQL profile uses a health-checked pool, or persistent connections without it"""
+    pooled = load_settings(
+        monkeypatch, MTG_DB_PROFILE='postgresql', MTG_DB_NAME='blog', MTG_DB_POOL_MAX='20',
+    )['DATABASES']['default']
+    assert pooled['ENGINE'] == 'django.db.backends.postgresql'
+    assert pooled['NAME'] == 'blog'
+    assert pooled['CONN_HEALTH_CHECKS'] is True
+    assert pooled['OPTIONS']['pool']['max_size'] == 20
+    assert 'CONN_MAX_AGE' not in pooled
+
+    persistent = load_settings(monkeypatch, MTG_DB_POOL='0')['DATABASES']['default']
+    assert 'OPTIONS' not in persistent
+    assert persistent['CONN_MAX_AGE'] == 600
+
+def test_unknown_profile_is_rejected(monkeypatch):
+    """Test a misspelt profile fails at startup"""
+    with pytest.raises(ImproperlyConfigured):
+        load_settings(monkeypatch, MTG_DB_PROFILE='mysql')
+
+def test_new_sqlite_connections_get_the_pragmas(db, tmp_path):
+    """Test every new SQLite connection runs in WAL mode with the configured pragmas"""
+    default = connections['default']
+    tuned = type(default)(
+        {**default.settings_dict, 'NAME': str(tmp_path / 'tuned.sqlite3')}, alias='tuned')
+    try:
+        with tuned.cursor() as cursor:
+            values = {}
+            for name in settings.MTG_SQLITE_PRAGMAS:
+                cursor.execute(f'PRAGMA {name}')
+                values[name] = cursor.fetchone()[0]
+    finally:
+        tuned.close()
+
+    assert values == {
+        'journal_mode': 'wal',
+        'synchronous': 1,
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,
+    }
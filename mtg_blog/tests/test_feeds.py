@@ -0,0 +1,82 @@
+"""Tests for the RSS and Atom feeds"""
+from datetime import timedelta
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from mtg_blog.feeds import FEED_ITEMS
+from mtg_blog.models import Post, Topic
+
+@pytest.fixture
+def topic(db):
+    """Topic with published posts and a draft"""
+    user = User.objects.create_user(username='feeder', password='password123')
+    topic = Topic.objects.create(name='Pauper')
+    now = timezone.now()
+    for n in range(FEED_ITEMS + 2):
+        post = Post.objects.create(title=f'Post {n}', author=user, status='published',
+                                   published=now - timedelta(hours=n), content='word ' * 80)
+        post.topics.add(topic)
+    Post.objects.create(title='Secret Draft', author=user)
+    return topic
+
+def test_site_feeds(client, topic):
+    """Test the site feeds list the latest published posts, newest first"""
+    rss = client.get(reverse('mtg_blog_app:feed_rss'))
+    assert rss['Content-Type'].startswith('application/rss+xml')
+    body = rss.content.decode()
+    assert body.count('<item>') == FEED_ITEMS
+    assert body.index('Post 0<') < body.index('Post 1<')
+    assert 'Secret Draft' not in body and f'Post {FEED_ITEMS}<' not in body
+    assert 'http://testserver/post/post-0' in body
+
+    atom = client.get(reverse('mtg_blog_app:feed_atom'))
+    assert atom['Content-Type'].startswith('application/atom+xml')
+    assert atom.content.decode().count('<entry>') == FEED_ITEMS
+
+def test_topic_feeds(client, topic):
+    """Test per-topic feeds only list that topic's posts and 404 for unknown topics"""
+    other = Topic.objects.create(name='Vintage')
+    rss = client.get(reverse('mtg_blog_app:topic_feed_rss', args=[topic.slug])).content.decode()
+    assert 'MTG Blog: Pauper' in rss and rss.count('<item>') == FEED_ITEMS
+    empty = client.get(reverse('mtg_blog_app:topic_feed_atom', args=[other.slug])).content.decode()
+    assert '<entry>' not in empty
+    assert client.get(reverse('mtg_blog_app:topic_feed_rss', args=['nope'])).status_code == 404
+
+@pytest.mark.parametrize('name', ['feed_rss', 'feed_atom'])
+def test_polls_are_answered_without_queries(client, topic, name):
+    """Test repeat polls come from the cache and conditional polls get 304"""
+    url = reverse(f'mtg_blog_app:{name}')
+    first = client.get(url)
+    with CaptureQueriesContext(connection) as queries:
+        again = client.get(url)
+        not_modified = client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        since = client.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+    assert len(queries) == 0
+    assert again.content == first.content
+    assert not_modified.status_code == 304 and since.status_code == 304
+
+def test_publishing_refreshes_feeds(client, topic):
+    """Test publishing or editing a published post invalidates the site and topic feeds"""
+    site = reverse('mtg_blog_app:feed_rss')
+    per_topic = reverse('mtg_blog_app:topic_feed_rss', args=[topic.slug])
+    etags = {url: client.get(url)['ETag'] for url in (site, per_topic)}
+
+    draft = Post.objects.get(title='Secret Draft')
+    draft.topics.add(topic)
+    draft.status = 'published'
+    draft.save()
+
+    for url, etag in etags.items():
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert 'Secret Draft' in response.content.decode()
+
+def test_pages_advertise_feeds(client, topic):
+    """Test pages link their feeds for autodiscovery"""
+    page = client.get(topic.get_absolute_url()).content.decode()
+    assert reverse('mtg_blog_app:feed_atom') in page
+    assert reverse('mtg_blog_app:topic_feed_rss', args=[topic.slug]) in page
+    assert 'id="post-0"' in page
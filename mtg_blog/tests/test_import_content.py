@@ -0,0 +1,119 @@
+"""Tests for the bulk JSONL content import"""
+import json
+from datetime import datetime, timezone as dt_timezone
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from mtg_blog.importer import ContentImporter, ImportRecordError
+from mtg_blog.models import Comment, ImportCheckpoint, Post, Topic
+
+@pytest.fixture
+def user(db):
+    """Setup of User"""
+    return User.objects.create_user(username='importer', password='password123')
+
+def jsonl(records):
+    """Render records as JSON Lines"""
+    return [json.dumps(record) + '\n' for record in records]
+
+RECORDS = [
+    {'type': 'topic', 'name': 'Commander'},
+    {'type': 'post', 'title': 'Deck Tech', 'author': 'importer', 'status': 'published',
+     'content': 'Body', 'topics': ['Commander', 'Limited'], 'created': '2020-01-02T03:04:05Z'},
+    {'type': 'post', 'title': 'Notes', 'slug': 'my-notes', 'author': 'importer',
+     'status': 'draft', 'published': '2020-01-01T00:00:00Z', 'topics': ['Limited']},
+    {'type': 'comment', 'post': 'deck-tech', 'name': 'A', 'email': 'a@example.com',
+     'text': 'Nice', 'approved': True, 'created': '2021-05-06T07:08:09Z'},
+    {'type': 'comment', 'post': 'my-notes', 'name': 'B', 'email': 'b@example.com', 'text': 'Hm'},
+]
+
+def test_import_follows_post_save_semantics(user):
+    """Test imported posts get slugs, publish dates, topics and counters like saved ones"""
+    counts = ContentImporter('test', batch_size=2).run(jsonl(RECORDS))
+    assert counts == {'topics': 2, 'posts': 2, 'comments': 2}
+
+    deck = Post.objects.get(slug='deck-tech')
+    assert deck.published is not None
+    assert deck.created == datetime(2020, 1, 2, 3, 4, 5, tzinfo=dt_timezone.utc)
+    assert sorted(deck.topics.values_list('name', flat=True)) == ['Commander', 'Limited']
+    assert Post.objects.get(slug='my-notes').published is None
+
+    comment = Comment.objects.get(name='A')
+    assert comment.post == deck and comment.approved
+    assert comment.created.year == 2021
+    assert not Comment.objects.get(name='B').approved
+
+    limited = Topic.objects.get(name='Limited')
+    assert (limited.post_count, limited.published_post_count) == (2, 1)
+    assert ImportCheckpoint.objects.get(source='test').line == len(RECORDS)
+
+def test_import_resumes_after_checkpoint(user):
+    """Test a failed batch keeps earlier batches and the rerun picks up after them"""
+    broken = RECORDS[:3] + [{'type': 'comment', 'post': 'missing', 'name': 'X',
+                             'email': 'x@example.com', 'text': 'lost'}]
+    with pytest.raises(ImportRecordError) as error:
+        ContentImporter('resume', batch_size=2).run(jsonl(broken))
+    assert error.value.line == 4
+    assert ImportCheckpoint.objects.get(source='resume').line == 2
+    assert Post.objects.count() == 1
+
+    ContentImporter('resume', batch_size=2).run(jsonl(RECORDS))
+    assert Post.objects.count() == 2
+    assert Comment.objects.count() == 2
+    assert Post.objects.get(slug='deck-tech').topics.count() == 2
+
+def test_rerun_of_finished_import_is_a_noop(user):
+    """Test importing the same file twice does not duplicate rows"""
+    ContentImporter('again').run(jsonl(RECORDS))
+    counts = ContentImporter('again').run(jsonl(RECORDS))
+    assert counts['posts'] == 0
+    assert Comment.objects.count() == 2
+
+def test_command_reports_bad_records(user, tmp_path):
+    """Test the command names the offending line"""
+    path = tmp_path / 'content.jsonl'
+    path.write_text(''.join(jsonl([
+        {'type': 'post', 'title': 'Ghost', 'author': 'nobody'},
+    ])))
+    with pytest.raises(CommandError, match='line 1: unknown author'):
+        call_command('import_content', str(path))
+
+    path.write_text(''.join(jsonl(RECORDS)))
+    call_command('import_content', str(path), '--batch-size', '3')
+    assert Post.objects.count() == 2
+
+def test_repeated_titles_get_free_slugs(user):
+    """Test imported posts without a slug are numbered instead of dropped"""
+    Post.objects.create(title='Deck Tech', author=user)
+    ContentImporter('dupes').run(jsonl([
+        {'type': 'post', 'title': 'Deck Tech', 'author': 'importer'},
+        {'type': 'post', 'title': 'Deck Tech', 'author': 'importer'},
+    ]))
+    assert sorted(Post.objects.values_list('slug', flat=True)) == [
+        'deck-tech', 'deck-tech-2', 'deck-tech-3']
+
+def test_import_counts_comments(user):
+    """Test imported comments are reflected in the post counters"""
+    ContentImporter('counted').run(jsonl(RECORDS))
+    deck = Post.objects.get(slug='deck-tech')
+    assert (deck.comment_count, deck.approved_comment_count) == (1, 1)
+    assert deck.topic_activity.count() == 2
+
+def test_explicit_slugs_are_cleaned_and_never_reused(user):
+    """Test explicit slugs are slugified and a taken one fails instead of hijacking a post"""
+    existing = Post.objects.create(title='Existing', slug='my-notes', author=user)
+    with pytest.raises(ImportRecordError, match="line 3: slug 'my-notes' is already taken"):
+        ContentImporter('taken').run(jsonl(RECORDS))
+    existing.refresh_from_db()
+    assert existing.topics.count() == 0
+    assert Post.objects.count() == 1
+
+    ContentImporter('cleaned').run(jsonl([
+        {'type': 'post', 'title': 'Primer', 'slug': 'Burn Primer!', 'author': 'importer'},
+    ]))
+    assert Post.objects.filter(slug='burn-primer').exists()
+    with pytest.raises(ImportRecordError, match='line 1: invalid slug'):
+        ContentImporter('invalid').run(jsonl([
+            {'type': 'post', 'title': 'Primer', 'slug': '!!!', 'author': 'importer'},
+        ]))
@@ -0,0 +1,70 @@
+"""Tests for the SQL instrumentation middleware and query budgets"""
+import logging
+import pytest
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.contrib.auth.models import User
+from django.test import AsyncClient, Client
+from django.urls import reverse
+from mtg_blog.instrumentation import SQLInstrumentationMiddleware, normalize_sql, query_budget
+from mtg_blog.models import Topic, Post
+
+@pytest.fixture
+def topic_with_posts(db):
+    """A topic with a handful of published posts"""
+    user = User.objects.create_user(username='profiler', password='password123')
+    topic = Topic.objects.create(name='Brawl', slug='brawl')
+    for i in range(8):
+        post = Post.objects.create(title=f'Brawl {i}', slug=f'brawl-{i}', author=user,
+                                   status='published')
+        post.topics.add(topic)
+    return topic
+
+def test_normalize_sql_ignores_values():
+    """Test statements that differ only by values share a fingerprint"""
+    first = normalize_sql("SELECT * FROM t WHERE id = 1 AND name = 'a' AND x IN (%s, %s)")
+    second = normalize_sql("SELECT *  FROM t WHERE id = 22 AND name = 'b''c' AND x IN (%s, %s, %s)")
+    assert first == second
+
+def test_middleware_is_off_by_default(client, topic_with_posts):
+    """Test no header is added unless the setting is on"""
+    response = client.get(reverse('mtg_blog_app:topic_list'))
+    assert 'Server-Timing' not in response
+
+def test_middleware_reports_server_timing(settings, topic_with_posts, caplog):
+    """Test query count and DB time go to the header and the log"""
+    settings.MTG_SQL_INSTRUMENTATION = True
+    with caplog.at_level(logging.INFO, logger='mtg_blog.sql'):
+        response = Client().get(
+            reverse('mtg_blog_app:topic_detail', kwargs={'slug': topic_with_posts.slug}))
+
+    assert response['Server-Timing'].startswith('db;dur=')
+    record = caplog.records[-1]
+    assert record.sql_stats['path'] == '/topic/brawl'
+    assert record.sql_stats['queries'] >= 2
+    assert record.sql_stats['n_plus_one'] == []
+
+def test_middleware_counts_queries_of_async_views(settings, topic_with_posts, caplog):
+    """Test the async path records the queries the ORM runs on its worker thread"""
+    settings.MTG_SQL_INSTRUMENTATION = True
+    async def view(request):
+        return request
+
+    assert iscoroutinefunction(SQLInstrumentationMiddleware(view))
+    with caplog.at_level(logging.INFO, logger='mtg_blog.sql'):
+        response = async_to_sync(AsyncClient().get)(
+            reverse('mtg_blog_app:topic_detail', kwargs={'slug': topic_with_posts.slug}))
+
+    assert response['Server-Timing'].startswith('db;dur=')
+    assert caplog.records[-1].sql_stats['queries'] >= 2
+
+def test_query_budget_flags_n_plus_one(topic_with_posts):
+    """Test a per-row lookup is reported as N+1"""
+    with pytest.raises(AssertionError, match='likely N\\+1'):
+        with query_budget(50):
+            for post in Post.objects.all():
+                str(post.author)
+
+def test_topic_detail_query_budget(client, topic_with_posts):
+    """Test the topic detail page stays within its query budget"""
+    with query_budget(4, max_repeats=1):
+        client.get(reverse('mtg_blog_app:topic_detail', kwargs={'slug': topic_with_posts.slug}))
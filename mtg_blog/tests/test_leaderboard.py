@@ -0,0 +1,117 @@
+"""Tests for the comment counters and the most-commented leaderboard"""
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from Assignment2_Jeremy_Tempest import question_6_return_the_post_with_the_most_comments
+from mtg_blog.counters import reconcile_comment_counts
+from mtg_blog.leaderboard import top_posts
+from mtg_blog.models import Comment, Post, Topic, TopicPostActivity
+
+@pytest.fixture
+def user(db):
+    """Setup of User"""
+    return User.objects.create_user(username='ranker', password='password123')
+
+@pytest.fixture
+def topic(db):
+    """Topic fixture"""
+    return Topic.objects.create(name='Modern')
+
+def comment(post, approved=False):
+    """Create a comment on a post"""
+    return Comment.objects.create(post=post, name='Reader', email='r@example.com',
+                                  text='Hi', approved=approved)
+
+def counts(post):
+    """Return the stored counters of a post and its activity rows"""
+    post.refresh_from_db()
+    rows = list(TopicPostActivity.objects.filter(post=post)
+                .values_list('comment_count', 'approved_comment_count'))
+    return (post.comment_count, post.approved_comment_count), rows
+
+def test_counters_follow_comments(user, topic):
+    """Test create, approval, moving and deleting comments all update the counters"""
+    post = Post.objects.create(title='Busy', author=user)
+    other = Post.objects.create(title='Quiet', author=user)
+    post.topics.add(topic)
+    first = comment(post)
+    second = comment(post, approved=True)
+    assert counts(post) == ((2, 1), [(2, 1)])
+
+    first.approved = True
+    first.save()
+    first.save()
+    assert counts(post) == ((2, 2), [(2, 2)])
+
+    first = Comment.objects.get(pk=first.pk)
+    first.approved = False
+    first.post = other
+    first.save()
+    assert counts(post) == ((1, 1), [(1, 1)])
+    assert counts(other) == ((1, 0), [])
+
+    second.delete()
+    assert counts(post) == ((0, 0), [(0, 0)])
+
+def test_editing_a_post_keeps_its_counters(user):
+    """Test saving a stale post instance does not overwrite the counters"""
+    post = Post.objects.create(title='Stale', author=user)
+    comment(post)
+    post.title = 'Edited'
+    post.save()
+    assert counts(post)[0] == (1, 0)
+
+def test_activity_rows_follow_links(user, topic):
+    """Test linking and unlinking topics from both sides keeps activity rows"""
+    post = Post.objects.create(title='Linked', author=user)
+    comment(post)
+    topic.posts.add(post)
+    assert counts(post)[1] == [(1, 0)]
+    topic.posts.remove(post)
+    assert counts(post)[1] == []
+    post.topics.set([topic])
+    post.topics.clear()
+    assert counts(post)[1] == []
+
+def test_top_posts_overall_and_per_topic(user, topic):
+    """Test the leaderboard ranks by the counters, overall and per topic"""
+    posts = [Post.objects.create(title=f'Post {n}', author=user) for n in range(4)]
+    posts[1].topics.add(topic)
+    posts[3].topics.add(topic)
+    for post, total, approved in [(posts[0], 3, 0), (posts[1], 2, 2), (posts[3], 1, 1)]:
+        for n in range(total):
+            comment(post, approved=n < approved)
+
+    assert list(top_posts(limit=2)) == [posts[0], posts[1]]
+    assert list(top_posts(limit=2, approved_only=True)) == [posts[1], posts[3]]
+    assert list(top_posts(topic=topic)) == [posts[1], posts[3]]
+    with CaptureQueriesContext(connection) as queries:
+        list(top_posts(limit=5, topic=topic, approved_only=True))
+    assert len(queries) == 1
+
+def test_question_6_keeps_its_contract(user):
+    """Test question 6 still returns the most commented post or None"""
+    assert question_6_return_the_post_with_the_most_comments() is None
+    quiet = Post.objects.create(title='Quiet', author=user)
+    busy = Post.objects.create(title='Busy', author=user)
+    comment(busy)
+    comment(busy, approved=True)
+    comment(quiet)
+    top = question_6_return_the_post_with_the_most_comments()
+    assert top == busy
+    assert top.comment_count == 2
+
+def test_reconcile_after_bulk_writes(user, topic):
+    """Test reconcile catches up with bulk inserts that bypass signals"""
+    post = Post.objects.create(title='Bulk', author=user)
+    Post.topics.through.objects.bulk_create([Post.topics.through(post_id=post.pk, topic_id=topic.pk)])
+    Comment.objects.bulk_create([
+        Comment(post=post, name='A', email='a@example.com', text='x', approved=True),
+        Comment(post=post, name='B', email='b@example.com', text='y'),
+    ])
+    assert reconcile_comment_counts([post.pk]) == 1
+    assert counts(post) == ((2, 1), [(2, 1)])
+    Comment.objects.filter(approved=False).update(approved=True)
+    reconcile_comment_counts()
+    assert counts(post) == ((2, 2), [(2, 2)])
@@ -0,0 +1,53 @@
+"""Tests for the contest photo variant pipeline"""
+from io import StringIO
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from PIL import Image
+from mtg_blog.models import PhotoSubmission
+from mtg_blog.photo_variants import generate_variants
+
+@pytest.mark.django_db
+class TestPhotoVariants:
+    """Test resized variant generation"""
+
+    def test_variants_are_generated_next_to_original(self, jpeg_submission, media_root):
+        """Test each variant is written to the upload's store and recorded"""
+        assert generate_variants(jpeg_submission.pk) == PhotoSubmission.VARIANTS_READY
+        jpeg_submission.refresh_from_db()
+
+        directory = jpeg_submission.photo.name.split('/')[0]
+        for field, box in (('thumbnail', (100, 100)), ('preview', (300, 300)),
+                           ('web_photo', (1280, 1280))):
+            image = getattr(jpeg_submission, field)
+            assert image.name.split('/')[0] == directory
+            with Image.open(media_root / image.name) as variant:
+                assert variant.width <= box[0] and variant.height <= box[1]
+        assert jpeg_submission.image_url('thumbnail') == jpeg_submission.thumbnail.url
+
+    def test_undecodable_upload_is_marked_failed(self, media_root):
+        """Test a broken image is recorded as failed instead of raising"""
+        submission = PhotoSubmission.objects.create(
+            name='Broken', email='broken@example.com',
+            photo=SimpleUploadedFile('broken.jpg', b'not an image', content_type='image/jpeg'),
+        )
+        assert generate_variants(submission.pk) == PhotoSubmission.VARIANTS_FAILED
+        submission.refresh_from_db()
+        assert submission.image_url('thumbnail') == submission.photo.url
+
+    def test_generation_is_scheduled_after_commit(self, media_root, django_capture_on_commit_callbacks):
+        """Test new submissions queue variant generation on commit"""
+        with django_capture_on_commit_callbacks() as callbacks:
+            PhotoSubmission.objects.create(
+                name='Queued', email='queued@example.com',
+                photo=SimpleUploadedFile('queued.jpg', b'x', content_type='image/jpeg'),
+            )
+        assert len(callbacks) == 1
+
+    def test_backfill_command(self, jpeg_submission):
+        """Test the backfill command processes pending submissions"""
+        out = StringIO()
+        call_command('generate_photo_variants', workers=1, stdout=out)
+        assert 'Generated variants for 1 photos (0 failed)' in out.getvalue()
+        jpeg_submission.refresh_from_db()
+        assert jpeg_submission.variants_status == PhotoSubmission.VARIANTS_READY
@@ -0,0 +1,97 @@
+"""Tests for the batched post purge"""
+from datetime import timedelta
+from io import StringIO
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from Assignment2_Jeremy_Tempest import question_9_delete_post_and_all_related_comments
+from mtg_blog.models import Comment, Post, Topic, TopicPostActivity
+from mtg_blog.purge import purge_posts
+
+@pytest.fixture
+def user(db):
+    """Setup of User"""
+    return User.objects.create_user(username='purger', password='password123')
+
+@pytest.fixture
+def topic(db):
+    """Topic fixture"""
+    return Topic.objects.create(name='Legacy')
+
+def make_post(user, topic, title, comments=3, **kwargs):
+    """Create a post in a topic with some comments"""
+    post = Post.objects.create(title=title, author=user, **kwargs)
+    post.topics.add(topic)
+    Comment.objects.bulk_create(
+        Comment(post=post, name='R', email='r@example.com', text=str(n)) for n in range(comments))
+    return post
+
+def test_purge_in_batches(user, topic):
+    """Test posts, comments and links go in batches and the counters follow"""
+    kept = make_post(user, topic, 'Kept', status='published')
+    doomed = [make_post(user, topic, f'Draft {n}', comments=5) for n in range(3)]
+    batches = []
+
+    totals = purge_posts(Post.objects.filter(status='draft'), batch_size=2, progress=batches.append)
+
+    assert totals == {'posts': 3, 'comments': 15, 'links': 3}
+    assert len(batches) == 2
+    assert list(Post.objects.all()) == [kept]
+    assert not Comment.objects.filter(post_id__in=[post.pk for post in doomed]).exists()
+    assert list(TopicPostActivity.objects.values_list('post_id', flat=True)) == [kept.pk]
+    topic.refresh_from_db()
+    assert (topic.post_count, topic.published_post_count) == (1, 1)
+
+
+def test_question_9_uses_purge(user, topic):
+    """Test question 9 still deletes the post and its comments"""
+    post = make_post(user, topic, 'Gone')
+    other = make_post(user, topic, 'Stays')
+    question_9_delete_post_and_all_related_comments(post)
+    assert list(Post.objects.all()) == [other]
+    assert Comment.objects.count() == 3
+    assert post.pk is None
+
+def test_question_9_is_all_or_nothing(user, topic, monkeypatch):
+    """Test a failure part way through question 9 leaves the post and its comments"""
+    post = make_post(user, topic, 'Kept')
+    def fail(*args, **kwargs):
+        raise RuntimeError('database went away')
+    monkeypatch.setattr(Post.topics.through.objects, 'filter', fail)
+    with pytest.raises(RuntimeError):
+        question_9_delete_post_and_all_related_comments(post)
+    assert Post.objects.filter(pk=post.pk).exists()
+    assert Comment.objects.count() == 3
+
+def test_command_filters(user, topic):
+    """Test the command purges by status, age and author only"""
+    other = User.objects.create_user(username='other', password='password123')
+    old = make_post(user, topic, 'Old')
+    Post.objects.filter(pk=old.pk).update(created=timezone.now() - timedelta(days=40))
+    make_post(user, topic, 'New')
+    make_post(other, topic, 'Other Old')
+    Post.objects.filter(title='Other Old').update(created=timezone.now() - timedelta(days=40))
+
+    with pytest.raises(CommandError):
+        call_command('purge_posts')
+
+    out = StringIO()
+    call_command('purge_posts', '--older-than', '30', '--author', 'purger', '--dry-run', stdout=out)
+    assert '1 posts would be purged' in out.getvalue()
+
+    call_command('purge_posts', '--older-than', '30', '--author', 'purger', '--status', 'draft',
+                 stdout=StringIO())
+    assert sorted(Post.objects.values_list('title', flat=True)) == ['New', 'Other Old']
+
+def test_comment_batches_are_bounded(user, topic):
+    """Test a post with many comments is cleared one short transaction per batch"""
+    post = make_post(user, topic, 'Viral', comments=25)
+    with CaptureQueriesContext(connection) as queries:
+        purge_posts(Post.objects.filter(pk=post.pk), batch_size=10)
+    deletes = [q['sql'] for q in queries if q['sql'].startswith('DELETE FROM "mtg_blog_comment"')]
+    assert len(deletes) == 3
+    assert not Comment.objects.exists()
@@ -0,0 +1,106 @@
+"""Query plan regression tests for the hot query shapes"""
+import pytest
+from django.contrib.admin.sites import AdminSite
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from Assignment2_Jeremy_Tempest import (
+    question_3_return_all_posts_for_user,
+    question_5_return_all_post_comments,
+)
+from mtg_blog.admin import CommentAdmin
+from mtg_blog.archive import ARCHIVED_FIELDS
+from mtg_blog.leaderboard import top_posts
+from mtg_blog.models import Comment, Post, Topic
+from mtg_blog.slugs import allocate_slugs
+
+def query_plan(queryset):
+    """Return the database's plan for a queryset, with sequential scans discouraged on PostgreSQL"""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+    return queryset.explain()
+
+def assert_indexed(queryset, scans=()):
+    """Fail if the plan falls back to a full scan or a sort step.
+
+    On SQLite every table access must be a SEARCH. A SCAN only passes when
+    it walks one of the indexes named in `scans`, for a query that reads
+    the index in order and stops early.
+    """
+    assert_plan_indexed(query_plan(queryset), scans)
+
+def assert_plan_indexed(plan, scans=()):
+    """assert_indexed for a plan that has already been explained"""
+    if connection.vendor == 'postgresql':
+        assert 'Seq Scan' not in plan, plan
+        assert 'Sort' not in plan, plan
+        return
+    for line in plan.splitlines():
+        assert 'TEMP B-TREE' not in line, plan
+        if 'SCAN' in line:
+            assert any(f'USING INDEX {index}' in line or f'USING COVERING INDEX {index}' in line
+                       for index in scans), plan
+
+@pytest.fixture
+def post(db):
+    """Post fixture"""
+    user = User.objects.create_user(username='planner', password='password123')
+    return Post.objects.create(title='Plans', slug='plans', author=user, status='published')
+
+def test_published_posts_by_date(post):
+    """Test published posts ordered by publish date use an index"""
+    assert_indexed(Post.objects.filter(status='published').order_by('-published'))
+    assert_indexed(Post.objects.filter(status='published').order_by('-published', '-id'))
+
+def test_posts_for_author(post):
+    """Test question 3 uses an index"""
+    assert_indexed(question_3_return_all_posts_for_user(post.author))
+
+def test_comments_for_post(post):
+    """Test question 5 uses an index"""
+    assert_indexed(question_5_return_all_post_comments(post))
+
+def test_comment_post_lookup_without_fk_index(post):
+    """Test looking comments up by post, as a cascade delete does, uses the composite index"""
+    assert_indexed(Comment.objects.filter(post=post))
+
+@pytest.mark.parametrize('approved', ['0', '1'])
+def test_comment_admin_approved_filter(post, approved):
+    """Test the approved filter of the comment changelist uses an index"""
+    request = RequestFactory().get('/admin/mtg_blog/comment/', {'approved__exact': approved})
+    request.user = User.objects.create_superuser(username='admin', password='password')
+    changelist = CommentAdmin(Comment, AdminSite()).get_changelist_instance(request)
+
+    # The changelist pages through the partial index of its approval state in order
+    assert_indexed(changelist.queryset, scans=['comment_pending_idx', 'comment_approved_idx'])
+
+@pytest.mark.parametrize('approved_only', [False, True])
+def test_leaderboard(post, approved_only):
+    """Test the overall and per-topic leaderboards read an index"""
+    topic = Topic.objects.create(name='Plans')
+    post.topics.add(topic)
+    # The overall board reads the count index in order and stops at the limit
+    assert_indexed(top_posts(approved_only=approved_only),
+                   scans=['post_comment_count_idx', 'post_approved_count_idx'])
+    assert_indexed(top_posts(topic=topic, approved_only=approved_only))
+
+def test_archive_candidates(post):
+    """Test the archive scan for old approved comments reads the approved index"""
+    assert_indexed(
+        Comment.objects.filter(approved=True, created__lt=post.created)
+        .order_by('created', 'id').values(*ARCHIVED_FIELDS)
+    )
+
+def test_slug_allocation(post):
+    """Test finding the highest suffix for a base searches the unique slug index"""
+    with CaptureQueriesContext(connection) as queries:
+        allocate_slugs(Post, ['Plans'])
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {queries[0]["sql"]}' if connection.vendor == 'sqlite'
+                       else f'EXPLAIN {queries[0]["sql"]}')
+        plan = '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+    assert_plan_indexed(plan)
+    if connection.vendor == 'sqlite':
+        assert 'slug>? AND slug<?' in plan, plan
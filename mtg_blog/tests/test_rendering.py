@@ -0,0 +1,97 @@
+"""Tests for the save-time rendering of post bodies"""
+from io import StringIO
+from unittest import mock
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.template.defaultfilters import linebreaks_filter, truncatewords
+from django.test.utils import CaptureQueriesContext
+from mtg_blog.models import Post, Topic
+from mtg_blog.rendering import render_content, sanitize_html
+
+@pytest.fixture
+def user(db):
+    """Setup of User"""
+    return User.objects.create_user(username='renderer', password='password123')
+
+def test_plain_text_renders_like_the_old_filters():
+    """Test plain text gets the output of linebreaks and truncatewords:30"""
+    content = 'Bolt the bird.\n\nThen ' + ' '.join(f'swing{i}' for i in range(40)) + ' <3'
+    html, excerpt = render_content(content)
+    assert html == linebreaks_filter(content)
+    assert excerpt == truncatewords(content, 30)
+
+def test_html_is_sanitized():
+    """Test scripts, handlers and unsafe links are removed and open tags closed"""
+    html, text = sanitize_html(
+        '<p onclick="steal()">Hi <script>alert(1)</script><b>there'
+        '<a href="java\nscript:alert(1)" title="x">bad</a> <a href="/topic/legacy">good</a>'
+        '<img src=x onerror=alert(1)><div>kept text</div>'
+    )
+    assert html == (
+        '<p>Hi <b>there<a title="x">bad</a> <a href="/topic/legacy">good</a>kept text</b></p>')
+    assert 'alert' not in text
+    assert 'kept text' in text
+
+def test_html_excerpt_is_plain_text():
+    """Test the excerpt of an HTML body has no markup and keeps words apart"""
+    _, excerpt = render_content('<h2>Deck</h2><p>Four <em>Lightning</em> Bolt</p><p>Twenty lands</p>')
+    assert excerpt == 'Deck Four Lightning Bolt Twenty lands'
+
+def test_save_renders_the_body(user):
+    """Test saving a post stores its HTML and excerpt, also with update_fields"""
+    post = Post.objects.create(title='Primer', author=user, content='First draft')
+    assert post.excerpt == 'First draft'
+
+    post.content = '<p>Second <strong>draft</strong></p>'
+    post.save(update_fields=['content'])
+    post.refresh_from_db()
+    assert post.content_html == '<p>Second <strong>draft</strong></p>'
+    assert post.excerpt == 'Second draft'
+
+def test_saves_that_skip_the_body_do_not_render(user):
+    """Test a save that does not write the body neither renders nor loads it"""
+    post = Post.objects.create(title='Primer', author=user, content='Body', status='published')
+    partial = Post.objects.defer('content', 'status').get(pk=post.pk)
+    partial.title = 'Renamed'
+    with mock.patch('mtg_blog.models.render_content') as render, \
+            CaptureQueriesContext(connection) as queries:
+        post.save(update_fields=['title'])
+        partial.save()
+    assert not render.called
+    assert not [query for query in queries if query['sql'].startswith('SELECT "mtg_blog_post"')]
+
+    post.status = 'draft'
+    post.save(update_fields=['status'])
+    post.refresh_from_db()
+    assert post.published is None
+
+def test_topic_page_never_loads_the_body(user, client):
+    """Test the topic page reads the excerpt column instead of the body"""
+    topic = Topic.objects.create(name='Modern', slug='modern')
+    post = Post.objects.create(
+        title='Burn', author=user, status='published', content='Lightning ' * 200)
+    post.topics.add(topic)
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(topic.get_absolute_url())
+    assert ('Lightning ' * 30).strip() + ' …' in response.content.decode()
+    assert not any('"mtg_blog_post"."content"' in query['sql'] for query in queries)
+
+def test_backfill_command(user):
+    """Test the command renders posts without an excerpt and, with --all, every post"""
+    rendered = Post.objects.create(title='Done', author=user, content='Already rendered')
+    missing = Post.objects.create(title='Old', author=user, content='Written before excerpts')
+    Post.objects.filter(pk=missing.pk).update(content_html='', excerpt='')
+    out = StringIO()
+
+    call_command('render_post_content', batch_size=1, stdout=out)
+    missing.refresh_from_db()
+    assert missing.excerpt == 'Written before excerpts'
+    assert 'Post content rendered (1 posts)' in out.getvalue()
+
+    Post.objects.update(excerpt='stale')
+    call_command('render_post_content', '--all', stdout=out)
+    rendered.refresh_from_db()
+    assert rendered.excerpt == 'Already rendered'
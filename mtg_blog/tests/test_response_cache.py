@@ -0,0 +1,71 @@
+"""Tests for the cached, conditional-GET public pages"""
+import pytest
+from django.contrib.auth.models import User
+from django.urls import reverse
+from mtg_blog.models import Topic, Post
+
+@pytest.fixture
+def topics(db):
+    """Two topics with one published post each"""
+    user = User.objects.create_user(username='reader', password='password123')
+    standard = Topic.objects.create(name='Standard', slug='standard')
+    modern = Topic.objects.create(name='Modern', slug='modern')
+    for topic in (standard, modern):
+        post = Post.objects.create(
+            title=f'{topic.name} post', slug=f'{topic.slug}-post', author=user, status='published')
+        post.topics.add(topic)
+    return standard, modern
+
+def detail_url(topic):
+    """URL of a topic detail page"""
+    return reverse('mtg_blog_app:topic_detail', kwargs={'slug': topic.slug})
+
+@pytest.mark.parametrize('url', [
+    reverse('mtg_blog_app:home'),
+    reverse('mtg_blog_app:topic_list'),
+    reverse('mtg_blog_app:topic_detail', kwargs={'slug': 'standard'}),
+])
+def test_cached_pages_cost_no_queries(client, topics, url, django_assert_num_queries):
+    """Test repeat views are served from the cache and revalidate with 304"""
+    first = client.get(url)
+    assert first.status_code == 200
+    assert first['ETag'] and first['Last-Modified']
+
+    with django_assert_num_queries(0):
+        second = client.get(url)
+        not_modified = client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+    assert second.content == first.content
+    assert not_modified.status_code == 304
+
+def test_post_change_expires_only_its_topic(client, topics):
+    """Test editing a post changes its topic page but not another topic's"""
+    standard, modern = topics
+    standard_etag = client.get(detail_url(standard))['ETag']
+    modern_etag = client.get(detail_url(modern))['ETag']
+
+    post = Post.objects.get(slug='standard-post')
+    post.title = 'Standard post, revised'
+    post.save()
+
+    response = client.get(detail_url(standard), HTTP_IF_NONE_MATCH=standard_etag)
+    assert response.status_code == 200
+    assert 'Standard post, revised' in response.content.decode()
+    assert client.get(detail_url(modern), HTTP_IF_NONE_MATCH=modern_etag).status_code == 304
+
+def test_topic_membership_change_expires_lists(client, topics):
+    """Test adding a post to a topic expires the home page ranking"""
+    standard, _modern = topics
+    etag = client.get(reverse('mtg_blog_app:home'))['ETag']
+
+    Post.objects.get(slug='modern-post').topics.add(standard)
+
+    response = client.get(reverse('mtg_blog_app:home'), HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert 'Standard (2)' in response.content.decode()
+
+def test_logged_in_users_bypass_cache(client, topics):
+    """Test authenticated requests are rendered every time"""
+    User.objects.create_user(username='editor', password='password123')
+    client.login(username='editor', password='password123')
+    response = client.get(reverse('mtg_blog_app:home'))
+    assert 'ETag' not in response
@@ -0,0 +1,153 @@
+"""Tests for the primary/replica database router, with a SQLite file as the replica"""
+import itertools
+
+import pytest
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connections, transaction
+from django.http import HttpResponse
+from django.test import Client, RequestFactory
+from django.urls import reverse
+from freezegun import freeze_time
+from mtg_blog.models import Topic
+from mtg_blog.routers import (
+    PIN_COOKIE, PrimaryReplicaRouter, ReplicaPinMiddleware, force_primary, request_scope,
+)
+from mtg_blog.tests.conftest import jpeg_bytes
+
+@pytest.fixture
+def replica(transactional_db, settings, tmp_path):
+    """A replica file holding a topic the primary does not have, and vice versa"""
+    # Connections that are not in settings.DATABASES are allowed in tests
+    default = connections['default']
+    connections['replica'] = type(default)(
+        {**default.settings_dict, 'NAME': str(tmp_path / 'replica.sqlite3')}, alias='replica')
+    with connections['replica'].schema_editor() as editor:
+        editor.create_model(Topic)
+    Topic.objects.using('replica').bulk_create([Topic(name='Replicated', slug='replicated')])
+    Topic.objects.using('default').bulk_create([Topic(name='Fresh', slug='fresh')])
+    settings.MTG_DB_REPLICAS = ['replica']
+    yield
+    connections['replica'].close()
+    del connections['replica']
+
+def topic_names():
+    """Names of the topics on whichever database the router reads from"""
+    return list(Topic.objects.values_list('name', flat=True))
+
+def test_reads_go_to_the_replica_until_a_write(replica):
+    """Test reads use the replica and switch to the primary once the request writes"""
+    with request_scope():
+        assert topic_names() == ['Replicated']
+        Topic.objects.create(name='Written')
+        assert topic_names() == ['Fresh', 'Written']
+
+def test_pin_expires(replica, settings):
+    """Test reads go back to the replica once the pin window has passed"""
+    settings.MTG_REPLICA_PIN_SECONDS = 5
+    with freeze_time() as frozen, request_scope():
+        Topic.objects.create(name='Written')
+        frozen.tick(4)
+        assert 'Written' in topic_names()
+        frozen.tick(2)
+        assert topic_names() == ['Replicated']
+
+def test_force_primary(replica):
+    """Test force_primary and transactions on the primary read from the primary"""
+    with request_scope():
+        with force_primary():
+            assert topic_names() == ['Fresh']
+        with transaction.atomic():
+            assert topic_names() == ['Fresh']
+        assert topic_names() == ['Replicated']
+
+def test_one_replica_per_request(replica, settings, tmp_path, monkeypatch):
+    """Test every read of a request goes to the replica picked for its first read"""
+    default = connections['default']
+    connections['lagging'] = type(default)(
+        {**default.settings_dict, 'NAME': str(tmp_path / 'lagging.sqlite3')}, alias='lagging')
+    try:
+        with connections['lagging'].schema_editor() as editor:
+            editor.create_model(Topic)
+        Topic.objects.using('lagging').bulk_create([Topic(name='Lagging', slug='lagging')])
+        settings.MTG_DB_REPLICAS = ['replica', 'lagging']
+        picks = itertools.cycle(['replica', 'lagging'])
+        monkeypatch.setattr('mtg_blog.routers.random.choice', lambda aliases: next(picks))
+        with request_scope():
+            assert [topic_names() for _ in range(3)] == [['Replicated']] * 3
+        with request_scope():
+            assert [topic_names() for _ in range(3)] == [['Lagging']] * 3
+    finally:
+        connections['lagging'].close()
+        del connections['lagging']
+
+def test_replicas_are_not_migrated(replica):
+    """Test migrations only run on the primary"""
+    router = PrimaryReplicaRouter()
+    assert router.allow_migrate('replica', 'mtg_blog') is False
+    assert router.allow_migrate('default', 'mtg_blog') is None
+
+def test_contest_submission_pins_the_browser(replica, settings, media_root):
+    """Test a contest submission sets the cookie that keeps the redirect on the primary"""
+    settings.MTG_PHOTO_VARIANT_WORKERS = 0
+    response = Client().post(reverse('mtg_blog_app:contest'), {
+        'name': 'Test User',
+        'email': 'test@example.com',
+        'photo': SimpleUploadedFile('board.jpg', jpeg_bytes(), content_type='image/jpeg'),
+    })
+    assert response.status_code == 302
+    assert response.cookies[PIN_COOKIE]['max-age'] == 5
+
+def list_topics(request):
+    """A view that shows where its reads went"""
+    return HttpResponse(','.join(topic_names()))
+
+def test_pin_cookie_sends_the_next_request_to_the_primary(replica):
+    """Test the request after a write reads from the primary"""
+    middleware = ReplicaPinMiddleware(list_topics)
+    assert middleware(RequestFactory().get('/')).content == b'Replicated'
+
+    def write(request):
+        Topic.objects.create(name='Written')
+        return HttpResponse()
+    cookie = ReplicaPinMiddleware(write)(RequestFactory().post('/')).cookies[PIN_COOKIE].value
+
+    request = RequestFactory().get('/')
+    request.COOKIES[PIN_COOKIE] = cookie
+    assert middleware(request).content == b'Fresh,Written'
+
+def test_pin_cookie_cannot_be_forged_or_kept(replica):
+    """Test only a recent cookie signed by the server keeps reads on the primary"""
+    middleware = ReplicaPinMiddleware(list_topics)
+    forged = RequestFactory().get('/')
+    forged.COOKIES[PIN_COOKIE] = '99999999999'
+    assert middleware(forged).content == b'Replicated'
+
+    def write(request):
+        Topic.objects.create(name='Written')
+        return HttpResponse()
+    with freeze_time() as frozen:
+        cookie = ReplicaPinMiddleware(write)(RequestFactory().post('/')).cookies[PIN_COOKIE].value
+        frozen.tick(6)
+        request = RequestFactory().get('/')
+        request.COOKIES[PIN_COOKIE] = cookie
+        assert middleware(request).content == b'Replicated'
+
+def test_async_requests_keep_their_own_pin(replica):
+    """Test the async path pins the request that wrote and leaves no pin behind"""
+    async def list_topics_async(request):
+        return HttpResponse(','.join([name async for name in
+                                      Topic.objects.values_list('name', flat=True)]))
+
+    async def write(request):
+        await Topic.objects.acreate(name='Written')
+        return HttpResponse()
+
+    middleware = ReplicaPinMiddleware(list_topics_async)
+    assert iscoroutinefunction(middleware)
+    response = async_to_sync(ReplicaPinMiddleware(write))(RequestFactory().post('/'))
+    assert async_to_sync(middleware)(RequestFactory().get('/')).content == b'Replicated'
+
+    request = RequestFactory().get('/')
+    request.COOKIES[PIN_COOKIE] = response.cookies[PIN_COOKIE].value
+    assert async_to_sync(middleware)(request).content == b'Fresh,Written'
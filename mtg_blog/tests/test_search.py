@@ -0,0 +1,78 @@
+"""Tests for post full-text search"""
+from io import StringIO
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.urls import reverse
+from mtg_blog.models import Post
+from mtg_blog.search import rebuild_search_index, search_posts
+
+@pytest.fixture
+def posts(db):
+    """A few published posts and one draft"""
+    user = User.objects.create_user(username='searcher', password='password123')
+    bolt = Post.objects.create(
+        title='Lightning Bolt in Modern', slug='bolt', author=user, status='published',
+        content='Three damage for one red mana.')
+    burn = Post.objects.create(
+        title='Burn primer', slug='burn', author=user, status='published',
+        content='Every burn list plays Lightning Bolt and Lava Spike.')
+    Post.objects.create(
+        title='Lightning Helix draft', slug='helix', author=user, status='draft',
+        content='Not published yet.')
+    return bolt, burn
+
+def test_title_matches_rank_first(posts):
+    """Test a title match outranks a content match"""
+    bolt, burn = posts
+    assert search_posts('lightning bolt') == [bolt, burn]
+
+def test_prefix_matching(posts):
+    """Test a partly typed card name matches"""
+    bolt, burn = posts
+    assert search_posts('lava spi') == [burn]
+    assert search_posts('lightn') == [bolt, burn]
+
+def test_drafts_are_hidden(posts):
+    """Test only published posts are returned"""
+    assert search_posts('helix') == []
+
+def test_index_follows_updates_and_deletes(posts):
+    """Test edits and deletes are reflected in the index"""
+    bolt, burn = posts
+    bolt.title = 'Chain Lightning'
+    bolt.content = 'Sorcery speed.'
+    bolt.save()
+    assert search_posts('chain') == [bolt]
+    assert search_posts('bolt') == [burn]
+
+    burn.delete()
+    assert search_posts('bolt') == []
+
+def test_rebuild_command(posts):
+    """Test the rebuild command reindexes every post in batches"""
+    out = StringIO()
+    call_command('rebuild_search_index', batch_size=2, stdout=out)
+    assert 'Search index rebuilt (3 posts)' in out.getvalue()
+    assert len(search_posts('lightning')) == 2
+
+def test_failed_rebuild_keeps_the_old_index(posts):
+    """Test a rebuild that fails part way leaves the index as it was"""
+    def fail(indexed):
+        raise RuntimeError(f'stopped after {indexed} posts')
+
+    with pytest.raises(RuntimeError):
+        rebuild_search_index(batch_size=1, progress=fail)
+    assert search_posts('lightning bolt') == list(posts)
+
+def test_search_view(client, posts):
+    """Test the search page renders ranked results"""
+    response = client.get(reverse('mtg_blog_app:search'), {'q': 'bolt'})
+    assert response.status_code == 200
+    assert [post.title for post in response.context['results']] == [
+        'Lightning Bolt in Modern', 'Burn primer']
+
+def test_search_view_ignores_fts_syntax(client, posts):
+    """Test user input cannot inject FTS query syntax"""
+    response = client.get(reverse('mtg_blog_app:search'), {'q': '"bolt" OR NEAR(* -'})
+    assert response.status_code == 200
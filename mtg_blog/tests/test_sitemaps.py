@@ -0,0 +1,113 @@
+"""Tests for the sharded, streamed sitemap"""
+import re
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from mtg_blog import response_cache, sitemaps
+from mtg_blog.models import Post, Topic
+
+@pytest.fixture
+def blog(db):
+    """Two topics, seven published posts and a draft"""
+    user = User.objects.create_user(username='mapper', password='password123')
+    topics = [Topic.objects.create(name='Brawl'), Topic.objects.create(name='Oathbreaker')]
+    posts = [Post.objects.create(title=f'Post {n}', author=user, status='published')
+             for n in range(7)]
+    draft = Post.objects.create(title='Draft', author=user)
+    return topics, posts, draft
+
+def body(response):
+    """The full text of a possibly streamed response"""
+    if response.streaming:
+        return b''.join(response.streaming_content).decode()
+    return response.content.decode()
+
+def locs(text):
+    """The <loc> paths in a sitemap"""
+    return re.findall(r'<loc>http://testserver([^<]*)</loc>', text)
+
+def test_small_site_is_one_urlset(client, blog):
+    """Test a site under the shard size gets a single streamed urlset"""
+    topics, posts, draft = blog
+    response = client.get(reverse('mtg_blog_app:sitemap'))
+    assert response.streaming
+    assert response['Content-Type'].startswith('application/xml')
+    urls = locs(body(response))
+    assert urls == [topic.get_absolute_url() for topic in topics] + [
+        post.get_absolute_url() for post in posts]
+    assert draft.get_absolute_url() not in urls
+
+def test_large_site_becomes_an_index_of_shards(client, blog, monkeypatch):
+    """Test past the shard size the sitemap is an index of shards that hold every URL"""
+    monkeypatch.setattr(sitemaps, 'SHARD_SIZE', 3)
+    monkeypatch.setattr(sitemaps, 'CHUNK_SIZE', 2)
+    topics, posts, draft = blog
+
+    index = body(client.get(reverse('mtg_blog_app:sitemap')))
+    assert '<sitemapindex' in index and '<lastmod>' in index
+    shards = locs(index)
+    assert shards[0] == reverse('mtg_blog_app:sitemap_shard', kwargs={'section': 'topics', 'shard': 0})
+
+    urls = []
+    for shard in shards:
+        found = locs(body(client.get(shard)))
+        assert 0 < len(found) <= 3
+        urls.extend(found)
+    assert sorted(urls) == sorted(
+        [topic.get_absolute_url() for topic in topics] + [post.get_absolute_url() for post in posts])
+    assert client.get('/sitemap-posts-99.xml').status_code == 404
+    assert client.get('/sitemap-users-0.xml').status_code == 404
+
+def test_shards_are_cached_until_their_rows_change(client, blog, monkeypatch):
+    """Test a shard is served from cache until a post in it changes"""
+    monkeypatch.setattr(sitemaps, 'SHARD_SIZE', 3)
+    topics, posts, draft = blog
+    first = reverse('mtg_blog_app:sitemap_shard', kwargs={'section': 'posts', 'shard': sitemaps.shard_of(posts[0].pk)})
+    last = reverse('mtg_blog_app:sitemap_shard', kwargs={'section': 'posts', 'shard': sitemaps.shard_of(posts[-1].pk)})
+    etags = {}
+    for url in (first, last):
+        response = client.get(url)
+        body(response)
+        etags[url] = response['ETag']
+
+    with CaptureQueriesContext(connection) as queries:
+        cached = client.get(first)
+    assert len(queries) == 0 and not cached.streaming
+
+    posts[-1].title = 'Renamed'
+    posts[-1].save()
+    assert client.get(first, HTTP_IF_NONE_MATCH=etags[first]).status_code == 304
+    assert client.get(last, HTTP_IF_NONE_MATCH=etags[last]).status_code == 200
+
+def test_asgi_streams_without_buffering(client, blog, monkeypatch):
+    """Test under ASGI the sitemap is an async stream with the same body, cached once sent"""
+    monkeypatch.setattr(sitemaps, 'CHUNK_SIZE', 2)
+    url = reverse('mtg_blog_app:sitemap')
+    expected = body(client.get(url))
+    response_cache.cache.clear()
+
+    async def fetch():
+        response = await AsyncClient().get(url)
+        assert response.is_async
+        return b''.join([part async for part in response.streaming_content]).decode()
+    assert async_to_sync(fetch)() == expected
+
+    with CaptureQueriesContext(connection) as queries:
+        assert body(client.get(url)) == expected
+    assert len(queries) == 0
+
+def test_large_streamed_bodies_are_not_cached(client, blog, monkeypatch):
+    """Test a body past the cache limit is streamed every time but still revalidates"""
+    monkeypatch.setattr(response_cache, 'STREAMED_CACHE_LIMIT', 200)
+    url = reverse('mtg_blog_app:sitemap')
+    first = client.get(url)
+    expected = body(first)
+    assert len(expected) > 200
+
+    again = client.get(url)
+    assert again.streaming and body(again) == expected
+    assert client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code == 304
@@ -0,0 +1,93 @@
+"""Tests for collision-free slug allocation"""
+from unittest import mock
+import pytest
+from django.contrib.auth.models import User
+from django.db import IntegrityError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from mtg_blog import slugs
+from mtg_blog.admin import PostAdminForm
+from mtg_blog.models import Post, Topic
+
+@pytest.fixture
+def user(db):
+    """Setup of User"""
+    return User.objects.create_user(username='slugger', password='password123')
+
+def test_repeated_titles_get_suffixes(user):
+    """Test posts with the same title no longer collide"""
+    posts = [Post.objects.create(title='Deck Tech', author=user) for _ in range(3)]
+    assert [post.slug for post in posts] == ['deck-tech', 'deck-tech-2', 'deck-tech-3']
+
+    Post.objects.create(title='Deck Tech Guide', author=user)
+    Post.objects.filter(slug='deck-tech-2').delete()
+    assert Post.objects.create(title='Deck Tech', author=user).slug == 'deck-tech-4'
+
+def test_topic_slugs(db):
+    """Test topics whose names slugify alike get distinct slugs"""
+    assert Topic.objects.create(name='Red/Green').slug == 'redgreen'
+    assert Topic.objects.create(name='RedGreen').slug == 'redgreen-2'
+
+def test_allocation_is_one_query_per_base(user):
+    """Test a bulk allocation costs one range query per distinct title"""
+    Post.objects.bulk_create([
+        Post(title='Deck Tech', slug=f'deck-tech-{n}' if n > 1 else 'deck-tech', author=user)
+        for n in range(1, 51)
+    ])
+    with CaptureQueriesContext(connection) as queries:
+        allocated = slugs.allocate_slugs(Post, ['Deck Tech', 'Deck Tech', 'Primer'])
+    assert allocated == ['deck-tech-51', 'deck-tech-52', 'primer']
+    assert len(queries) == 2
+
+def test_only_numbered_slugs_count(user):
+    """Test slugs that just share the prefix, or pad the number, are not suffixes"""
+    Post.objects.bulk_create([
+        Post(title='Deck', slug=slug, author=user)
+        for slug in ('deck', 'deck-9', 'deck-10', 'deck-tech-99', 'deck-0100', 'deck-2x')
+    ])
+    with CaptureQueriesContext(connection) as queries:
+        assert slugs.unique_slug(Post, 'Deck') == 'deck-11'
+    assert len(queries) == 1
+    assert slugs.unique_slug(Post, 'Deck Tech') == 'deck-tech-100'
+
+def test_long_titles_are_trimmed_to_fit(user):
+    """Test the suffix never pushes a slug past the column length"""
+    title = 'x' * 300
+    allocated = [Post.objects.create(title=title, author=user).slug for _ in range(3)]
+    assert allocated == ['x' * 250, 'x' * 248, 'x' * 248 + '-2']
+
+def test_save_retries_when_slug_is_taken_concurrently(user):
+    """Test a slug claimed between allocation and insert is reallocated"""
+    real = slugs.unique_slug
+    calls = []
+
+    def racing(model, source, field='slug'):
+        slug = real(model, source, field)
+        if not calls:
+            Post.objects.bulk_create([Post(title=source, slug=slug, author=user)])
+        calls.append(slug)
+        return slug
+
+    with mock.patch.object(slugs, 'unique_slug', racing):
+        post = Post.objects.create(title='Race', author=user)
+    assert calls == ['race', 'race-2']
+    assert post.slug == 'race-2'
+
+def test_other_integrity_errors_are_not_retried(user):
+    """Test failures unrelated to the slug are raised as-is"""
+    with pytest.raises(IntegrityError):
+        Post.objects.create(title=None, author=user)
+    assert not Post.objects.exists()
+
+def test_admin_renumbers_prepopulated_slug(user):
+    """Test the admin form renumbers a prepopulated slug but not a typed one"""
+    Post.objects.create(title='Deck Tech', author=user)
+    data = {'title': 'Deck Tech', 'slug': 'deck-tech', 'status': 'draft', 'author': user.pk,
+            'content': ''}
+    form = PostAdminForm(data=data)
+    assert form.is_valid(), form.errors
+    assert form.cleaned_data['slug'] == 'deck-tech-2'
+
+    form = PostAdminForm(data={**data, 'title': 'Something Else'})
+    assert not form.is_valid()
+    assert 'slug' in form.errors
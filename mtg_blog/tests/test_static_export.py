@@ -0,0 +1,104 @@
+"""Tests for the static site export"""
+from io import StringIO
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from mtg_blog.models import Topic, Post
+from mtg_blog.static_export import export_topic
+
+def export(output, **options):
+    """Run the export command in-process and return its output"""
+    out = StringIO()
+    call_command('export_static_site', str(output), workers=1, stdout=out, **options)
+    return out.getvalue()
+
+@pytest.fixture
+def topics(db):
+    """Two topics with one published post each"""
+    user = User.objects.create_user(username='exporter', password='password123')
+    pioneer = Topic.objects.create(name='Pioneer', slug='pioneer')
+    legacy = Topic.objects.create(name='Legacy', slug='legacy')
+    for topic in (pioneer, legacy):
+        post = Post.objects.create(
+            title=f'{topic.name} primer', slug=f'{topic.slug}-primer', author=user,
+            status='published')
+        post.topics.add(topic)
+    return pioneer, legacy
+
+def test_full_export_writes_every_page(topics, tmp_path):
+    """Test every read-only page is written"""
+    assert 'Exported 4 pages' in export(tmp_path)
+
+    assert 'Pioneer' in (tmp_path / 'home' / 'index.html').read_text()
+    assert 'Legacy' in (tmp_path / 'topics' / 'index.html').read_text()
+    assert 'Pioneer primer' in (tmp_path / 'topic' / 'pioneer.html').read_text()
+    assert not list(tmp_path.rglob('*.tmp'))
+
+def test_incremental_export_renders_changed_topics(topics, tmp_path):
+    """Test only topics whose posts changed are rendered again"""
+    export(tmp_path)
+    post = Post.objects.get(slug='legacy-primer')
+    post.title = 'Legacy primer, updated'
+    post.save()
+
+    assert 'Exported 3 pages' in export(tmp_path, incremental=True)
+    assert 'Legacy primer, updated' in (tmp_path / 'topic' / 'legacy.html').read_text()
+
+def test_deleted_topics_are_removed(topics, tmp_path):
+    """Test pages of deleted topics do not linger"""
+    export(tmp_path)
+    Topic.objects.get(slug='pioneer').delete()
+
+    export(tmp_path, incremental=True)
+    assert not (tmp_path / 'topic' / 'pioneer.html').exists()
+
+def test_incremental_export_notices_topic_changes(topics, tmp_path):
+    """Test new, renamed and emptied topics are rendered again"""
+    export(tmp_path)
+    Topic.objects.create(name='Vintage', slug='vintage')
+    pioneer, legacy = topics
+    pioneer.name = 'Pioneer format'
+    pioneer.save()
+    legacy.posts.clear()
+
+    assert 'Exported 5 pages' in export(tmp_path, incremental=True)
+    assert (tmp_path / 'topic' / 'vintage.html').exists()
+    assert 'Pioneer format' in (tmp_path / 'topic' / 'pioneer.html').read_text()
+    assert 'Legacy primer' not in (tmp_path / 'topic' / 'legacy.html').read_text()
+    assert 'Exported 2 pages' in export(tmp_path, incremental=True)
+
+def test_later_topic_pages_are_linked_files(topics, tmp_path):
+    """Test every page of a long topic is written and linked without cursors"""
+    pioneer, _ = topics
+    author = User.objects.get(username='exporter')
+    for number in range(45):
+        post = Post.objects.create(title=f'Report {number}', author=author, status='published')
+        post.topics.add(pioneer)
+    export(tmp_path)
+
+    first = (tmp_path / 'topic' / 'pioneer.html').read_text()
+    second = (tmp_path / 'topic' / 'pioneer' / 'page-2.html').read_text()
+    third = (tmp_path / 'topic' / 'pioneer' / 'page-3.html').read_text()
+    assert '?cursor=' not in first + second + third
+    assert 'href="/topic/pioneer/page-2"' in first
+    assert 'href="/topic/pioneer"' in second and 'href="/topic/pioneer/page-3"' in second
+    assert 'Pioneer primer' in third
+
+    Post.objects.filter(title__startswith='Report').delete()
+    export(tmp_path, incremental=True)
+    assert not (tmp_path / 'topic' / 'pioneer' / 'page-2.html').exists()
+
+def test_topic_pages_are_paginated_once(topics, tmp_path):
+    """Test each page's posts are queried once, for both its path and its HTML"""
+    pioneer, _ = topics
+    author = User.objects.get(username='exporter')
+    for number in range(45):
+        post = Post.objects.create(title=f'Report {number}', author=author, status='published')
+        post.topics.add(pioneer)
+
+    with CaptureQueriesContext(connection) as queries:
+        assert export_topic('pioneer', str(tmp_path)) == 3
+    post_pages = [query for query in queries if '"mtg_blog_post"."excerpt"' in query['sql']]
+    assert len(post_pages) == 3
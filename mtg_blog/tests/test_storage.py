@@ -0,0 +1,98 @@
+"""Tests for content-addressed photo storage"""
+import hashlib
+from io import StringIO
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from mtg_blog.models import PhotoFile, PhotoSubmission
+from mtg_blog.photo_variants import generate_variants
+from mtg_blog.tests.conftest import jpeg_bytes
+
+def submit(content, name='entry.jpg'):
+    """Create a submission with the given photo bytes"""
+    return PhotoSubmission.objects.create(
+        name='Photo User', email='photo@example.com',
+        photo=SimpleUploadedFile(name, content, content_type='image/jpeg'),
+    )
+
+@pytest.fixture(autouse=True)
+def no_background_variants(settings):
+    """Keep the variant worker pool from writing files during these tests"""
+    settings.MTG_PHOTO_VARIANT_WORKERS = 0
+
+@pytest.mark.django_db(transaction=True)
+class TestContentAddressedStorage:
+    """Test uploads are stored once per unique content"""
+
+    def test_photo_is_named_by_sharded_hash(self, media_root):
+        """Test the stored name is the SHA-256 of the content"""
+        content = jpeg_bytes()
+        digest = hashlib.sha256(content).hexdigest()
+        submission = submit(content)
+        assert submission.photo.name == f'contest_photos/{digest[:2]}/{digest[2:4]}/{digest}.jpg'
+        assert (media_root / submission.photo.name).read_bytes() == content
+
+    def test_identical_uploads_share_one_file(self, media_root):
+        """Test duplicates point at the same blob and only the last delete removes it"""
+        first = submit(jpeg_bytes(), 'first.jpg')
+        second = submit(jpeg_bytes(), 'second.jpg')
+        assert first.photo.name == second.photo.name
+        assert len(list(media_root.rglob('*.jpg'))) == 1
+
+        first.delete()
+        assert (media_root / second.photo.name).exists()
+
+        second.delete()
+        assert not (media_root / second.photo.name).exists()
+
+    def test_variants_are_released_with_the_photo(self, media_root):
+        """Test variants stay in the photo directory and go when it is unreferenced"""
+        submission = submit(jpeg_bytes())
+        generate_variants(submission.pk)
+        submission.refresh_from_db()
+        assert submission.thumbnail.name.startswith('contest_photos/')
+        assert submission.thumbnail.name.count('/') == 3
+
+        submission.delete()
+        assert list(media_root.rglob('*.jpg')) == []
+
+    def test_dedupe_command_moves_legacy_files(self, media_root):
+        """Test photos stored under random suffixes are collapsed to one blob"""
+        legacy = FileSystemStorage()
+        content = jpeg_bytes()
+        for _ in range(3):
+            submission = submit(content)
+            name = legacy.save('contest_photos/test.jpg', ContentFile(content))
+            PhotoSubmission.objects.filter(pk=submission.pk).update(photo=name)
+        blob = submission.photo.name
+        submission.photo.storage.delete(blob)
+
+        out = StringIO()
+        call_command('dedupe_contest_photos', stdout=out)
+        assert 'Moved 3 photos' in out.getvalue()
+        assert set(PhotoSubmission.objects.values_list('photo', flat=True)) == {blob}
+        assert [path.relative_to(media_root).as_posix() for path in media_root.rglob('*.jpg')] == [blob]
+
+    def test_shared_variants_outlive_one_photo(self, media_root):
+        """Test a variant file shared by two different photos stays until both are gone"""
+        first, second = submit(jpeg_bytes()), submit(jpeg_bytes(color='maroon'))
+        generate_variants(first.pk)
+        generate_variants(second.pk)
+        second.refresh_from_db()
+        PhotoSubmission.objects.filter(pk=first.pk).update(thumbnail=second.thumbnail.name)
+        first.refresh_from_db()
+
+        first.delete()
+        assert (media_root / second.thumbnail.name).exists()
+        second.delete()
+        assert not (media_root / second.thumbnail.name).exists()
+
+    def test_uploads_and_releases_lock_the_file(self, media_root):
+        """Test an upload takes the file's lock row and the last release drops it"""
+        first = submit(jpeg_bytes())
+        submit(jpeg_bytes()).delete()
+        assert PhotoFile.objects.filter(name=first.photo.name).exists()
+        first.delete()
+        assert not PhotoFile.objects.exists()
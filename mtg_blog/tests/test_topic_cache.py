@@ -0,0 +1,92 @@
+"""Tests for the top topics cache"""
+import pytest
+from django.contrib.auth.models import User
+from django.test import RequestFactory
+from django.urls import reverse
+from mtg_blog.context_processors import base_context
+from mtg_blog.models import Topic, Post
+from mtg_blog.topic_cache import get_top_topics, get_cache_stats, clear_top_topics_cache
+
+@pytest.fixture
+def user(db):
+    """Setup of User"""
+    return User.objects.create_user(username='cacheuser', password='password123')
+
+@pytest.fixture
+def ranked_topics(user):
+    """Two topics with a different number of posts"""
+    control = Topic.objects.create(name='Control')
+    aggro = Topic.objects.create(name='Aggro')
+    for i in range(3):
+        post = Post.objects.create(title=f'Control {i}', slug=f'control-{i}', author=user)
+        post.topics.add(control)
+    post = Post.objects.create(title='Aggro 0', slug='aggro-0', author=user)
+    post.topics.add(aggro)
+    return control, aggro
+
+def test_warm_cache_costs_no_queries(ranked_topics, django_assert_num_queries):
+    """Test that a warm cache serves the sidebar and home ranking without queries"""
+    control, aggro = ranked_topics
+    assert get_top_topics() == [control, aggro]
+
+    with django_assert_num_queries(0):
+        context = base_context(RequestFactory().get('/'))
+        assert context['top_topics'] == [control, aggro]
+        assert get_top_topics(limit=1)[0].post_count == 3
+
+def test_shared_cache_hit_after_local_cache_cleared(ranked_topics, django_assert_num_queries):
+    """Test that another process would be served from Django's cache"""
+    get_top_topics()
+    clear_top_topics_cache()
+
+    with django_assert_num_queries(0):
+        get_top_topics()
+    assert get_cache_stats() == {'local_hits': 0, 'shared_hits': 1, 'misses': 0}
+
+def test_adding_topic_to_post_invalidates(ranked_topics, user):
+    """Test that the m2m signal refreshes the ranking"""
+    control, aggro = ranked_topics
+    get_top_topics()
+    for i in range(3):
+        post = Post.objects.create(title=f'Aggro {i + 1}', slug=f'aggro-{i + 1}', author=user)
+        post.topics.add(aggro)
+
+    assert get_top_topics() == [aggro, control]
+
+def test_deleting_post_and_topic_invalidates(ranked_topics):
+    """Test that deletes refresh the ranking"""
+    control, aggro = ranked_topics
+    get_top_topics()
+    Post.objects.filter(slug='aggro-0').delete()
+    assert get_top_topics(min_posts=1) == [control]
+
+    control.delete()
+    assert get_top_topics() == [aggro]
+
+def test_cache_stats_count_hits_and_misses(ranked_topics):
+    """Test that hit and miss counters are exposed"""
+    get_top_topics()
+    get_top_topics()
+    get_top_topics()
+    assert get_cache_stats() == {'local_hits': 2, 'shared_hits': 0, 'misses': 1}
+
+@pytest.mark.django_db
+def test_home_warm_cache_costs_no_queries(ranked_topics, client, django_assert_num_queries):
+    """Test that the home page runs no queries once the cache is warm"""
+    client.get(reverse('mtg_blog_app:home'))
+    with django_assert_num_queries(0):
+        response = client.get(reverse('mtg_blog_app:home'))
+    assert 'Control (3)' in response.content.decode()
+
+def test_ranking_read_before_commit_is_not_kept(ranked_topics, user, django_capture_on_commit_callbacks):
+    """Test a ranking cached from pre-commit rows is dropped once the change commits"""
+    control, aggro = ranked_topics
+    with django_capture_on_commit_callbacks(execute=True):
+        for i in range(3):
+            post = Post.objects.create(title=f'Aggro {i + 1}', slug=f'aggro-{i + 1}', author=user)
+            post.topics.add(aggro)
+        # Stands in for a reader that ranked the rows before they were committed
+        Topic.objects.filter(pk=aggro.pk).update(post_count=1)
+        assert get_top_topics() == [control, aggro]
+        Topic.objects.filter(pk=aggro.pk).update(post_count=4)
+    assert get_top_topics() == [aggro, control]
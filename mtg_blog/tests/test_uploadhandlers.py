@@ -0,0 +1,41 @@
+"""Tests for the streaming contest upload handler"""
+import pytest
+from django.core.files.uploadhandler import StopUpload
+from mtg_blog.uploadhandlers import ContestPhotoUploadHandler
+
+def start_file(handler, content_length=1024):
+    """Announce a request and a new file to the handler"""
+    handler.handle_raw_input(None, {}, content_length, b'boundary')
+    handler.new_file('photo', 'photo.png', 'image/png', content_length)
+
+def test_image_chunks_pass_through():
+    """Test image data is handed on to the next handler untouched"""
+    handler = ContestPhotoUploadHandler(max_size=100)
+    start_file(handler)
+    assert handler.receive_data_chunk(b'\x89PNG\r\n\x1a\n' + b'a' * 40, 0) == b'\x89PNG\r\n\x1a\n' + b'a' * 40
+    assert handler.receive_data_chunk(b'b' * 50, 48) == b'b' * 50
+    assert handler.error is None
+
+def test_first_chunk_without_magic_stops_upload():
+    """Test a non-image stops on its first chunk"""
+    handler = ContestPhotoUploadHandler()
+    start_file(handler)
+    with pytest.raises(StopUpload):
+        handler.receive_data_chunk(b'<html>', 0)
+    assert handler.error == 'Image file must be an image file'
+
+def test_size_cap_stops_mid_stream():
+    """Test the chunk that crosses the cap is never passed on"""
+    handler = ContestPhotoUploadHandler(max_size=100)
+    start_file(handler, content_length=None)
+    handler.receive_data_chunk(b'GIF89a' + b'a' * 54, 0)
+    with pytest.raises(StopUpload):
+        handler.receive_data_chunk(b'b' * 60, 60)
+    assert handler.error == 'Image file too large (5MB limit)'
+
+def test_declared_length_rejects_before_first_chunk():
+    """Test an oversized request is refused before any file data is read"""
+    handler = ContestPhotoUploadHandler(max_size=100)
+    with pytest.raises(StopUpload):
+        start_file(handler, content_length=200 * 1024)
+    assert handler.received == 0
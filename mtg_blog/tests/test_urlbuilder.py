@@ -0,0 +1,62 @@
+"""Tests for the compiled URL builder behind get_absolute_url"""
+from unittest import mock
+
+import pytest
+from django.test import override_settings
+from django.urls import NoReverseMatch, include, path, reverse, set_script_prefix
+from mtg_blog.models import Post, Topic
+from mtg_blog.urlbuilder import build_url
+
+# Mounts the blog under a prefix, for the URLconf reload test
+urlpatterns = [path('blog/', include('mtg_blog.urls'))]
+
+@pytest.mark.parametrize('name, kwargs', [
+    ('mtg_blog_app:home', {}),
+    ('mtg_blog_app:topic_detail', {'slug': 'modern'}),
+    ('mtg_blog_app:post_detail', {'slug': 'burn_primer-2'}),
+    ('mtg_blog_app:sitemap_shard', {'section': 'posts', 'shard': 3}),
+    ('mtg_blog_app:sitemap_shard', {'section': 'odd name', 'shard': 0}),
+])
+def test_same_urls_as_reverse(name, kwargs):
+    """Test compiled and fallback URLs equal reverse(), also on repeated calls"""
+    for _ in range(2):
+        assert build_url(name, **kwargs) == reverse(name, kwargs=kwargs)
+
+def test_compiled_links_skip_reverse():
+    """Test only the first link of each route goes through reverse()"""
+    topics = [Topic(name=f'Topic {number}', slug=f'topic-{number}') for number in range(50)]
+    posts = [Post(title=f'Post {number}', slug=f'post_{number}') for number in range(50)]
+    with mock.patch('mtg_blog.urlbuilder.reverse', wraps=reverse) as counted:
+        topics[0].get_absolute_url()
+        posts[0].get_absolute_url()
+        counted.reset_mock()
+        links = [item.get_absolute_url() for item in topics + posts]
+    assert counted.call_count == 0
+    assert links == [reverse('mtg_blog_app:topic_detail', kwargs={'slug': topic.slug}) for topic in topics] + [
+        reverse('mtg_blog_app:post_detail', kwargs={'slug': post.slug}) for post in posts]
+
+def test_invalid_values_still_fail():
+    """Test values the route rejects raise like reverse() does"""
+    build_url('mtg_blog_app:topic_detail', slug='modern')
+    with pytest.raises(NoReverseMatch):
+        build_url('mtg_blog_app:topic_detail', slug='two/parts')
+    with pytest.raises(NoReverseMatch):
+        build_url('mtg_blog_app:sitemap_shard', section='posts', shard='first')
+
+def test_script_prefix_is_kept():
+    """Test a deployment under a script prefix gets prefixed links"""
+    topic = Topic(name='Modern', slug='modern')
+    assert topic.get_absolute_url() == '/topic/modern'
+    set_script_prefix('/mtg/')
+    try:
+        assert topic.get_absolute_url() == '/mtg/topic/modern'
+    finally:
+        set_script_prefix('/')
+
+def test_urlconf_reload_recompiles():
+    """Test links follow the URLconf after it is reloaded"""
+    post = Post(title='Burn', slug='burn')
+    assert post.get_absolute_url() == '/post/burn'
+    with override_settings(ROOT_URLCONF=__name__):
+        assert post.get_absolute_url() == '/blog/post/burn'
+    assert post.get_absolute_url() == '/post/burn'
@@ -159,4 +159,119 @@ class TestContestViews:
 
         messages = list(response.context['messages'])
         assert len(messages) == 1
-        assert 'Thank you' in str(messages[0])
\ No newline at end of file
+        assert 'Thank you' in str(messages[0])
+
+
+def create_published_posts(user, topic, count):
+    """Create published posts for a topic, newest last"""
+    for i in range(count):
+        post = Post.objects.create(
+            title = f'Post {i:03}',
+            slug = f'post-{i:03}',
+            content = 'Content',
+            author = user,
+            status = 'published',
+        )
+        post.topics.add(topic)
+
+@pytest.mark.django_db
+def test_topic_detail_keyset_pagination(client):
+    """Test the topic detail view walks pages with next/prev cursors"""
+    user = User.objects.create_user(username='testuser', password='pass')
+    topic = Topic.objects.create(name='Cube', slug='cube')
+    create_published_posts(user, topic, 45)
+    url = reverse('mtg_blog_app:topic_detail', kwargs={'slug': topic.slug})
+
+    first = client.get(url).context['page']
+    assert [post.title for post in first][0] == 'Post 044'
+    assert len(first) == 20
+    assert not first.has_previous
+
+    second = client.get(url, {'cursor': first.next_cursor}).context['page']
+    third = client.get(url, {'cursor': second.next_cursor}).context['page']
+    assert [post.title for post in second][0] == 'Post 024'
+    assert [post.title for post in third] == ['Post 004', 'Post 003', 'Post 002', 'Post 001', 'Post 000']
+    assert not third.has_next
+
+    back = client.get(url, {'cursor': third.prev_cursor}).context['page']
+    assert [post.title for post in back] == [post.title for post in second]
+
+@pytest.mark.django_db
+def test_topic_detail_query_count_is_constant(client, django_assert_num_queries):
+    """Test the topic detail page query count does not grow with the number of posts"""
+    user = User.objects.create_user(username='testuser', password='pass')
+    small = Topic.objects.create(name='Small', slug='small')
+    large = Topic.objects.create(name='Large', slug='large')
+    create_published_posts(user, small, 2)
+    for i in range(60):
+        post = Post.objects.create(
+            title=f'Large {i}', slug=f'large-{i}', author=user, status='published')
+        post.topics.add(large)
+
+    client.get(reverse('mtg_blog_app:home'))
+    with django_assert_num_queries(2):
+        client.get(reverse('mtg_blog_app:topic_detail', kwargs={'slug': 'small'}))
+    with django_assert_num_queries(2):
+        response = client.get(reverse('mtg_blog_app:topic_detail', kwargs={'slug': 'large'}))
+    assert f'By {user.username}' in response.content.decode()
+
+@pytest.mark.django_db
+def test_topic_detail_invalid_cursor(client):
+    """Test a tampered cursor is a 404"""
+    topic = Topic.objects.create(name='Vintage', slug='vintage')
+    url = reverse('mtg_blog_app:topic_detail', kwargs={'slug': topic.slug})
+    assert client.get(url, {'cursor': 'not-a-cursor'}).status_code == 404
+
+@pytest.mark.django_db
+class TestContestUploadHandler:
+    """Test uploads are rejected while they stream in"""
+
+    def post_photo(self, client, content, name='upload.jpg'):
+        """Post a contest entry with the given file content"""
+        return client.post(reverse('mtg_blog_app:contest'), {
+            'name': 'Test User',
+            'email': 'test@example.com',
+            'photo': SimpleUploadedFile(name, content, content_type='image/jpeg'),
+        })
+
+    def test_non_image_is_rejected(self, client):
+        """Test a file without image magic bytes is refused"""
+        response = self.post_photo(client, b'#!/bin/sh\necho not a photo\n')
+
+        assert response.status_code == 200
+        assert PhotoSubmission.objects.count() == 0
+        assert response.context['form'].errors['photo'] == ['Image file must be an image file']
+        assert response.context['form'].data['name'] == 'Test User'
+
+    def test_oversized_upload_is_rejected(self, client):
+        """Test an upload over 5MB is refused"""
+        response = self.post_photo(client, b'\xff\xd8\xff' + b'x' * (6 * 1024 * 1024))
+
+        assert response.status_code == 200
+        assert PhotoSubmission.objects.count() == 0
+        assert response.context['form'].errors['photo'] == ['Image file too large (5MB limit)']
+
+    def test_csrf_is_still_enforced(self):
+        """Test the contest form still needs a CSRF token"""
+        csrf_client = Client(enforce_csrf_checks=True)
+        response = self.post_photo(csrf_client, b'GIF89a')
+        assert response.status_code == 403
+
+@pytest.mark.django_db
+def test_post_detail_view(client):
+    """Test published posts have their own page and drafts do not"""
+    user = User.objects.create_user(username='testuser', password='pass')
+    topic = Topic.objects.create(name='Cube')
+    post = Post.objects.create(title='Cube Primer', content='Draft it', author=user, status='published')
+    post.topics.add(topic)
+    draft = Post.objects.create(title='Unfinished', author=user)
+
+    response = client.get(post.get_absolute_url())
+    assert response.status_code == 200
+    assert 'Draft it' in response.content.decode()
+    assert topic.get_absolute_url() in response.content.decode()
+    assert client.get(draft.get_absolute_url()).status_code == 404
+
+    post.content = 'Edited'
+    post.save()
+    assert 'Edited' in client.get(post.get_absolute_url()).content.decode()
@@ -0,0 +1,135 @@
+"""Shared cache for the top topics shown on the home page and the sidebar"""
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from .models import Topic
+
+TOP_TOPICS_LIMIT = 10
+LOCAL_CACHE_SIZE = 8
+VERSION_KEY = 'mtg_blog:top_topics:version'
+DATA_KEY = 'mtg_blog:top_topics:{version}'
+# Backstop for a ranking that was cached without its version being bumped
+DATA_TIMEOUT = 60 * 60
+
+_local_cache = OrderedDict()
+_lock = Lock()
+_stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0}
+
+
+def _current_version():
+    """Return the shared version number, creating it on first use.
+
+    New versions start from the clock so a flushed shared cache never
+    hands out a number an old local entry is still stored under.
+    """
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def _top_topics_queryset():
+    """Rank topics by their stored post counter (an indexed ORDER BY ... LIMIT)"""
+    return Topic.objects.order_by('-post_count', 'name')[:TOP_TOPICS_LIMIT]
+
+
+def _local_get(version):
+    with _lock:
+        topics = _local_cache.get(version)
+        if topics is not None:
+            _local_cache.move_to_end(version)
+            _stats['local_hits'] += 1
+    return topics
+
+
+def _local_put(version, topics, stat):
+    with _lock:
+        _stats[stat] += 1
+        _local_cache[version] = topics
+        while len(_local_cache) > LOCAL_CACHE_SIZE:
+            _local_cache.popitem(last=False)
+
+
+def _select(topics, limit, min_posts):
+    return [topic for topic in topics if topic.post_count >= min_posts][:limit]
+
+
+def get_top_topics(limit=TOP_TOPICS_LIMIT, min_posts=0):
+    """Return the topics with the most posts"""
+    version = _current_version()
+    topics = _local_get(version)
+    if topics is None:
+        data_key = DATA_KEY.format(version=version)
+        topics = cache.get(data_key)
+        if topics is None:
+            topics = list(_top_topics_queryset())
+            cache.set(data_key, topics, timeout=DATA_TIMEOUT)
+            stat = 'misses'
+        else:
+            stat = 'shared_hits'
+        _local_put(version, topics, stat)
+    return _select(topics, limit, min_posts)
+
+
+async def _acurrent_version():
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        await cache.aadd(VERSION_KEY, time.time_ns(), timeout=None)
+        version = await cache.aget(VERSION_KEY)
+    return version
+
+
+async def aget_top_topics(limit=TOP_TOPICS_LIMIT, min_posts=0):
+    """Async version of get_top_topics for async views"""
+    version = await _acurrent_version()
+    topics = _local_get(version)
+    if topics is None:
+        data_key = DATA_KEY.format(version=version)
+        topics = await cache.aget(data_key)
+        if topics is None:
+            topics = [topic async for topic in _top_topics_queryset().aiterator()]
+            await cache.aset(data_key, topics, timeout=DATA_TIMEOUT)
+            stat = 'misses'
+        else:
+            stat = 'shared_hits'
+        _local_put(version, topics, stat)
+    return _select(topics, limit, min_posts)
+
+
+def _bump():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), timeout=None)
+    with _lock:
+        _local_cache.clear()
+
+
+def invalidate_top_topics():
+    """Drop the cached ranking in this process and every other one.
+
+    Inside a transaction the version is bumped again on commit, so a
+    ranking rebuilt from the old rows in the meantime is not kept.
+    """
+    _bump()
+    if connection.in_atomic_block:
+        transaction.on_commit(_bump)
+
+
+def get_cache_stats():
+    """Return the hit and miss counters of the top topics cache"""
+    with _lock:
+        return dict(_stats)
+
+
+def clear_top_topics_cache():
+    """Empty the local cache and reset the counters"""
+    with _lock:
+        _local_cache.clear()
+        for key in _stats:
+            _stats[key] = 0
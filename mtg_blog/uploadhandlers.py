@@ -0,0 +1,58 @@
+"""Upload handlers that reject bad contest photos while they stream in"""
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+
+MAX_PHOTO_SIZE = 5 * 1024 * 1024 #makes a 5MB limit
+# Room for the boundaries and the small text fields sent with the photo
+FORM_OVERHEAD = 64 * 1024
+IMAGE_SIGNATURES = (
+    b'\xff\xd8\xff',        # JPEG
+    b'\x89PNG\r\n\x1a\n',   # PNG
+    b'GIF87a',              # GIF
+    b'GIF89a',
+)
+TOO_LARGE = 'Image file too large (5MB limit)'
+NOT_AN_IMAGE = 'Image file must be an image file'
+
+
+class ContestPhotoUploadHandler(FileUploadHandler):
+    """Enforce the photo size cap and image type before anything is buffered.
+
+    Must run first in request.upload_handlers. Every chunk is checked
+    before it is passed on to the memory/temporary file handlers, and on a
+    violation the upload is stopped without reading the rest of the body.
+    The reason is kept in `error` for the view to show.
+    """
+    chunk_size = 64 * 2 ** 10
+
+    def __init__(self, request=None, max_size=MAX_PHOTO_SIZE):
+        super().__init__(request)
+        self.max_size = max_size
+        self.error = None
+        self.content_length = None
+        self.received = 0
+
+    def handle_raw_input(  # pylint: disable=too-many-positional-arguments
+            self, input_data, META, content_length, boundary, encoding=None):
+        self.content_length = content_length
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        if self.content_length and self.content_length > self.max_size + FORM_OVERHEAD:
+            self.reject(TOO_LARGE)
+
+    def receive_data_chunk(self, raw_data, start):
+        if start == 0 and not raw_data.startswith(IMAGE_SIGNATURES):
+            self.reject(NOT_AN_IMAGE)
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            self.reject(TOO_LARGE)
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+    def reject(self, error):
+        """Stop reading the request body"""
+        self.error = error
+        raise StopUpload(connection_reset=True)
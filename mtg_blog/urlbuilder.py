@@ -0,0 +1,68 @@
+"""reverse() for named routes, compiled into a format string on first use.
+
+The first build_url() for a route name and set of keyword arguments
+reverses it once with placeholder values and keeps the result as a
+template; later calls only format the values into it. Templates belong
+to the resolver they were compiled from, so anything that reloads the
+URLconf through clear_url_caches() (override_settings(ROOT_URLCONF=...),
+set_urlconf(), the autoreloader) makes them compile again.
+
+Values made of letters, digits, '-' and '_' need no quoting and pass the
+slug, str and path converters, and digits pass the int converter; those
+take the fast path. Anything else goes through reverse() as before.
+"""
+import itertools
+import re
+
+from django.urls import NoReverseMatch, get_resolver, get_script_prefix, get_urlconf, reverse
+
+# Placeholders reversed in place of the values: one per converter family
+_PLACEHOLDERS = {
+    'word': (lambda index: f'zqmtgurlarg{index}x', re.compile(r'[-a-zA-Z0-9_]+')),
+    'digits': (lambda index: f'9073510{index}9', re.compile(r'[0-9]+')),
+}
+
+_templates = {}
+
+
+def _compile(name, params, urlconf):
+    """(template, {param: value regex}) for a route, or None if no placeholder fits"""
+    for kinds in itertools.product(_PLACEHOLDERS, repeat=len(params)):
+        placeholders = {
+            param: _PLACEHOLDERS[kind][0](index)
+            for index, (param, kind) in enumerate(zip(params, kinds))
+        }
+        try:
+            url = reverse(name, kwargs=placeholders, urlconf=urlconf)
+        except NoReverseMatch:
+            continue
+        template = url.replace('{', '{{').replace('}', '}}')
+        for param, placeholder in placeholders.items():
+            template = template.replace(placeholder, f'{{{param}}}')
+        return template, {
+            param: _PLACEHOLDERS[kind][1] for param, kind in zip(params, kinds)
+        }
+    return None
+
+
+def build_url(name, **kwargs):
+    """Same result as reverse(name, kwargs=kwargs), without resolving after the first call"""
+    urlconf = get_urlconf()
+    resolver = get_resolver(urlconf)
+    key = (name, urlconf, get_script_prefix(), tuple(sorted(kwargs)))
+    entry = _templates.get(key)
+    if entry is None or entry[0] is not resolver:
+        entry = (resolver, _compile(name, key[3], urlconf))
+        _templates[key] = entry
+    compiled = entry[1]
+    if compiled is not None:
+        template, patterns = compiled
+        values = {param: str(value) for param, value in kwargs.items()}
+        if all(patterns[param].fullmatch(value) for param, value in values.items()):
+            return template.format_map(values)
+    return reverse(name, kwargs=kwargs, urlconf=urlconf)
+
+
+def clear():
+    """Forget every compiled template"""
+    _templates.clear()
@@ -1,5 +1,6 @@
-from django.urls import path
-from . import views
+from django.urls import include, path
+from . import feeds, sitemaps, views
+from .api import router
 
 app_name = 'mtg_blog_app'
 
@@ -7,5 +8,14 @@ urlpatterns = [
     path('home/', views.home, name='home'),
     path('topics/', views.TopicListView.as_view(), name='topic_list'),
     path('topic/<slug:slug>', views.TopicDetailView.as_view(), name = 'topic_detail'),
+    path('topic/<slug:slug>/feed/rss/', feeds.topic_posts_rss, name='topic_feed_rss'),
+    path('topic/<slug:slug>/feed/atom/', feeds.topic_posts_atom, name='topic_feed_atom'),
+    path('sitemap.xml', sitemaps.sitemap, name='sitemap'),
+    path('sitemap-<str:section>-<int:shard>.xml', sitemaps.sitemap_shard, name='sitemap_shard'),
+    path('feed/rss/', feeds.latest_posts_rss, name='feed_rss'),
+    path('feed/atom/', feeds.latest_posts_atom, name='feed_atom'),
+    path('post/<slug:slug>', views.PostDetailView.as_view(), name='post_detail'),
     path('contest/', views.contest_view, name='contest'),
+    path('search/', views.search_view, name='search'),
+    path('api/', include(router.urls)),
 ]
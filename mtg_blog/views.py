@@ -1,52 +1,139 @@
+from asgiref.sync import sync_to_async
+from django.http import Http404
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.urls import reverse
-from django.db.models import Count
-from django.views.generic import ListView, DetailView
-from .models import Topic
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.views.generic import DetailView, TemplateView
+from .models import Post, Topic
 from .forms import PhotoSubmissionForm
+from .context_processors import aload_base_context
+from .pagination import InvalidCursor, akeyset_paginate
+from .response_cache import TOPICS, cache_response, post_dependency, topic_dependency
+from .search import search_posts
+from .uploadhandlers import ContestPhotoUploadHandler
+from .topic_cache import aget_top_topics
 
-def home(request):
+# home, the topic pages and the contest page are async views: under ASGI
+# they load their data with the async ORM and the async cache API, and
+# fetch the sidebar before rendering so no query runs in the event loop.
+
+@cache_response(lambda request: [TOPICS])
+async def home(request):
     """Create the home page when called"""
-    topics = (
-        Topic.objects
-        .annotate(
-            num_posts = Count('posts'))
-        .order_by('-num_posts')[:10]
-    )
+    topics = await aget_top_topics(limit=10)
+    await aload_base_context(request)
     return render(request, 'mtg_blog_app/home.html', {'topics': topics})
 
-class TopicListView(ListView):
+@method_decorator(cache_response(lambda request: [TOPICS]), name='get')
+class TopicListView(TemplateView):
     """List all topics alphabetically"""
-    model = Topic
     template_name = 'mtg_blog_app/topic_list.html'
-    context_object_name = 'topics'
 
-    def get_queryset(self):
-        return Topic.objects.all().order_by('name')
+    async def get(self, request, *args, **kwargs):  # pylint: disable=invalid-overridden-method
+        topics = [topic async for topic in Topic.objects.order_by('name').aiterator()]
+        await aload_base_context(request)
+        return self.render_to_response(self.get_context_data(topics=topics))
 
-class TopicDetailView(DetailView):
+@method_decorator(
+    cache_response(lambda request, slug: [TOPICS, topic_dependency(slug)]),
+    name='get',
+)
+class TopicDetailView(TemplateView):
     """Creating the Detail View"""
-    model = Topic
     template_name = 'mtg_blog_app/topic_detail.html'
-    context_object_name = 'topic'
-    slug_field = 'slug'
-    slug_url_kwarg = 'slug'
-
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        topic = self.get_object()
-        context['posts'] = topic.posts.filter(
-            status = 'published'
-        ).order_by('-published')
-        return context
-
-def contest_view(request):
+    paginate_by = 20
+    post_ordering = ('-published', '-id')
+    object = None
+
+    def get_posts(self):
+        """Published posts of the topic with only the columns the template shows"""
+        return (
+            self.object.posts
+            .filter(status='published', published__isnull=False)
+            .select_related('author')
+            .only('title', 'slug', 'excerpt', 'published', 'author__username')
+        )
+
+    async def get(self, request, *args, **kwargs):  # pylint: disable=invalid-overridden-method
+        self.object = await Topic.objects.filter(slug=kwargs['slug']).afirst()
+        if self.object is None:
+            raise Http404('No topic found matching the query')
+        try:
+            page = await akeyset_paginate(
+                self.get_posts(),
+                self.post_ordering,
+                self.paginate_by,
+                cursor=request.GET.get('cursor'),
+            )
+        except InvalidCursor as error:
+            raise Http404('Invalid page cursor') from error
+        await aload_base_context(request)
+        return self.render_to_response(
+            self.get_context_data(topic=self.object, posts=page, page=page))
+
+@method_decorator(
+    cache_response(lambda request, slug: [TOPICS, post_dependency(slug)]),
+    name='dispatch',
+)
+class PostDetailView(DetailView):
+    """A published post on its own page"""
+    template_name = 'mtg_blog_app/post_detail.html'
+    context_object_name = 'post'
+
+    def get_queryset(self):
+        return (
+            Post.objects.filter(status='published')
+            .select_related('author')
+            .prefetch_related('topics')
+            .defer('content')
+        )
+
+def search_view(request):
+    """Ranked full-text search over published posts"""
+    query = request.GET.get('q', '').strip()
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    per_page = 20
+    results = []
+    if query:
+        results = search_posts(query, limit=per_page + 1, offset=(page - 1) * per_page)
+    context = {
+        'query': query,
+        'results': results[:per_page],
+        'page': page,
+        'has_next': len(results) > per_page,
+        'has_previous': page > 1,
+    }
+    return render(request, 'mtg_blog_app/search.html', context)
+
+@csrf_exempt
+async def contest_view(request):
     """View for photo contest page"""
+    # The upload handler has to be in place before the CSRF check reads POST
+    upload_handler = ContestPhotoUploadHandler(request)
+    request.upload_handlers.insert(0, upload_handler)
+    return await _contest_view(request, upload_handler)
+
+def _save_submission(form, upload_error):
+    """Validate and save a contest entry; runs in a thread as Pillow decodes the upload"""
+    if upload_error:
+        form.is_valid()
+        form.errors['photo'] = form.error_class([upload_error])
+        return False
+    if not form.is_valid():
+        return False
+    form.save()
+    return True
+
+@csrf_protect
+async def _contest_view(request, upload_handler):
     if request.method == 'POST':
         form = PhotoSubmissionForm(request.POST, request.FILES)
-        if form.is_valid():
-            form.save()
+        if await sync_to_async(_save_submission)(form, upload_handler.error):
             messages.success(
                 request,
                 'Thank you for submitting to the contest! Best of luck'
@@ -59,4 +146,5 @@ def contest_view(request):
         'form': form,
         'page_title' : 'Photo Contest'
     }
-    return render(request, 'mtg_blog_app/contest.html', context)
\ No newline at end of file
+    await aload_base_context(request)
+    return render(request, 'mtg_blog_app/contest.html', context)
@@ -9,9 +9,12 @@ https://docs.djangoproject.com/en/5.2/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
+import copy
 import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -37,10 +40,13 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'rest_framework',
     'mtg_blog',
 ]
 
 MIDDLEWARE = [
+    'mtg_blog.instrumentation.SQLInstrumentationMiddleware',
+    'mtg_blog.routers.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -73,12 +79,118 @@ WSGI_APPLICATION = 'mtg_site.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
-
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+#
+# MTG_DB_PROFILE picks the database: 'sqlite' (the default) or 'postgresql'.
+
+MTG_DB_PROFILE = os.environ.get('MTG_DB_PROFILE', 'sqlite')
+
+if MTG_DB_PROFILE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('MTG_SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # Writers take the write lock at BEGIN, so a transaction that
+                # has already read never fails to upgrade its lock
+                'transaction_mode': 'IMMEDIATE',
+                # Seconds a writer waits for the lock before "database is locked"
+                'timeout': 20,
+            },
+        }
+    }
+elif MTG_DB_PROFILE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('MTG_DB_NAME', 'mtg_blog'),
+            'USER': os.environ.get('MTG_DB_USER', ''),
+            'PASSWORD': os.environ.get('MTG_DB_PASSWORD', ''),
+            'HOST': os.environ.get('MTG_DB_HOST', ''),
+            'PORT': os.environ.get('MTG_DB_PORT', ''),
+            # Checks a reused (or, with the pool, a checked out) connection first
+            'CONN_HEALTH_CHECKS': True,
+        }
+    }
+    if os.environ.get('MTG_DB_POOL', '1') == '1':
+        # psycopg_pool keeps connections open between requests; Django does
+        # not allow CONN_MAX_AGE together with a pool
+        DATABASES['default']['OPTIONS'] = {
+            'pool': {
+                'min_size': int(os.environ.get('MTG_DB_POOL_MIN', 2)),
+                'max_size': int(os.environ.get('MTG_DB_POOL_MAX', 10)),
+                'timeout': 10,
+                'max_idle': 300,
+            },
+        }
+    else:
+        DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('MTG_DB_CONN_MAX_AGE', 600))
+else:
+    raise ImproperlyConfigured(
+        f"MTG_DB_PROFILE must be 'sqlite' or 'postgresql', not {MTG_DB_PROFILE!r}")
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+#
+# MTG_CACHE picks the backend behind the response cache and the top topics
+# cache: 'locmem' (the default), 'redis' or 'memcached', at
+# MTG_CACHE_LOCATION. LocMem lives inside one process, so it only suits
+# runserver and the tests. Under gunicorn or uvicorn with several workers,
+# an invalidation in one worker would never reach the others, so use a
+# shared backend there.
+
+MTG_CACHE = os.environ.get('MTG_CACHE', 'locmem')
+
+if MTG_CACHE == 'locmem':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'mtg-blog',
+        }
+    }
+elif MTG_CACHE == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('MTG_CACHE_LOCATION', 'redis://127.0.0.1:6379/1'),
+        }
+    }
+elif MTG_CACHE == 'memcached':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+            'LOCATION': os.environ.get('MTG_CACHE_LOCATION', '127.0.0.1:11211'),
+        }
     }
+else:
+    raise ImproperlyConfigured(
+        f"MTG_CACHE must be 'locmem', 'redis' or 'memcached', not {MTG_CACHE!r}")
+
+# Read replicas: MTG_DB_REPLICAS is a comma separated list of SQLite files
+# (copies of the primary, e.g. made with ``sqlite3 db.sqlite3 ".backup
+# replica.sqlite3"``) or of PostgreSQL hosts. Reads are sent to them by
+# mtg_blog.routers; tests use the primary through the MIRROR setting.
+MTG_DB_REPLICAS = []
+for number, location in enumerate(
+        filter(None, os.environ.get('MTG_DB_REPLICAS', '').split(',')), start=1):
+    replica = copy.deepcopy(DATABASES['default'])
+    replica['NAME' if MTG_DB_PROFILE == 'sqlite' else 'HOST'] = location.strip()
+    replica['TEST'] = {'MIRROR': 'default'}
+    DATABASES[f'replica{number}'] = replica
+    MTG_DB_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['mtg_blog.routers.PrimaryReplicaRouter']
+# Seconds a browser reads from the primary after it wrote, longer than
+# the replicas are expected to lag
+MTG_REPLICA_PIN_SECONDS = 5
+
+# Applied to every new SQLite connection (mtg_blog.signals): readers no longer
+# wait for writers in WAL mode, and a commit only syncs at checkpoints.
+MTG_SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'mmap_size': 256 * 1024 * 1024,
+    # Negative sizes are in KiB: a 64MB page cache per connection
+    'cache_size': -64 * 1024,
 }
 
 
@@ -126,4 +238,34 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'mtg_blog','static')]
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 MEDIA_URL = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
\ No newline at end of file
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+    # Contest photos are stored once per unique content
+    'photos': {
+        'BACKEND': 'mtg_blog.storage.ContentAddressedStorage',
+    },
+}
+# Background threads that generate resized contest photo variants
+# (0 leaves them to the generate_photo_variants command)
+MTG_PHOTO_VARIANT_WORKERS = 2
+
+# Per-request query counts, DB time and N+1 warnings (Server-Timing header
+# and the mtg_blog.sql logger)
+MTG_SQL_INSTRUMENTATION = os.environ.get('MTG_SQL_INSTRUMENTATION') == '1'
+MTG_SQL_N_PLUS_ONE_THRESHOLD = 5
+
+# Read-only JSON API (mtg_blog.api)
+REST_FRAMEWORK = {
+    'DEFAULT_PERMISSION_CLASSES': ['rest_framework.permissions.AllowAny'],
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}